@@ -1,33 +1,129 @@
 __version__ = "0.1.0"
 """Anki Deck Manager package.
 
-Public API re-exports for convenience.
+Public API re-exports for convenience. They are resolved lazily (PEP 562 module
+__getattr__): ``import ankideck`` loads nothing but this table, and each name
+imports its submodule on first access, so genanki and numpy are only loaded
+once something is exported or near-duplicates are computed.
 """
+import importlib
+
 from .config import DECK_LIBRARY_DIR, DATA_DIR, DB_PATH
-from .core import (
-    validate_cards,
-    sanitize_filename,
-    merge_cards,
-)
-from .services import (
-    save_validated_json,
-    create_apkg,
-    create_apkg_from_cards,
-    get_deck_library_path,
-    load_deck_json,
-    save_deck_json,
-)
-from .db import (
-    db_init,
-    db_list_decks,
-    db_create_deck,
-    db_get_deck_by_name,
-    db_get_deck_cards,
-    db_get_deck_cards_by_name,
-    db_add_cards,
-    db_export_deck_apkg,
-    db_rename_deck,
-    db_delete_deck,
-    db_update_card,
-    db_delete_card,
-)
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "core": (
+        "validate_cards",
+        "sanitize_filename",
+        "merge_cards",
+        "CardPipeline",
+        "ParsedCards",
+        "card_pipeline",
+        "Card",
+        "CardBatch",
+        "cards_as_dicts",
+    ),
+    "services": (
+        "save_validated_json",
+        "create_apkg",
+        "create_apkg_from_cards",
+        "get_deck_apkg_path",
+        "get_deck_export_path",
+        "get_deck_library_path",
+        "load_deck_json",
+        "save_deck_json",
+    ),
+    "db": (
+        "db_init",
+        "db_close",
+        "db_list_decks",
+        "db_search_cards",
+        "db_create_deck",
+        "db_get_deck_by_name",
+        "db_get_deck_cards",
+        "db_get_deck_cards_by_name",
+        "db_get_deck_cards_page",
+        "db_iter_deck_cards",
+        "db_count_deck_cards",
+        "db_add_cards",
+        "db_add_cards_bulk",
+        "db_export_deck_apkg",
+        "db_export_deck_text",
+        "db_export_deck_delta",
+        "db_list_deck_exports",
+        "db_add_media",
+        "db_media_stats",
+        "db_extract_stored_media",
+        "db_prune_media",
+        "db_export_cache_stats",
+        "db_prune_export_cache",
+        "db_rename_deck",
+        "db_delete_deck",
+        "db_update_card",
+        "db_delete_card",
+        "db_move_deck_contents",
+        "db_copy_deck_contents",
+        "db_merge_decks",
+        "db_check_card_counts",
+        "db_list_quarantined_cards",
+        "db_clear_quarantine",
+        "db_index_near_duplicates",
+        "db_find_near_duplicates",
+        "db_record_artifact",
+        "db_list_artifacts",
+        "db_get_artifact",
+        "db_artifact_stats",
+        "db_delete_artifact",
+        "db_prune_artifacts",
+        "db_create_job",
+        "db_start_job",
+        "db_finish_job",
+        "db_request_job_cancel",
+        "db_fail_jobs",
+        "db_active_jobs",
+        "db_get_job",
+        "db_list_jobs",
+    ),
+    "media": (
+        "store_media",
+        "media_reference",
+        "extract_data_uris",
+    ),
+    "bulk": (
+        "export_decks",
+        "bundle_exports",
+        "import_deck_files",
+    ),
+    "ingest": (
+        "iter_cards",
+        "format_for_filename",
+    ),
+    "textfmt": (
+        "write_text",
+    ),
+    "anki_import": (
+        "import_anki_package",
+    ),
+    "jobs": (
+        "submit_job",
+        "job_status",
+        "list_jobs",
+        "cancel_job",
+    ),
+}
+_SOURCES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = ["DECK_LIBRARY_DIR", "DATA_DIR", "DB_PATH", *_SOURCES]
+
+
+def __getattr__(name: str):
+    module = _SOURCES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SOURCES))
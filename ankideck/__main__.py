@@ -0,0 +1,217 @@
+"""Command-line maintenance tasks: ``python -m ankideck <command>``."""
+import os
+import sys
+import argparse
+
+from .db import db_init, db_check_card_counts, db_prune_artifacts
+from .bulk import export_decks, bundle_exports
+
+
+def _cmd_check_counts(args) -> int:
+    mismatches = db_check_card_counts(repair=args.repair)
+    if not mismatches:
+        print("All deck card counts are consistent.")
+        return 0
+    for m in mismatches:
+        line = f"{m['name']} (id {m['id']}): stored {m['stored']}, actual {m['actual']}"
+        if m["stored_last_card_at"] != m["actual_last_card_at"]:
+            line += f"; last card stored {m['stored_last_card_at']}, actual {m['actual_last_card_at']}"
+        print(line)
+    if args.repair:
+        print(f"Repaired {len(mismatches)} deck(s).")
+        return 0
+    print(f"{len(mismatches)} deck(s) out of sync. Re-run with --repair to fix.")
+    return 1
+
+
+def _cmd_export(args) -> int:
+    def _progress(done, total, result):
+        status = result["path"] if result["ok"] else f"FAILED: {result['error']}"
+        print(f"[{done}/{total}] {result['name']}: {status}")
+
+    results = export_decks(args.deck_id or None, workers=args.workers, progress=_progress, fmt=args.format)
+    if args.bundle:
+        print(f"Bundle: {bundle_exports([r for r in results if r['ok']], args.bundle_path)}")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+def _cmd_export_changes(args) -> int:
+    from .db import db_list_decks, db_export_deck_delta
+
+    deck = next((d for d in db_list_decks("") if d["id"] == args.deck_id), None)
+    if deck is None:
+        print(f"No deck with id {args.deck_id}.", file=sys.stderr)
+        return 1
+    result = db_export_deck_delta(deck["id"], deck["name"], args.since)
+    if result["path"] is None:
+        print(f"{deck['name']}: no changes since export {result['since_export_id']}.")
+    else:
+        print(f"{deck['name']}: {result['cards']} changed card(s) since export {result['since_export_id']} -> {result['path']}")
+    return 0
+
+
+def _cmd_add_media(args) -> int:
+    from .db import db_add_media
+    from .media import media_reference
+
+    for path in args.paths:
+        media = db_add_media(path)
+        print(f"{path}: {media_reference(media['name'])}")
+    return 0
+
+
+def _cmd_extract_media(args) -> int:
+    from .db import db_extract_stored_media
+
+    results = db_extract_stored_media()
+    for r in results:
+        print(f"{r['name']} (id {r['deck_id']}): {r['cards']} card(s) rewritten")
+    print(f"Moved inline media of {sum(r['cards'] for r in results)} card(s) into the media store.")
+    return 0
+
+
+def _cmd_prune_media(args) -> int:
+    from .db import db_prune_media
+
+    print(f"Removed {db_prune_media(args.grace_hours)} unused media file(s).")
+    return 0
+
+
+def _cmd_prune_artifacts(args) -> int:
+    removed = db_prune_artifacts(
+        args.kind, keep=args.keep, max_age_days=args.max_age_days, max_bytes=args.max_bytes, check_files=True
+    )
+    print(f"Removed {removed} artifact(s).")
+    return 0
+
+
+def _cmd_import_apkg(args) -> int:
+    from .anki_import import import_anki_package
+
+    for path in args.paths:
+        result = import_anki_package(
+            path,
+            deck_name=args.deck,
+            skip_near_duplicates=args.skip_near_duplicates,
+            on_progress=lambda done, total: print(f"\r{path}: {done}/{total} notes", end="", flush=True),
+        )
+        print()
+        for r in result["decks"]:
+            print(f"  {r['anki_deck']} -> {r['name']}: {r['added']} added, {r['duplicates']} duplicates, {r['after']} total")
+    return 0
+
+
+def _cmd_import_cards(args) -> int:
+    from .db import db_get_deck_by_name, db_create_deck, db_add_cards_bulk
+    from .ingest import iter_cards, format_for_filename, parse_column
+
+    deck = db_get_deck_by_name(args.deck) or db_create_deck(args.deck)
+    columns = None
+    if args.question_column or args.answer_column:
+        columns = (parse_column(args.question_column or ("question" if args.header else "1")),
+                   parse_column(args.answer_column or ("answer" if args.header else "2")))
+    for path in args.paths:
+        fmt = args.format or format_for_filename(path)
+        total = os.path.getsize(path)
+        with open(path, "rb") as fp:
+            cards = iter_cards(
+                fp, fmt,
+                on_read=lambda n: print(f"\r{path}: {n / 2**20:.1f}/{total / 2**20:.1f} MB", end="", flush=True),
+                delimiter="\t" if args.delimiter in ("\\t", "tab") else args.delimiter, header=args.header, columns=columns,
+            )
+            stats = db_add_cards_bulk(deck["id"], cards, skip_near_duplicates=args.skip_near_duplicates)
+        print()
+        print(f"  -> {deck['name']}: {stats['added']} added, {stats['duplicates']} duplicates, {stats['after']} total")
+    return 0
+
+
+def _cmd_import_batch(args) -> int:
+    from .bulk import import_deck_files
+
+    def _progress(done, total, r):
+        if r["status"] == "imported":
+            status = f"{r['added']} added, {r['duplicates']} duplicates"
+        else:
+            status = r["error"] or r["status"]
+        print(f"[{done}/{total}] {r['source']} -> {r['deck_name']}: {status}")
+
+    results = import_deck_files(args.source, workers=args.workers, progress=_progress, force=args.force)
+    failed = sum(r["status"] == "failed" for r in results)
+    print(f"{len(results)} file(s): {sum(r['added'] for r in results)} cards added, "
+          f"{sum(r['status'] == 'skipped' for r in results)} skipped, {failed} failed.")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m ankideck", description="Anki Deck Manager maintenance commands.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("check-counts", help="Verify the denormalized per-deck card counts and last-card times.")
+    p.add_argument("--repair", action="store_true", help="Recount decks whose stored count is wrong.")
+    p.set_defaults(func=_cmd_check_counts)
+
+    p = sub.add_parser("export", help="Export decks to .apkg in parallel (all decks by default).")
+    p.add_argument("--deck-id", type=int, action="append", help="Deck id to export; repeat for several.")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: ANKIDECK_EXPORT_WORKERS or CPU count).")
+    p.add_argument("--bundle", action="store_true", help="Also zip the exported files into one bundle.")
+    p.add_argument("--bundle-path", default=None, help="Where to write the bundle (default: Decks/decks_<timestamp>.zip).")
+    p.add_argument("--format", choices=["apkg", "csv", "tsv", "ndjson"], default="apkg", help="Export format (default: apkg).")
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("export-changes", help="Export an .apkg of the cards added or edited since a deck's last export.")
+    p.add_argument("deck_id", type=int, help="Deck id.")
+    p.add_argument("--since", type=int, default=None, help="Id of the export to compare against (default: the latest).")
+    p.set_defaults(func=_cmd_export_changes)
+
+    p = sub.add_parser("add-media", help="Add images/audio to the media store and print the snippet to reference each.")
+    p.add_argument("paths", nargs="+", help="Media files.")
+    p.set_defaults(func=_cmd_add_media)
+
+    p = sub.add_parser(
+        "extract-media",
+        help="Move base64 data: URIs in existing cards into the media store (rewrites those cards; they count as edited).",
+    )
+    p.set_defaults(func=_cmd_extract_media)
+
+    p = sub.add_parser("prune-media", help="Delete stored media no card references.")
+    p.add_argument("--grace-hours", type=float, default=None, help="Keep files younger than this (default: ANKIDECK_MEDIA_PRUNE_GRACE_HOURS).")
+    p.set_defaults(func=_cmd_prune_media)
+
+    p = sub.add_parser("import-cards", help="Stream JSON, NDJSON, CSV or TSV card files into a deck.")
+    p.add_argument("deck", help="Target deck name (created if missing).")
+    p.add_argument("paths", nargs="+", help="Card files.")
+    p.add_argument("--format", choices=["auto", "json", "ndjson", "csv", "tsv"], default=None,
+                   help="File format (default: from the extension; JSON array or NDJSON otherwise).")
+    p.add_argument("--delimiter", default=None, help="CSV/TSV field delimiter, or 'tab' (default: ',' for csv, tab for tsv).")
+    p.add_argument("--no-header", dest="header", action="store_false", help="CSV/TSV files have no header row.")
+    p.add_argument("--question-column", default=None, help="CSV/TSV question column: header name or 1-based number.")
+    p.add_argument("--answer-column", default=None, help="CSV/TSV answer column: header name or 1-based number.")
+    p.add_argument("--skip-near-duplicates", action="store_true", help="Also skip near-duplicate cards.")
+    p.set_defaults(func=_cmd_import_cards)
+
+    p = sub.add_parser("import-batch", help="Import every deck file in a zip archive or directory, one deck per file.")
+    p.add_argument("source", help="Zip archive or directory.")
+    p.add_argument("--workers", type=int, default=None, help="Parser processes (default: ANKIDECK_IMPORT_WORKERS or CPU count).")
+    p.add_argument("--force", action="store_true", help="Also re-import files whose content was imported before.")
+    p.set_defaults(func=_cmd_import_batch)
+
+    p = sub.add_parser("import-apkg", help="Import Anki .apkg/.colpkg packages, one deck per Anki deck.")
+    p.add_argument("paths", nargs="+", help="Package files.")
+    p.add_argument("--deck", default=None, help="Put every card into this deck instead.")
+    p.add_argument("--skip-near-duplicates", action="store_true", help="Also skip near-duplicate cards.")
+    p.set_defaults(func=_cmd_import_apkg)
+
+    p = sub.add_parser("prune-artifacts", help="Apply the retention policy to generated JSON/.apkg/bundle files.")
+    p.add_argument("--kind", choices=["json", "apkg", "text", "bundle"], default=None, help="Only this kind (default: all).")
+    p.add_argument("--keep", type=int, default=None, help="Keep the newest N per kind (default: ANKIDECK_ARTIFACT_KEEP_PER_KIND; 0 = no limit).")
+    p.add_argument("--max-age-days", type=float, default=None, help="Remove older files (default: ANKIDECK_ARTIFACT_MAX_AGE_DAYS; 0 = no limit).")
+    p.add_argument("--max-bytes", type=int, default=None, help="Total size per kind (default: ANKIDECK_ARTIFACT_MAX_BYTES; 0 = no limit).")
+    p.set_defaults(func=_cmd_prune_artifacts)
+
+    args = parser.parse_args(argv)
+    db_init()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
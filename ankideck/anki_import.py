@@ -0,0 +1,189 @@
+"""Streaming importer for Anki .apkg/.colpkg packages.
+
+A package is a zip holding the Anki collection as an SQLite file. The collection is
+copied out of the zip into a temporary file in chunks (SQLite needs a real file), and
+its notes are then read with one ordered cursor, deck by deck, so only a batch of
+rows is in memory at a time however many notes the package holds.
+
+Each note becomes one card: its first field is the question and its second the
+answer (empty for single-field notes), HTML kept as is. A note belongs to the deck of
+its first card. Supported collection files, newest first: ``collection.anki21b``
+(zstd-compressed; needs Python 3.14's compression.zstd or the zstandard package),
+``collection.anki21`` and ``collection.anki2``.
+"""
+import os
+import json
+import shutil
+import sqlite3
+import zipfile
+import tempfile
+import itertools
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .core import Card, sanitize_filename
+from .db import db_get_deck_by_name, db_create_deck, db_add_cards_bulk
+
+ImportProgressFn = Callable[[int, int], None]
+
+_COPY_CHUNK_BYTES = 1024 * 1024
+_PROGRESS_EVERY = 1000
+
+# A note's deck is the deck of its lowest-ordinal card; notes come out grouped by deck
+_NOTES_SQL = """
+    SELECT c.did, n.flds
+    FROM notes n
+    JOIN cards c ON c.id = (SELECT id FROM cards WHERE nid = n.id ORDER BY ord, id LIMIT 1)
+    ORDER BY c.did, n.id
+"""
+
+
+def _zstd_reader(fp: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(fp)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception(
+            "This package uses the newer Anki format (collection.anki21b), which needs the 'zstandard' "
+            "package to read. Install it, or export again from Anki with 'Support older Anki versions' checked."
+        )
+    return zstandard.ZstdDecompressor().stream_reader(fp)
+
+
+def _extract_collection(source: Union[str, BinaryIO], dest: str):
+    """Copy the package's collection database to dest, decompressing it if needed."""
+    try:
+        zf = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise Exception("Not an Anki package: the file is not a zip archive.")
+    with zf:
+        names = set(zf.namelist())
+        if "collection.anki21b" in names:
+            with zf.open("collection.anki21b") as src, _zstd_reader(src) as reader, open(dest, "wb") as out:
+                shutil.copyfileobj(reader, out, _COPY_CHUNK_BYTES)
+            return
+        for name in ("collection.anki21", "collection.anki2"):
+            if name in names:
+                with zf.open(name) as src, open(dest, "wb") as out:
+                    shutil.copyfileobj(src, out, _COPY_CHUNK_BYTES)
+                return
+    raise Exception("Not an Anki package: no collection.anki2/anki21/anki21b inside.")
+
+
+def anki_deck_name(name: str) -> str:
+    """An Anki deck name (with '::' between levels) as a deck name for this app."""
+    return sanitize_filename(name.replace("::", " - ").strip()) or "Default"
+
+
+class AnkiCollection:
+    """
+    Read-only view of the collection inside a package; use as a context manager so the
+    temporary copy is removed afterwards.
+    """
+
+    def __init__(self, source: Union[str, BinaryIO]):
+        fd, self.path = tempfile.mkstemp(suffix=".anki2")
+        os.close(fd)
+        try:
+            _extract_collection(source, self.path)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA query_only=ON")
+            self.conn.execute("SELECT 1 FROM notes LIMIT 1")
+        except sqlite3.DatabaseError:
+            self.close()
+            raise Exception("Not an Anki package: the collection database could not be read.")
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        conn = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.conn = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "AnkiCollection":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def decks(self) -> Dict[int, str]:
+        """Anki deck id -> full name ('Parent::Child')."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decks'")
+        if cur.fetchone():
+            # Schema 15+: one row per deck, levels separated by \x1f
+            cur.execute("SELECT id, name FROM decks")
+            return {int(i): name.replace("\x1f", "::") for i, name in cur.fetchall()}
+        cur.execute("SELECT decks FROM col")
+        row = cur.fetchone()
+        decks = json.loads(row[0]) if row and row[0] else {}
+        return {int(i): d.get("name", str(i)) for i, d in decks.items()}
+
+    def note_count(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(1) FROM notes").fetchone()[0])
+
+    def iter_decks(self) -> Iterator[Tuple[str, Iterator[Card]]]:
+        """
+        Yield (anki deck name, cards) per deck that has notes. Each cards iterator streams
+        from the shared cursor and must be consumed before moving on to the next deck.
+        """
+        names = self.decks()
+        cur = self.conn.execute(_NOTES_SQL)
+        for did, rows in itertools.groupby(cur, key=lambda r: r[0]):
+            yield names.get(did, f"Deck {did}"), (_note_card(flds) for _, flds in rows)
+
+
+def _note_card(flds: str) -> Card:
+    fields = (flds or "").split("\x1f")
+    return Card(None, fields[0], fields[1] if len(fields) > 1 else "")
+
+
+def import_anki_package(
+    source: Union[str, BinaryIO],
+    deck_name: Optional[str] = None,
+    skip_near_duplicates: bool = False,
+    on_progress: Optional[ImportProgressFn] = None,
+) -> Dict:
+    """
+    Import an .apkg/.colpkg (path or binary file object) into the database: one deck per
+    Anki deck (created if missing, names via anki_deck_name), or everything into
+    deck_name if given. Cards are streamed into db_add_cards_bulk and deduplicated like
+    any other import. Each deck is one transaction. on_progress(notes_done, notes_total)
+    is called every 1000 notes. Returns {'notes', 'added', 'duplicates', 'decks': [...]},
+    with db_add_cards_bulk's stats plus deck_id, name and anki_deck for every Anki deck.
+    """
+    results: List[Dict] = []
+    with AnkiCollection(source) as col:
+        total = col.note_count()
+        done = 0
+
+        def _counted(cards: Iterator[Card]) -> Iterator[Card]:
+            nonlocal done
+            for card in cards:
+                yield card
+                done += 1
+                if on_progress and done % _PROGRESS_EVERY == 0:
+                    on_progress(done, total)
+
+        for anki_name, cards in col.iter_decks():
+            name = sanitize_filename(deck_name.strip()) if deck_name else anki_deck_name(anki_name)
+            deck = db_get_deck_by_name(name) or db_create_deck(name)
+            stats = db_add_cards_bulk(deck["id"], _counted(cards), skip_near_duplicates=skip_near_duplicates)
+            results.append({"deck_id": deck["id"], "name": name, "anki_deck": anki_name, **stats})
+        if on_progress:
+            on_progress(done, total)
+    return {
+        "notes": done,
+        "added": sum(r["added"] for r in results),
+        "duplicates": sum(r["duplicates"] for r in results),
+        "decks": results,
+    }
@@ -0,0 +1,271 @@
+"""Bulk operations over many decks, fanned out across a process pool."""
+import io
+import os
+import time
+import hashlib
+import zipfile
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Callable, Iterable
+
+from .config import EXPORT_WORKERS, IMPORT_WORKERS, IMPORT_WRITE_BATCH_CARDS
+from .core import sanitize_filename, guid_for, _card_hash
+from .db import (
+    db_list_decks, db_export_deck_apkg, db_export_deck_text, db_record_artifact, db_prune_export_cache,
+    db_imported_file_keys, db_import_deck_files,
+)
+from .ingest import iter_cards, format_for_filename, FORMATS_BY_EXTENSION
+from .media import extract_data_uris
+
+ProgressFn = Callable[[int, int, Dict], None]
+
+
+def _export_one(deck_id: int, deck_name: str, fmt: str = "apkg") -> Dict:
+    """Worker entry point: export one deck through the regular (cached) exporter, or as text."""
+    t0 = time.perf_counter()
+    try:
+        if fmt == "apkg":
+            # Not pruned per deck: that could evict the files other decks of the run just wrote
+            path = db_export_deck_apkg(deck_id, deck_name, prune=False)
+        else:
+            path = db_export_deck_text(deck_id, deck_name, fmt)
+        return {"deck_id": deck_id, "name": deck_name, "path": path, "ok": True, "error": None,
+                "seconds": round(time.perf_counter() - t0, 3)}
+    except Exception as e:
+        return {"deck_id": deck_id, "name": deck_name, "path": None, "ok": False, "error": str(e),
+                "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def export_decks(
+    deck_ids: Optional[Iterable[int]] = None,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+    fmt: str = "apkg",
+) -> List[Dict]:
+    """
+    Export several decks (all decks if deck_ids is None) to Decks/<name>.apkg in parallel.
+    Each deck is exported in a worker process via db_export_deck_apkg, so unchanged decks
+    are served from the export cache. fmt 'csv', 'tsv' or 'ndjson' writes text exports
+    (db_export_deck_text) instead. progress(done, total, result) is called in this
+    process as each deck finishes. The export cache is pruned once at the end, keeping
+    every deck of the run, so all returned paths exist (e.g. for bundle_exports).
+    Returns one result dict per deck: { 'deck_id', 'name', 'path', 'ok', 'error', 'seconds' }
+    """
+    decks = db_list_decks("")
+    if deck_ids is not None:
+        wanted = set(deck_ids)
+        decks = [d for d in decks if d["id"] in wanted]
+    total = len(decks)
+    workers = max(1, min(int(workers or EXPORT_WORKERS), total or 1))
+    results: List[Dict] = []
+
+    def _done(result: Dict):
+        results.append(result)
+        if progress:
+            progress(len(results), total, result)
+
+    if workers == 1:
+        for d in decks:
+            _done(_export_one(d["id"], d["name"], fmt))
+    else:
+        # spawn: the app process runs many threads (Streamlit), which fork does not mix well with
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(_export_one, d["id"], d["name"], fmt) for d in decks]
+            try:
+                for fut in as_completed(futures):
+                    _done(fut.result())
+            except BaseException:
+                # e.g. the progress callback cancelled the run: don't start the remaining decks
+                for fut in futures:
+                    fut.cancel()
+                raise
+    if fmt == "apkg" and results:
+        db_prune_export_cache(keep_deck_ids=[r["deck_id"] for r in results])
+    return results
+
+
+def bundle_exports(results: List[Dict], bundle_path: Optional[str] = None) -> str:
+    """
+    Zip the exported files of successful export results into one bundle and return its path.
+    Raises if any of those files is missing; no partial bundle is left behind.
+    """
+    paths = [r["path"] for r in results if r["ok"] and r["path"]]
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        raise Exception(f"Cannot bundle: {len(missing)} exported file(s) no longer exist ({', '.join(missing[:5])}).")
+    if bundle_path is None:
+        os.makedirs("Decks", exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        bundle_path = os.path.join("Decks", f"decks_{stamp}.zip")
+    # Written next to the target and swapped in, so a failed run leaves no half-written zip
+    tmp_path = bundle_path + ".tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            for p in paths:
+                z.write(p, os.path.basename(p))
+        os.replace(tmp_path, bundle_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    db_record_artifact("bundle", bundle_path)
+    return bundle_path
+
+
+def deck_name_for_file(name: str) -> str:
+    """Deck name for a batch-imported file: its base name without extension."""
+    return sanitize_filename(os.path.splitext(os.path.basename(name))[0].strip()) or "Imported"
+
+
+def _list_deck_files(source: str, is_zip: bool) -> List[str]:
+    """Card files (by extension) in a zip archive (member names) or directory tree (paths), sorted."""
+    if is_zip:
+        with zipfile.ZipFile(source) as z:
+            names = [i.filename for i in z.infolist() if not i.is_dir()]
+    else:
+        names = [os.path.join(root, f) for root, _, files in os.walk(source) for f in files]
+    return sorted(
+        n for n in names
+        if os.path.splitext(n)[1].lower() in FORMATS_BY_EXTENSION
+        and not os.path.basename(n).startswith(".") and "__MACOSX/" not in n
+    )
+
+
+# Worker state for batch imports: (sha256, deck_name) already imported, and open archives
+_known_files: set = set()
+_open_zips: Dict[str, zipfile.ZipFile] = {}
+
+
+def _init_import_worker(known: set):
+    global _known_files
+    _known_files = known
+
+
+def _parse_one(source: str, name: str, is_zip: bool) -> Dict:
+    """
+    Worker entry point: hash and parse one deck file. Returns its result dict, with the
+    (question, answer) pairs, their dedup keys and note GUIDs under 'pairs'/'keys'/'guids'
+    when it needs writing.
+    """
+    t0 = time.perf_counter()
+    result = {"source": name, "deck_name": deck_name_for_file(name), "sha256": None, "status": "failed",
+              "cards": 0, "added": 0, "duplicates": 0, "error": None}
+    try:
+        if is_zip:
+            z = _open_zips.get(source) or _open_zips.setdefault(source, zipfile.ZipFile(source))
+            data = z.read(name)
+        else:
+            with open(name, "rb") as f:
+                data = f.read()
+        result["sha256"] = hashlib.sha256(data).hexdigest()
+        if (result["sha256"], result["deck_name"]) in _known_files:
+            result["status"] = "skipped"
+        else:
+            pairs, keys, guids = [], [], []
+            for card in iter_cards(io.BytesIO(data), format_for_filename(name)):
+                q, a = card.question, card.answer
+                if (isinstance(q, str) and "data:" in q) or (isinstance(a, str) and "data:" in a):
+                    # Inline base64 media goes to the media store; the card keeps its name
+                    q, a = extract_data_uris(q)[0], extract_data_uris(a)[0]
+                pairs.append((q, a))
+                keys.append(_card_hash({"question": q, "answer": a}))
+                guids.append(guid_for(q, a))
+            result.update(status="parsed", cards=len(pairs), pairs=pairs, keys=keys, guids=guids)
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def import_deck_files(
+    source: str,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+    force: bool = False,
+    batch_cards: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Import every card file (.json, .ndjson/.jsonl, .csv, .tsv/.tab/.txt) in a zip archive or
+    directory tree, one deck per file named after it (files with the same base name share a
+    deck). Files are read, hashed and parsed in worker processes; this process is the only
+    writer and commits parsed files in batches of about batch_cards cards
+    (IMPORT_WRITE_BATCH_CARDS). A file whose content was already imported into a deck of
+    that name is skipped unless force, so re-running after a failure or cancel only imports
+    what is missing. progress(done, total, result) is called as each file is settled.
+    Returns one result dict per file:
+    { 'source', 'deck_name', 'sha256', 'status' ('imported'|'skipped'|'failed'), 'cards',
+      'added', 'duplicates', 'error', 'seconds' }
+    """
+    is_zip = os.path.isfile(source) and zipfile.is_zipfile(source)
+    if not is_zip and not os.path.isdir(source):
+        raise Exception(f"{source} is neither a zip archive nor a directory.")
+    names = _list_deck_files(source, is_zip)
+    total = len(names)
+    known = set() if force else db_imported_file_keys()
+    batch_cards = max(1, int(batch_cards or IMPORT_WRITE_BATCH_CARDS))
+    results: List[Dict] = []
+    pending: List[Dict] = []
+    pending_cards = 0
+
+    def _done(result: Dict):
+        results.append(result)
+        if progress:
+            progress(len(results), total, result)
+
+    def _flush():
+        nonlocal pending_cards
+        batch = pending[:]
+        pending.clear()
+        pending_cards = 0
+        try:
+            written = db_import_deck_files(batch)
+        except Exception as e:
+            for r in batch:
+                _done({**_without_cards(r), "status": "failed", "error": str(e)})
+            return
+        for r, w in zip(batch, written):
+            _done({**_without_cards(r), "status": "imported", "added": w["added"], "duplicates": w["duplicates"]})
+
+    def _collect(result: Dict):
+        nonlocal pending_cards
+        if result["status"] != "parsed":
+            _done(result)
+            return
+        pending.append(result)
+        pending_cards += result["cards"]
+        if pending_cards >= batch_cards:
+            _flush()
+
+    workers = max(1, min(int(workers or IMPORT_WORKERS), total or 1))
+    if workers == 1:
+        _init_import_worker(known)
+        try:
+            for name in names:
+                _collect(_parse_one(source, name, is_zip))
+        finally:
+            z = _open_zips.pop(source, None)
+            if z is not None:
+                z.close()
+    else:
+        # spawn, as for exports: the app process runs many threads
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_import_worker, initargs=(known,)) as pool:
+            futures = [pool.submit(_parse_one, source, name, is_zip) for name in names]
+            try:
+                for fut in as_completed(futures):
+                    _collect(fut.result())
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    if pending:
+        _flush()
+    return results
+
+
+def _without_cards(result: Dict) -> Dict:
+    return {k: v for k, v in result.items() if k not in ("pairs", "keys", "guids")}
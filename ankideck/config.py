@@ -4,3 +4,73 @@ import os
 DECK_LIBRARY_DIR = "DeckLibrary"
 DATA_DIR = "data"
 DB_PATH = os.path.join(DATA_DIR, "decks.sqlite3")
+
+# SQLite connection tuning (see ankideck.db._connect)
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("ANKIDECK_DB_BUSY_TIMEOUT_MS", "5000"))
+# Negative values are KiB, positive values are pages (SQLite convention).
+DB_CACHE_SIZE = int(os.environ.get("ANKIDECK_DB_CACHE_SIZE", "-65536"))
+DB_MMAP_SIZE = int(os.environ.get("ANKIDECK_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("ANKIDECK_DB_STATEMENT_CACHE_SIZE", "256"))
+# Connections kept open per process and shared by all threads (sessions, jobs)
+DB_POOL_SIZE = max(1, int(os.environ.get("ANKIDECK_DB_POOL_SIZE", "8")))
+
+# Rows per executemany() batch when inserting cards
+DB_INSERT_BATCH_SIZE = int(os.environ.get("ANKIDECK_DB_INSERT_BATCH_SIZE", "1000"))
+
+# Export cache for .apkg files (see ankideck.db.db_export_deck_apkg)
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get("ANKIDECK_EXPORT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+EXPORT_CACHE_MAX_AGE_DAYS = float(os.environ.get("ANKIDECK_EXPORT_CACHE_MAX_AGE_DAYS", "30"))
+
+# Worker processes for bulk operations (see ankideck.bulk)
+EXPORT_WORKERS = int(os.environ.get("ANKIDECK_EXPORT_WORKERS", str(os.cpu_count() or 1)))
+IMPORT_WORKERS = int(os.environ.get("ANKIDECK_IMPORT_WORKERS", str(os.cpu_count() or 1)))
+# Imports (batch imports, background file imports) commit in transactions of about this many cards
+IMPORT_WRITE_BATCH_CARDS = int(os.environ.get("ANKIDECK_IMPORT_WRITE_BATCH_CARDS", "50000"))
+
+# Streaming ingestion (see ankideck.ingest): read size, and the upload size above
+# which the editor imports a file directly instead of loading it into the text box
+INGEST_READ_CHUNK_BYTES = int(os.environ.get("ANKIDECK_INGEST_READ_CHUNK_BYTES", str(1024 * 1024)))
+STREAMING_UPLOAD_THRESHOLD_BYTES = int(os.environ.get("ANKIDECK_STREAMING_UPLOAD_THRESHOLD_BYTES", str(5 * 1024 * 1024)))
+
+# Write buffer for CSV/TSV/NDJSON exports (see ankideck.textfmt)
+TEXT_EXPORT_BUFFER_BYTES = int(os.environ.get("ANKIDECK_TEXT_EXPORT_BUFFER_BYTES", str(1024 * 1024)))
+
+# Background job runner (see ankideck.jobs)
+JOB_WORKERS = int(os.environ.get("ANKIDECK_JOB_WORKERS", "2"))
+UPLOADS_DIR = os.path.join(DATA_DIR, "uploads")
+
+# Content-addressed media store (see ankideck.media); unreferenced files younger than
+# MEDIA_PRUNE_GRACE_HOURS are kept by db_prune_media (they may belong to an import in progress)
+MEDIA_DIR = os.environ.get("ANKIDECK_MEDIA_DIR", os.path.join(DATA_DIR, "media"))
+MEDIA_PRUNE_GRACE_HOURS = float(os.environ.get("ANKIDECK_MEDIA_PRUNE_GRACE_HOURS", "24"))
+
+# Opt-in db instrumentation and slow-query log (see ankideck.diagnostics)
+DIAGNOSTICS_ENABLED = os.environ.get("ANKIDECK_DIAGNOSTICS", "0") == "1"
+SLOW_QUERY_MS = float(os.environ.get("ANKIDECK_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("ANKIDECK_SLOW_QUERY_LOG_SIZE", "100"))
+# JSON and Prometheus text dumps, rewritten at most every DIAGNOSTICS_DUMP_INTERVAL_S seconds
+DIAGNOSTICS_DUMP_DIR = os.environ.get("ANKIDECK_DIAGNOSTICS_DUMP_DIR", os.path.join(DATA_DIR, "metrics"))
+DIAGNOSTICS_DUMP_INTERVAL_S = float(os.environ.get("ANKIDECK_DIAGNOSTICS_DUMP_INTERVAL_S", "15"))
+
+# Near-duplicate detection (see ankideck.neardup): MinHash signature length, LSH bands
+# (NEARDUP_NUM_PERM must be a multiple of NEARDUP_BANDS), default similarity threshold,
+# and the largest LSH bucket compared pairwise when building clusters
+NEARDUP_NUM_PERM = int(os.environ.get("ANKIDECK_NEARDUP_NUM_PERM", "128"))
+NEARDUP_BANDS = int(os.environ.get("ANKIDECK_NEARDUP_BANDS", "16"))
+NEARDUP_THRESHOLD = float(os.environ.get("ANKIDECK_NEARDUP_THRESHOLD", "0.8"))
+NEARDUP_MAX_BUCKET = int(os.environ.get("ANKIDECK_NEARDUP_MAX_BUCKET", "200"))
+
+# Process-wide read cache for deck lists, counts and card pages (see ankideck.readcache):
+# bounded by entries and by total cached rows; 0 entries disables it. Writes from other
+# processes are noticed via PRAGMA data_version, checked at most every READ_CACHE_CHECK_INTERVAL_S
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("ANKIDECK_READ_CACHE_MAX_ENTRIES", "512"))
+READ_CACHE_MAX_ROWS = int(os.environ.get("ANKIDECK_READ_CACHE_MAX_ROWS", "50000"))
+READ_CACHE_CHECK_INTERVAL_S = float(os.environ.get("ANKIDECK_READ_CACHE_CHECK_INTERVAL_S", "1.0"))
+
+# Artifact catalog (see ankideck.db.db_record_artifact): generated JSON snapshots, .apkg
+# exports and bundles. Retention per kind, applied only by an explicit prune (History tab or
+# `prune-artifacts`): keep the newest ARTIFACT_KEEP_PER_KIND, and drop those older than
+# ARTIFACT_MAX_AGE_DAYS or beyond ARTIFACT_MAX_BYTES (0 = no limit)
+ARTIFACT_KEEP_PER_KIND = int(os.environ.get("ANKIDECK_ARTIFACT_KEEP_PER_KIND", "0"))
+ARTIFACT_MAX_AGE_DAYS = float(os.environ.get("ANKIDECK_ARTIFACT_MAX_AGE_DAYS", "0"))
+ARTIFACT_MAX_BYTES = int(os.environ.get("ANKIDECK_ARTIFACT_MAX_BYTES", "0"))
@@ -1,14 +1,135 @@
 import re
-from typing import List, Dict, Tuple
+import json
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Union
+
+
+class Card:
+    """
+    One card as a slotted record (no per-instance __dict__). Reads like the old
+    {'id', 'question', 'answer'} dicts too — card["question"], card.get("id"), dict(card) —
+    so code written against dict cards keeps working. id is None for cards not yet saved.
+    """
+
+    __slots__ = ("id", "question", "answer")
+
+    def __init__(self, id: Optional[int], question, answer):
+        self.id = id
+        self.question = question
+        self.answer = answer
+
+    def keys(self) -> Tuple[str, ...]:
+        return ("question", "answer") if self.id is None else ("id", "question", "answer")
+
+    def __getitem__(self, key: str):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def to_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Card):
+            return (self.id, self.question, self.answer) == (other.id, other.question, other.answer)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Card(id={self.id!r}, question={self.question!r}, answer={self.answer!r})"
+
+
+class CardBatch:
+    """
+    Column-oriented cards: parallel ids (a compact int64 array), questions and answers.
+    Costs three pointers-or-less per card instead of one object per card, for full-deck
+    reads and exports. Iterating or indexing yields Card records; slicing yields a CardBatch.
+    """
+
+    __slots__ = ("ids", "questions", "answers")
+
+    def __init__(self, ids: Optional[Iterable[int]] = None, questions: Optional[List] = None, answers: Optional[List] = None):
+        self.ids = array("q", ids or ())
+        self.questions: List = questions if questions is not None else []
+        self.answers: List = answers if answers is not None else []
+        if not len(self.ids) == len(self.questions) == len(self.answers):
+            raise Exception("CardBatch columns must have the same length.")
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "CardBatch":
+        """Build from (id, question, answer) rows, e.g. a cursor."""
+        batch = cls()
+        ids, questions, answers = batch.ids.append, batch.questions.append, batch.answers.append
+        for r in rows:
+            ids(r[0])
+            questions(r[1])
+            answers(r[2])
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Card]:
+        return map(Card, self.ids, self.questions, self.answers)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return CardBatch(self.ids[index], self.questions[index], self.answers[index])
+        return Card(self.ids[index], self.questions[index], self.answers[index])
+
+    def pairs(self) -> Iterator[Tuple]:
+        """(question, answer) tuples without building Card records."""
+        return zip(self.questions, self.answers)
+
+    def to_dicts(self) -> List[Dict]:
+        return [{"id": i, "question": q, "answer": a} for i, q, a in zip(self.ids, self.questions, self.answers)]
+
+    def __repr__(self) -> str:
+        return f"<CardBatch of {len(self)} cards>"
+
+
+def cards_as_dicts(cards: Iterable) -> List[Dict]:
+    """Compatibility shim: a CardBatch, Card records or card dicts as a list of plain dicts."""
+    if isinstance(cards, CardBatch):
+        return cards.to_dicts()
+    return [c.to_dict() if isinstance(c, Card) else c for c in cards]
+
+
+def card_pairs(cards: Iterable) -> Iterator[Tuple]:
+    """(question, answer) tuples from a CardBatch, Card records or card dicts."""
+    if isinstance(cards, CardBatch):
+        return cards.pairs()
+    return ((c["question"], c["answer"]) for c in cards)
+
+
+def is_card(card) -> bool:
+    """True for a Card record or a dict with 'question' and 'answer' keys."""
+    return isinstance(card, Card) or (isinstance(card, dict) and 'question' in card and 'answer' in card)
 
 
 def validate_cards(cards):
+    if isinstance(cards, CardBatch):
+        return True
     if not isinstance(cards, list):
         return False
     for card in cards:
-        if not isinstance(card, dict):
-            return False
-        if 'question' not in card or 'answer' not in card:
+        if not is_card(card):
             return False
     return True
 
@@ -29,6 +150,25 @@ def _card_key(card: dict) -> Tuple[str, str]:
     return (_normalize_text(card.get("question")), _normalize_text(card.get("answer")))
 
 
+def _card_hash(card: dict) -> bytes:
+    """Return a compact 16-byte digest of _card_key, as stored in cards.qa_key."""
+    q, a = _card_key(card)
+    return hashlib.blake2b(f"{q}\x1f{a}".encode("utf-8"), digest_size=16).digest()
+
+
+_BASE91 = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!#$%&()*+,-./:;<=>?@[]^_`{|}~"
+
+
+def guid_for(*values) -> str:
+    """Same result as genanki.util.guid_for (Anki's base91 note GUID), computed faster."""
+    n = int.from_bytes(hashlib.sha256("__".join(str(v) for v in values).encode("utf-8")).digest()[:8], "big")
+    out = []
+    while n > 0:
+        n, r = divmod(n, 91)
+        out.append(_BASE91[r])
+    return "".join(reversed(out))
+
+
 def merge_cards(existing_cards: List[Dict], new_cards: List[Dict]):
     """Merge new_cards into existing_cards, deduplicating by question+answer (case-insensitive, trimmed).
     Returns (merged_list, stats_dict).
@@ -59,3 +199,71 @@ def merge_cards(existing_cards: List[Dict], new_cards: List[Dict]):
         "after": len(merged),
     }
     return merged, stats
+
+
+class ParsedCards:
+    """Result of CardPipeline.run: validated cards plus their dedup keys, or an error."""
+
+    __slots__ = ("cards", "keys", "unique", "error")
+
+    def __init__(self, cards=None, keys=None, unique=0, error=None):
+        self.cards: List[Dict] = cards or []
+        self.keys: List[bytes] = keys or []
+        self.unique: int = unique
+        self.error: Optional[str] = error
+
+    @property
+    def duplicates(self) -> int:
+        """Cards repeating an earlier card of the same input (same normalized question+answer)."""
+        return len(self.cards) - self.unique
+
+
+class CardPipeline:
+    """
+    Parse → validate → normalize → dedup-key a JSON cards text in a single pass.
+    Results are cached by a hash of the text (small LRU, shared by all callers), so the
+    Editor, Preview and Generate paths parse and normalize a given text only once.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, ParsedCards]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, text: str) -> ParsedCards:
+        text = (text or "").strip()
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            hit = self._cache.get(digest)
+            if hit is not None:
+                self._cache.move_to_end(digest)
+                return hit
+        result = self._process(text)
+        with self._lock:
+            self._cache[digest] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _process(text: str) -> ParsedCards:
+        if not text:
+            return ParsedCards(error="Please provide JSON data.")
+        try:
+            data = json.loads(text)
+        except Exception as e:
+            return ParsedCards(error=f"Invalid JSON. {e}")
+        if not isinstance(data, list):
+            return ParsedCards(error="JSON must be a list of objects with 'question' and 'answer' keys.")
+        cards, keys, seen = [], [], set()
+        for card in data:
+            if not is_card(card):
+                return ParsedCards(error="JSON must be a list of objects with 'question' and 'answer' keys.")
+            key = _card_hash(card)
+            cards.append(card)
+            keys.append(key)
+            seen.add(key)
+        return ParsedCards(cards, keys, len(seen))
+
+
+card_pipeline = CardPipeline()
@@ -1,30 +1,225 @@
 import os
+import re
 import json
+import logging
+import hashlib
 import sqlite3
+import mimetypes
 import datetime
-from typing import List, Dict, Optional
+import threading
+import queue
+from itertools import chain, islice
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 
-from .config import DATA_DIR, DB_PATH, DECK_LIBRARY_DIR
-from .core import validate_cards, merge_cards, _normalize_text
+from .config import (
+    DATA_DIR,
+    DB_PATH,
+    DECK_LIBRARY_DIR,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE,
+    DB_MMAP_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_POOL_SIZE,
+    DB_INSERT_BATCH_SIZE,
+    EXPORT_CACHE_MAX_BYTES,
+    EXPORT_CACHE_MAX_AGE_DAYS,
+    NEARDUP_THRESHOLD,
+    NEARDUP_MAX_BUCKET,
+    ARTIFACT_KEEP_PER_KIND,
+    ARTIFACT_MAX_AGE_DAYS,
+    ARTIFACT_MAX_BYTES,
+    MEDIA_DIR,
+    MEDIA_PRUNE_GRACE_HOURS,
+)
+from .core import Card, CardBatch, validate_cards, is_card, guid_for, _card_hash
+from .neardup import PARAMS_TAG as _NEARDUP_PARAMS, minhash, band_buckets, similarity, UnionFind
+from .media import media_path, media_refs, may_reference_media, extract_data_uris, store_media, MEDIA_NAME_RE
+from .diagnostics import instrumented, connection_factory, is_enabled as _diagnostics_enabled
+from . import readcache
+from .readcache import cached, writes
 from .services import get_deck_library_path
 
+_log = logging.getLogger(__name__)
+
 
 def _ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def _connect() -> sqlite3.Connection:
-    """Open a SQLite connection with row factory."""
+def _open_connection() -> sqlite3.Connection:
+    """Open a new SQLite connection with row factory and tuned pragmas."""
     _ensure_data_dir()
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+        factory=connection_factory(),
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA cache_size={int(DB_CACHE_SIZE)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 
+# Process-wide pool of idle connections, (conn, key) pairs. key is (pid, database path,
+# diagnostics on/off); when it changes, the pool is emptied and refilled with new ones.
+_pool: "queue.LifoQueue[Tuple[sqlite3.Connection, tuple]]" = queue.LifoQueue()
+_pool_lock = threading.Lock()
+_pool_key: Optional[tuple] = None
+_pool_open = 0  # connections for _pool_key, idle or checked out
+_held = threading.local()  # the connection this thread has checked out, and how deeply
+
+
+def _drain_pool():
+    """Close the idle connections (call with _pool_lock held)."""
+    while True:
+        try:
+            conn, key = _pool.get_nowait()
+        except queue.Empty:
+            return
+        if key[0] == os.getpid():
+            conn.close()
+
+
+def _checkout() -> Tuple[sqlite3.Connection, tuple]:
+    global _pool_key, _pool_open
+    key = (os.getpid(), os.path.abspath(DB_PATH), _diagnostics_enabled())
+    with _pool_lock:
+        if key != _pool_key:
+            # First use, a forked process, another database, or instrumentation switched on/off
+            _drain_pool()
+            _pool_key, _pool_open = key, 0
+        try:
+            return _pool.get_nowait()
+        except queue.Empty:
+            pass
+        can_open = _pool_open < DB_POOL_SIZE
+        if can_open:
+            _pool_open += 1
+    if can_open:
+        try:
+            return _open_connection(), key
+        except BaseException:
+            with _pool_lock:
+                if _pool_key == key:
+                    _pool_open -= 1
+            raise
+    try:
+        return _pool.get(timeout=DB_BUSY_TIMEOUT_MS / 1000.0)
+    except queue.Empty:
+        raise Exception(
+            f"All {DB_POOL_SIZE} database connections are busy. Try again, or raise ANKIDECK_DB_POOL_SIZE."
+        ) from None
+
+
+def _checkin(conn: sqlite3.Connection, key: tuple):
+    if conn.in_transaction:
+        conn.rollback()  # never hand a half-done transaction to the next user
+    with _pool_lock:
+        if key == _pool_key:
+            _pool.put((conn, key))
+            return
+    if key[0] == os.getpid():
+        conn.close()  # from before db_close() or a key change
+
+
+class _Holder:
+    __slots__ = ("conn", "key", "depth")
+
+    def __init__(self):
+        self.conn, self.key, self.depth = None, None, 0
+
+
+class _Lease:
+    """What _connect() returns; see there."""
+
+    __slots__ = ("transaction", "holder")
+
+    def __init__(self, transaction: bool):
+        self.transaction = transaction
+        self.holder = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        holder = getattr(_held, "holder", None)
+        if holder is None:
+            holder = _held.holder = _Holder()
+        if holder.depth == 0:
+            holder.conn, holder.key = _checkout()
+        holder.depth += 1
+        self.holder = holder
+        return holder.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        holder = self.holder
+        try:
+            if self.transaction:
+                holder.conn.__exit__(exc_type, exc, tb)  # commit, or roll back on error
+        finally:
+            holder.depth -= 1
+            if holder.depth == 0:
+                conn, key = holder.conn, holder.key
+                holder.conn = holder.key = None
+                _checkin(conn, key)
+        return False
+
+
+def _connect(transaction: bool = True) -> _Lease:
+    """Check a connection out of the process-wide pool for a ``with`` block.
+
+    ``with _connect() as conn:`` commits at the end of the block, or rolls back if it
+    raises, then returns the connection to the pool; connections stay open, so their
+    pragmas and statement cache are set up once, not per thread or per Streamlit rerun.
+    At most DB_POOL_SIZE are open; a thread beyond that waits for one to be returned.
+    Nested blocks in the same thread share the outer block's connection. With
+    transaction=False the block leaves commit/rollback to its caller (for generators
+    that read while a caller's transaction may be open).
+    """
+    return _Lease(transaction)
+
+
+def db_close():
+    """
+    Close the pooled connections (ones checked out are closed when returned). The next
+    _connect() opens new ones, and the next db_init() checks the schema again.
+    """
+    global _pool_key, _pool_open
+    with _pool_lock:
+        _drain_pool()
+        _pool_key, _pool_open = None, 0
+    with _init_lock:
+        _initialized.clear()
+    readcache.clear()
+
+
+_init_lock = threading.Lock()
+_initialized: set = set()  # (pid, database path) pairs db_init has set up in this process
+
+
 def db_init():
-    """Initialize the database schema and migrate any JSON library decks once."""
+    """
+    Initialize the database schema and run pending migrations (e.g. the one-time DeckLibrary
+    JSON import). This runs once per process and database file: later calls, such as the
+    one on every Streamlit rerun, return without running any SQL.
+    """
+    key = (os.getpid(), os.path.abspath(DB_PATH))
+    if key in _initialized and os.path.exists(DB_PATH):
+        return
+    with _init_lock:
+        if key in _initialized and os.path.exists(DB_PATH):
+            return
+        _init_schema()
+        _initialized.add(key)
+
+
+def _init_schema():
     _ensure_data_dir()
     with _connect() as conn:
+        changes = conn.total_changes
         cur = conn.cursor()
         # Core tables
         cur.execute(
@@ -33,7 +228,10 @@ def db_init():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL UNIQUE,
                 created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
+                updated_at TEXT NOT NULL,
+                card_count INTEGER NOT NULL DEFAULT 0,
+                last_card_at TEXT,
+                revision INTEGER NOT NULL DEFAULT 0
             );
             """
         )
@@ -44,6 +242,7 @@ def db_init():
                 deck_id INTEGER NOT NULL,
                 question TEXT NOT NULL,
                 answer TEXT NOT NULL,
+                qa_key BLOB,
                 created_at TEXT NOT NULL,
                 updated_at TEXT NOT NULL,
                 FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
@@ -58,17 +257,541 @@ def db_init():
             );
             """
         )
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards(deck_id);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_q ON cards(question);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_a ON cards(answer);")
+        # Also serves the triggers' newest-card lookup (MAX(created_at) per deck)
+        cur.execute("DROP INDEX IF EXISTS idx_cards_deck")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_created ON cards(deck_id, created_at);")
+
+        # Denormalized per-deck card counters, kept in sync by triggers
+        _add_column_if_missing(cur, "decks", "card_count", "INTEGER NOT NULL DEFAULT 0")
+        _add_column_if_missing(cur, "decks", "last_card_at", "TEXT")
+        _add_column_if_missing(cur, "decks", "revision", "INTEGER NOT NULL DEFAULT 0")
+        _add_column_if_missing(cur, "cards", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+        if _meta_get(cur, "card_triggers_version") != _CARD_TRIGGERS_VERSION:
+            for name in ("trg_cards_count_ai", "trg_cards_count_ad", "trg_cards_count_au", "trg_cards_rev_au"):
+                cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+            _meta_set(cur, "card_triggers_version", _CARD_TRIGGERS_VERSION)
+            # Earlier triggers left last_card_at stale after deletes and moves
+            _recount_decks(cur)
+        _create_card_count_triggers(cur)
+        if _meta_get(cur, "card_count_backfilled") != "1":
+            _recount_decks(cur)
+            _meta_set(cur, "card_count_backfilled", "1")
+
+        # Persisted dedup key: hash of normalized question+answer, unique per deck
+        _add_column_if_missing(cur, "cards", "qa_key", "BLOB")
+        # Duplicate cards the qa_key backfill took out of their deck, kept for review
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cards_quarantine (
+                card_id INTEGER PRIMARY KEY,
+                deck_id INTEGER NOT NULL,
+                kept_card_id INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                quarantined_at TEXT NOT NULL
+            );
+            """
+        )
+        if _meta_get(cur, "qa_key_backfilled") != "1":
+            _backfill_card_keys(conn)
+            _meta_set(cur, "qa_key_backfilled", "1")
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_deck_key ON cards(deck_id, qa_key);")
+        cur.execute("DROP INDEX IF EXISTS idx_cards_q;")
+        cur.execute("DROP INDEX IF EXISTS idx_cards_a;")
+
+        # Stable Anki note GUID, fixed when the card is created and kept across edits
+        _add_column_if_missing(cur, "cards", "guid", "TEXT")
+        if _meta_get(cur, "guid_backfilled") != "1":
+            _backfill_card_guids(conn)
+            _meta_set(cur, "guid_backfilled", "1")
+        # Cards changed since an export, for delta exports
+        cur.execute("DROP INDEX IF EXISTS idx_cards_deck_updated;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_seq ON cards(deck_id, change_seq);")
+
+        # Media store registry (files are in MEDIA_DIR, see ankideck.media) and which cards use what
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mime TEXT,
+                created_at TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS card_media (
+                card_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY(card_id, name)
+            ) WITHOUT ROWID;
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_card_media_name ON card_media(name);")
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_cards_media_ad AFTER DELETE ON cards BEGIN
+                DELETE FROM card_media WHERE card_id = OLD.id;
+            END;
+            """
+        )
+        # Inline data: URIs in cards stored before the media store existed are moved into it only
+        # on request (db_extract_stored_media): it rewrites card text, which bumps change_seq
+
+        # Full-text index over card questions/answers (skipped if SQLite lacks FTS5)
+        if _create_fts(cur) and _meta_get(cur, "fts_built") != "1":
+            cur.execute("INSERT INTO cards_fts(cards_fts) VALUES('rebuild')")
+            _meta_set(cur, "fts_built", "1")
+
+        # Exported .apkg artifacts, valid while the deck's revision and name are unchanged
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS export_cache (
+                deck_id INTEGER PRIMARY KEY,
+                deck_name TEXT NOT NULL,
+                revision INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                created_at TEXT NOT NULL,
+                last_used_at TEXT NOT NULL
+            );
+            """
+        )
+
+        # Every .apkg export of a deck with its watermark: the deck's revision (change sequence)
+        # it includes everything up to
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deck_exports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                deck_id INTEGER NOT NULL,
+                mode TEXT NOT NULL,
+                since_export_id INTEGER,
+                change_seq INTEGER NOT NULL DEFAULT 0,
+                cards INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_deck_exports_deck ON deck_exports(deck_id, id);")
+        _add_column_if_missing(cur, "deck_exports", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+        if _meta_get(cur, "change_seq_backfilled") != "1":
+            _backfill_change_seq(cur)
+            _meta_set(cur, "change_seq_backfilled", "1")
+
+        # Catalog of generated files (JSON snapshots, .apkg exports, bundles) for the History tab
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT,
+                deck_id INTEGER,
+                deck_name TEXT,
+                created_at TEXT NOT NULL
+            );
+            """
+        )
+        # managed = 0: found on disk by _scan_artifact_dirs, not written by us; never deleted
+        _add_column_if_missing(cur, "artifacts", "managed", "INTEGER NOT NULL DEFAULT 1")
+        if _meta_get(cur, "artifacts_managed") != "1":
+            cur.execute("UPDATE artifacts SET managed = 0 WHERE sha256 IS NULL")
+            _meta_set(cur, "artifacts_managed", "1")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_kind ON artifacts(kind, id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_deck ON artifacts(deck_id);")
+        if _meta_get(cur, "artifacts_scanned") != "1":
+            _scan_artifact_dirs(cur)
+            _meta_set(cur, "artifacts_scanned", "1")
+
+        # Deck files brought in by bulk.import_deck_files, by content hash, so re-runs skip them
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS imported_files (
+                sha256 TEXT NOT NULL,
+                deck_name TEXT NOT NULL,
+                deck_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                cards INTEGER NOT NULL,
+                added INTEGER NOT NULL,
+                imported_at TEXT NOT NULL,
+                PRIMARY KEY(sha256, deck_name)
+            ) WITHOUT ROWID;
+            """
+        )
+
+        # Background jobs (see ankideck.jobs)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                label TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress_done INTEGER NOT NULL DEFAULT 0,
+                progress_total INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                owner_pid INTEGER
+            );
+            """
+        )
+        # The process running a job; its jobs are only failed as interrupted once it is gone
+        _add_column_if_missing(cur, "jobs", "owner_pid", "INTEGER")
+
+        # Near-duplicate index (see ankideck.neardup): a MinHash signature per card and its
+        # LSH buckets, filled lazily by db_index_near_duplicates
+        cur.execute("CREATE TABLE IF NOT EXISTS card_minhash (card_id INTEGER PRIMARY KEY, sig BLOB NOT NULL);")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS card_lsh (
+                bucket INTEGER NOT NULL,
+                card_id INTEGER NOT NULL,
+                PRIMARY KEY(bucket, card_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_card_lsh_card ON card_lsh(card_id);")
+        _create_minhash_triggers(cur)
+        if _meta_get(cur, "minhash_params") != _NEARDUP_PARAMS:
+            # Signature length or banding changed: everything is re-indexed on demand
+            cur.execute("DELETE FROM card_minhash")
+            cur.execute("DELETE FROM card_lsh")
+            _meta_set(cur, "minhash_params", _NEARDUP_PARAMS)
 
         # One-time migration from DeckLibrary JSONs
-        cur.execute("SELECT value FROM app_meta WHERE key='json_migrated'")
-        row = cur.fetchone()
-        if not row or row[0] != "1":
+        if _meta_get(cur, "json_migrated") != "1":
             _migrate_json_library_to_db(conn)
-            cur.execute("INSERT OR REPLACE INTO app_meta(key, value) VALUES('json_migrated', '1')")
+            _meta_set(cur, "json_migrated", "1")
         conn.commit()
+        if conn.total_changes != changes:
+            # Migrations or recounts ran; a no-op check of an existing library keeps the read cache
+            readcache.invalidate()
+
+
+def _meta_get(cur: sqlite3.Cursor, key: str) -> Optional[str]:
+    cur.execute("SELECT value FROM app_meta WHERE key = ?", (key,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _meta_set(cur: sqlite3.Cursor, key: str, value: str):
+    cur.execute("INSERT OR REPLACE INTO app_meta(key, value) VALUES(?, ?)", (key, value))
+
+
+def _meta_incr(cur: sqlite3.Cursor, key: str, by: int = 1):
+    cur.execute(
+        """
+        INSERT INTO app_meta(key, value) VALUES(?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value
+        """,
+        (key, str(by)),
+    )
+
+
+def _add_column_if_missing(cur: sqlite3.Cursor, table: str, column: str, decl: str):
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {r[1] for r in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# Bump when the trigger bodies below change; db_init then drops and recreates them.
+_CARD_TRIGGERS_VERSION = "5"
+
+
+def _create_card_count_triggers(cur: sqlite3.Cursor):
+    """
+    Keep decks.card_count/last_card_at in step with every insert, delete and move of a card,
+    and bump decks.revision on any change to a deck's cards (used by the export cache).
+    A card edited or moved in is stamped with its deck's new revision (cards.change_seq),
+    so revision doubles as the deck's change sequence for delta exports. Inserts set
+    change_seq themselves (see _INSERT_CARD_SQL), sparing the bulk-insert path a second
+    write per row; only rows inserted without one (e.g. by another tool) are stamped here.
+    last_card_at is the newest created_at in the deck. Only when a deck loses a card that
+    new is the next newest looked up (an index seek on idx_cards_deck_created).
+    """
+    # A card moved in may be older than the deck's newest one
+    newer = "CASE WHEN last_card_at >= NEW.created_at THEN last_card_at ELSE NEW.created_at END"
+    remaining = (
+        "CASE WHEN OLD.created_at < last_card_at THEN last_card_at "
+        "ELSE (SELECT MAX(c.created_at) FROM cards c WHERE c.deck_id = OLD.deck_id) END"
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_count_ai AFTER INSERT ON cards BEGIN
+            UPDATE decks SET card_count = card_count + 1, last_card_at = {newer},
+                             revision = revision + 1
+            WHERE id = NEW.deck_id;
+            UPDATE cards SET change_seq = (SELECT revision FROM decks WHERE id = NEW.deck_id)
+            WHERE NEW.change_seq = 0 AND id = NEW.id;
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_count_ad AFTER DELETE ON cards BEGIN
+            UPDATE decks SET card_count = card_count - 1, last_card_at = {remaining},
+                             revision = revision + 1
+            WHERE id = OLD.deck_id;
+        END;
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_count_au AFTER UPDATE OF deck_id ON cards
+        WHEN OLD.deck_id <> NEW.deck_id BEGIN
+            UPDATE decks SET card_count = card_count - 1, last_card_at = {remaining},
+                             revision = revision + 1
+            WHERE id = OLD.deck_id;
+            UPDATE decks SET card_count = card_count + 1, last_card_at = {newer},
+                             revision = revision + 1
+            WHERE id = NEW.deck_id;
+            UPDATE cards SET change_seq = (SELECT revision FROM decks WHERE id = NEW.deck_id) WHERE id = NEW.id;
+        END;
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cards_rev_au AFTER UPDATE OF question, answer ON cards BEGIN
+            UPDATE decks SET revision = revision + 1 WHERE id = NEW.deck_id;
+            UPDATE cards SET change_seq = (SELECT revision FROM decks WHERE id = NEW.deck_id) WHERE id = NEW.id;
+        END;
+        """
+    )
+
+
+def _create_minhash_triggers(cur: sqlite3.Cursor):
+    """Drop a card's near-duplicate index rows when it is deleted or its text changes (re-indexed later)."""
+    for name, event in (("trg_cards_minhash_ad", "DELETE"), ("trg_cards_minhash_au", "UPDATE OF question, answer")):
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON cards BEGIN
+                DELETE FROM card_minhash WHERE card_id = OLD.id;
+                DELETE FROM card_lsh WHERE card_id = OLD.id;
+            END;
+            """
+        )
+
+
+def _recount_decks(cur: sqlite3.Cursor, deck_ids: Optional[List[int]] = None):
+    """Recompute card_count/last_card_at from the cards table (all decks, or only deck_ids)."""
+    sql = """
+        UPDATE decks SET
+            card_count = (SELECT COUNT(1) FROM cards c WHERE c.deck_id = decks.id),
+            last_card_at = (SELECT MAX(c.created_at) FROM cards c WHERE c.deck_id = decks.id)
+    """
+    if deck_ids is None:
+        cur.execute(sql)
+    else:
+        cur.executemany(sql + " WHERE id = ?", [(i,) for i in deck_ids])
+
+
+def _create_fts(cur: sqlite3.Cursor) -> bool:
+    """Create the cards_fts external-content FTS5 table and its sync triggers. Returns False if FTS5 is unavailable."""
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+                question, answer,
+                content='cards', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            """
+        )
+    except sqlite3.OperationalError:
+        return False
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_ai AFTER INSERT ON cards BEGIN
+            INSERT INTO cards_fts(rowid, question, answer) VALUES (NEW.id, NEW.question, NEW.answer);
+        END;
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_ad AFTER DELETE ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, question, answer) VALUES ('delete', OLD.id, OLD.question, OLD.answer);
+        END;
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_au AFTER UPDATE OF question, answer ON cards BEGIN
+            INSERT INTO cards_fts(cards_fts, rowid, question, answer) VALUES ('delete', OLD.id, OLD.question, OLD.answer);
+            INSERT INTO cards_fts(rowid, question, answer) VALUES (NEW.id, NEW.question, NEW.answer);
+        END;
+        """
+    )
+    return True
+
+
+def _backfill_card_keys(conn: sqlite3.Connection) -> int:
+    """Fill cards.qa_key for rows that predate it and move exact duplicates within a deck aside.
+
+    Older databases could hold the same normalized question+answer twice in one deck
+    (the JSON library migration did not deduplicate); the oldest copy is kept so the
+    unique (deck_id, qa_key) index can be built, and the others are moved to
+    cards_quarantine (see db_list_quarantined_cards). Returns how many were moved.
+    """
+    conn.create_function(
+        "ankideck_card_key", 2, lambda q, a: _card_hash({"question": q, "answer": a}), deterministic=True
+    )
+    cur = conn.cursor()
+    now = datetime.datetime.now().isoformat()
+    cur.execute("UPDATE cards SET qa_key = ankideck_card_key(question, answer) WHERE qa_key IS NULL")
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO cards_quarantine(card_id, deck_id, kept_card_id, question, answer, created_at, quarantined_at)
+        SELECT c.id, c.deck_id, k.kept_id, c.question, c.answer, c.created_at, ?
+        FROM (
+            SELECT deck_id, qa_key, MIN(id) AS kept_id FROM cards GROUP BY deck_id, qa_key HAVING COUNT(1) > 1
+        ) k
+        JOIN cards c ON c.deck_id = k.deck_id AND c.qa_key = k.qa_key AND c.id <> k.kept_id
+        """,
+        (now,),
+    )
+    cur.execute(
+        """
+        SELECT q.deck_id, d.name, COUNT(1) FROM cards_quarantine q LEFT JOIN decks d ON d.id = q.deck_id
+        WHERE q.quarantined_at = ? GROUP BY q.deck_id ORDER BY q.deck_id
+        """,
+        (now,),
+    )
+    for deck_id, name, count in cur.fetchall():
+        _log.warning(
+            "Moved %d duplicate card(s) of deck %r (id %d) to cards_quarantine; the oldest copy of each was kept.",
+            count, name, deck_id,
+        )
+    cur.execute("DELETE FROM cards WHERE id IN (SELECT card_id FROM cards_quarantine)")
+    return cur.rowcount
+
+
+def _backfill_card_guids(conn: sqlite3.Connection):
+    """Give cards that predate cards.guid the GUID earlier exports derived from their current fields."""
+    conn.create_function("ankideck_guid", 2, guid_for, deterministic=True)
+    conn.execute("UPDATE cards SET guid = ankideck_guid(question, answer) WHERE guid IS NULL")
+
+
+def _backfill_change_seq(cur: sqlite3.Cursor):
+    """
+    Number existing cards and exports (once) so that "changed after an export" keeps the
+    meaning the old updated_at watermarks gave it. Within a deck, a card's change_seq is
+    the number of exports with an older watermark, an export's is the number with a
+    watermark up to its own, minus one; the deck's revision is raised past both.
+    """
+    cur.execute("PRAGMA table_info(deck_exports)")
+    if "watermark" not in {r[1] for r in cur.fetchall()}:
+        return  # created with change_seq: nothing to convert
+    cur.execute(
+        """
+        UPDATE deck_exports SET change_seq = (
+            SELECT COUNT(1) - 1 FROM deck_exports e
+            WHERE e.deck_id = deck_exports.deck_id AND COALESCE(e.watermark, '') <= COALESCE(deck_exports.watermark, '')
+        )
+        """
+    )
+    cur.execute(
+        """
+        UPDATE cards SET change_seq = (
+            SELECT COUNT(1) FROM deck_exports e WHERE e.deck_id = cards.deck_id AND COALESCE(e.watermark, '') < cards.updated_at
+        )
+        WHERE deck_id IN (SELECT deck_id FROM deck_exports)
+        """
+    )
+    cur.execute(
+        "UPDATE decks SET revision = MAX(revision, (SELECT COUNT(1) FROM deck_exports e WHERE e.deck_id = decks.id))"
+    )
+
+
+def _extract_stored_data_uris(cur: sqlite3.Cursor) -> Dict[int, int]:
+    """Move base64 data: URIs already in the cards table into the media store. Returns deck id -> cards rewritten."""
+    rewritten: Dict[int, int] = {}
+    cur.execute("SELECT id, deck_id FROM cards WHERE question LIKE '%data:%' OR answer LIKE '%data:%'")
+    for card_id, deck_id in cur.fetchall():
+        cur.execute("SELECT question, answer FROM cards WHERE id = ?", (card_id,))
+        q, a = cur.fetchone()
+        new_q, stored_q = extract_data_uris(q)
+        new_a, stored_a = extract_data_uris(a)
+        if not (stored_q or stored_a):
+            continue
+        # OR IGNORE: a card that now equals another one in its deck keeps its inline data
+        cur.execute(
+            "UPDATE OR IGNORE cards SET question = ?, answer = ?, qa_key = ? WHERE id = ?",
+            (new_q, new_a, _card_hash({"question": new_q, "answer": new_a}), card_id),
+        )
+        if cur.rowcount:
+            _link_card_media(cur, card_id, media_refs(new_q) + media_refs(new_a))
+            rewritten[deck_id] = rewritten.get(deck_id, 0) + 1
+    return rewritten
+
+
+def _register_media(cur: sqlite3.Cursor, stored: List[Dict]):
+    now = datetime.datetime.now().isoformat()
+    cur.executemany(
+        "INSERT OR IGNORE INTO media(name, size, mime, created_at) VALUES(?, ?, ?, ?)",
+        [(m["name"], m["size"], m["mime"], now) for m in stored],
+    )
+
+
+def _link_card_media(cur: sqlite3.Cursor, card_id: int, names: List[str]):
+    """Record that a card references names, registering stored files not in the media table yet."""
+    if not names:
+        return
+    cur.executemany("INSERT OR IGNORE INTO card_media(card_id, name) VALUES(?, ?)", [(card_id, n) for n in names])
+    stored = []
+    for name in names:
+        try:
+            size = os.path.getsize(media_path(name))
+        except OSError:
+            continue  # referenced but not in the store (yet)
+        stored.append({"name": name, "size": size, "mime": mimetypes.guess_type(name)[0]})
+    _register_media(cur, stored)
+
+
+def _link_row_media(cur: sqlite3.Cursor, rows: List[tuple]):
+    """Record the media references of inserted cards rows (looked up by deck and qa_key; rare, so per row)."""
+    for row in rows:
+        # Plain-text rows (most of a bulk import) skip the regex and the lookup
+        if not (may_reference_media(row[1]) or may_reference_media(row[2])):
+            continue
+        names = media_refs(row[1]) + media_refs(row[2])
+        if names:
+            cur.execute("SELECT id FROM cards WHERE deck_id = ? AND qa_key = ?", (row[0], row[3]))
+            hit = cur.fetchone()
+            if hit:
+                _link_card_media(cur, hit[0], names)
+
+
+_ARTIFACT_DIRS = (("JSONs", ".json", "json"), ("Decks", ".apkg", "apkg"), ("Decks", ".zip", "bundle"))
+
+
+def _scan_artifact_dirs(cur: sqlite3.Cursor):
+    """One-time catalog of files generated before the catalog existed (oldest first; not hashed)."""
+    found = []
+    for directory, ext, kind in _ARTIFACT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.lower().endswith(ext):
+                st = entry.stat()
+                found.append((st.st_mtime, kind, os.path.join(directory, entry.name), st.st_size))
+    found.sort()
+    cur.executemany(
+        "INSERT OR IGNORE INTO artifacts(kind, path, size, mtime, created_at, managed) VALUES(?, ?, ?, ?, ?, 0)",
+        [(kind, path, size, mtime, datetime.datetime.fromtimestamp(mtime).isoformat()) for mtime, kind, path, size in found],
+    )
 
 
 def _migrate_json_library_to_db(conn: sqlite3.Connection):
@@ -100,14 +823,12 @@ def _migrate_json_library_to_db(conn: sqlite3.Connection):
             (deck_name, now, now),
         )
         deck_id = cur.lastrowid
-        for c in cards:
-            cur.execute(
-                "INSERT INTO cards(deck_id, question, answer, created_at, updated_at) VALUES(?, ?, ?, ?, ?)",
-                (deck_id, c.get("question", ""), c.get("answer", ""), now, now),
-            )
+        _insert_card_rows(cur, _card_rows(deck_id, cards, now))
     conn.commit()
 
 
+@instrumented
+@cached
 def db_list_decks(search: str = "") -> List[Dict]:
     """Return a list of decks with card counts, optionally filtered by search substring (case-insensitive)."""
     with _connect() as conn:
@@ -116,8 +837,7 @@ def db_list_decks(search: str = "") -> List[Dict]:
             like = f"%{search.lower()}%"
             cur.execute(
                 """
-                SELECT d.id, d.name,
-                       COALESCE((SELECT COUNT(1) FROM cards c WHERE c.deck_id = d.id), 0) AS card_count,
+                SELECT d.id, d.name, d.card_count, d.last_card_at,
                        d.created_at, d.updated_at
                 FROM decks d
                 WHERE lower(d.name) LIKE ?
@@ -128,8 +848,7 @@ def db_list_decks(search: str = "") -> List[Dict]:
         else:
             cur.execute(
                 """
-                SELECT d.id, d.name,
-                       COALESCE((SELECT COUNT(1) FROM cards c WHERE c.deck_id = d.id), 0) AS card_count,
+                SELECT d.id, d.name, d.card_count, d.last_card_at,
                        d.created_at, d.updated_at
                 FROM decks d
                 ORDER BY d.updated_at DESC
@@ -139,6 +858,65 @@ def db_list_decks(search: str = "") -> List[Dict]:
         return [dict(r) for r in rows]
 
 
+def _fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: every word quoted, all required, last word as a prefix."""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return ""
+    terms = ['"%s"' % w for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+@instrumented
+def db_search_cards(query: str, deck_id: Optional[int] = None, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Full-text search over card questions and answers, across all decks or within deck_id.
+    Returns best matches first as dicts with id, deck_id, deck_name, question, answer and
+    question_snippet/answer_snippet (matches wrapped in **bold** markers).
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    deck_filter = "" if deck_id is None else "AND c.deck_id = ?"
+    deck_args = () if deck_id is None else (deck_id,)
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cards_fts'")
+        if cur.fetchone():
+            cur.execute(
+                f"""
+                SELECT c.id, c.deck_id, d.name AS deck_name, c.question, c.answer,
+                       snippet(cards_fts, 0, '**', '**', '…', 12) AS question_snippet,
+                       snippet(cards_fts, 1, '**', '**', '…', 12) AS answer_snippet
+                FROM cards_fts
+                JOIN cards c ON c.id = cards_fts.rowid
+                JOIN decks d ON d.id = c.deck_id
+                WHERE cards_fts MATCH ? {deck_filter}
+                ORDER BY bm25(cards_fts)
+                LIMIT ? OFFSET ?
+                """,
+                (match, *deck_args, int(limit), int(offset)),
+            )
+        else:
+            # No FTS5 in this SQLite build: fall back to a (slow) substring scan
+            like = f"%{query.strip().lower()}%"
+            cur.execute(
+                f"""
+                SELECT c.id, c.deck_id, d.name AS deck_name, c.question, c.answer,
+                       c.question AS question_snippet, c.answer AS answer_snippet
+                FROM cards c JOIN decks d ON d.id = c.deck_id
+                WHERE (lower(c.question) LIKE ? OR lower(c.answer) LIKE ?) {deck_filter}
+                ORDER BY c.id
+                LIMIT ? OFFSET ?
+                """,
+                (like, like, *deck_args, int(limit), int(offset)),
+            )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@instrumented
+@cached
 def db_get_deck_by_name(name: str) -> Optional[Dict]:
     with _connect() as conn:
         cur = conn.cursor()
@@ -147,6 +925,8 @@ def db_get_deck_by_name(name: str) -> Optional[Dict]:
         return dict(row) if row else None
 
 
+@instrumented
+@writes
 def db_create_deck(name: str) -> Dict:
     name = name.strip()
     if not name:
@@ -163,105 +943,1117 @@ def db_create_deck(name: str) -> Dict:
         return {"id": deck_id, "name": name, "created_at": now, "updated_at": now}
 
 
-def db_get_deck_cards(deck_id: int) -> List[Dict]:
+@instrumented
+def db_get_deck_cards(deck_id: int) -> CardBatch:
+    """
+    All cards of a deck, ordered by id, as a column-oriented CardBatch. Iterating it yields
+    Card records that read like the old card dicts; use cards_as_dicts() for real dicts.
+    """
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, question, answer FROM cards WHERE deck_id = ? ORDER BY id ASC", (deck_id,))
+        return CardBatch.from_rows(cur)
+
+
+@instrumented
+@cached
+def db_get_deck_cards_page(deck_id: int, after_id: int = 0, limit: int = 20) -> List[Card]:
+    """
+    Return up to `limit` cards of a deck with id > after_id, ordered by id.
+    Pass the last id of one page as after_id to get the next (keyset pagination),
+    so every page costs the same regardless of deck size or page number.
+    """
     with _connect() as conn:
         cur = conn.cursor()
         cur.execute(
-            "SELECT id, question, answer, created_at, updated_at FROM cards WHERE deck_id = ? ORDER BY id ASC",
-            (deck_id,),
+            "SELECT id, question, answer FROM cards WHERE deck_id = ? AND id > ? ORDER BY id ASC LIMIT ?",
+            (deck_id, int(after_id or 0), int(limit)),
         )
-        rows = cur.fetchall()
-        return [{"id": r[0], "question": r[1], "answer": r[2]} for r in rows]
+        return [Card(*r) for r in cur.fetchall()]
+
+
+@instrumented
+@cached
+def db_count_deck_cards(deck_id: int) -> int:
+    """Return the number of cards in a deck (from the trigger-maintained decks.card_count)."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT card_count FROM decks WHERE id = ?", (deck_id,))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
 
 
-def db_get_deck_cards_by_name(name: str) -> List[Dict]:
+@instrumented
+def db_get_deck_cards_by_name(name: str) -> CardBatch:
     deck = db_get_deck_by_name(name)
     if not deck:
-        return []
+        return CardBatch()
     return db_get_deck_cards(deck["id"])  # type: ignore[index]
 
 
-def _card_key(card: dict) -> tuple:
-    return (_normalize_text(card.get("question")), _normalize_text(card.get("answer")))
+# change_seq is the revision the deck reaches once this row's insert trigger has run
+_INSERT_CARD_SQL = (
+    "INSERT OR IGNORE INTO cards(deck_id, question, answer, qa_key, guid, created_at, updated_at, change_seq) "
+    "VALUES(?1, ?, ?, ?, ?, ?, ?, (SELECT revision + 1 FROM decks WHERE id = ?1))"
+)
+
+_bad_cards_msg = "New cards JSON is not structured correctly. Must contain 'question' and 'answer'."
+
+
+def _card_rows(
+    deck_id: int, cards: Iterable[Dict], now: str, strict: bool = False, keys: Optional[Iterable[bytes]] = None
+) -> Iterator[tuple]:
+    """
+    Yield cards-table rows for cards. With strict=True, a malformed card raises instead of importing blanks.
+    keys, if given, are precomputed _card_hash values parallel to cards (e.g. from CardPipeline).
+    base64 data: URIs are moved into the media store and replaced by the stored file's name.
+    """
+    key_iter = iter(keys) if keys is not None else None
+    for c in cards:
+        if strict and not is_card(c):
+            raise Exception(_bad_cards_msg)
+        key = next(key_iter) if key_iter is not None else None
+        q, a = c.get("question", ""), c.get("answer", "")
+        if (isinstance(q, str) and "data:" in q) or (isinstance(a, str) and "data:" in a):
+            q = extract_data_uris(q)[0]
+            a = extract_data_uris(a)[0]
+            key = None  # the text changed: key the stored text
+        if key is None:
+            key = _card_hash({"question": q, "answer": a})
+        yield (deck_id, q, a, key, guid_for(q, a), now, now)
+
+
+def _insert_card_rows(cur: sqlite3.Cursor, rows: Iterable[tuple], batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Insert rows in executemany chunks of batch_size, ignoring duplicates caught by the
+    unique (deck_id, qa_key) index. Returns (rows_seen, rows_added).
+    """
+    batch_size = max(1, int(batch_size or DB_INSERT_BATCH_SIZE))
+    it = iter(rows)
+    seen = added = 0
+    while True:
+        chunk = list(islice(it, batch_size))
+        if not chunk:
+            break
+        cur.executemany(_INSERT_CARD_SQL, chunk)
+        seen += len(chunk)
+        added += cur.rowcount
+        _link_row_media(cur, chunk)
+    return seen, added
 
 
-def db_add_cards(deck_id: int, new_cards: List[Dict]) -> Dict:
+@instrumented
+@writes
+def db_add_cards(deck_id: int, new_cards: List[Dict], skip_near_duplicates: bool = False) -> Dict:
     """Merge new_cards into deck, deduplicating by normalized question+answer. Returns stats dict."""
     if not validate_cards(new_cards):
-        raise Exception("New cards JSON is not structured correctly. Must contain 'question' and 'answer'.")
+        raise Exception(_bad_cards_msg)
+    return db_add_cards_bulk(deck_id, new_cards, skip_near_duplicates=skip_near_duplicates)
+
+
+@instrumented
+@writes
+def db_add_cards_bulk(
+    deck_id: int,
+    cards: Iterable[Dict],
+    batch_size: Optional[int] = None,
+    keys: Optional[Iterable[bytes]] = None,
+    skip_near_duplicates: bool = False,
+    near_threshold: Optional[float] = None,
+    commit_every: Optional[int] = None,
+) -> Dict:
+    """
+    Stream cards (any iterable, e.g. a generator) into a deck in executemany batches,
+    all inside one transaction, or with commit_every, in transactions of that many cards
+    so other writers are not locked out for the whole import (if it fails or is
+    cancelled, the committed part stays; adding the same cards again skips it as
+    duplicates). Only one batch is held in memory at a time.
+    Pass keys (e.g. ParsedCards.keys) to reuse already computed dedup keys.
+    Deduplicates like db_add_cards and returns the same stats dict.
+    With skip_near_duplicates, cards at least near_threshold similar (MinHash estimate)
+    to a card already in the deck are skipped too, and counted in stats['near_duplicates'].
+    """
+    if skip_near_duplicates:
+        db_index_near_duplicates(deck_id)
     now = datetime.datetime.now().isoformat()
+    commit_every = max(1, int(commit_every)) if commit_every else None
     with _connect() as conn:
         cur = conn.cursor()
-        # Load existing for dedup
-        cur.execute("SELECT question, answer FROM cards WHERE deck_id = ?", (deck_id,))
-        existing_rows = cur.fetchall()
-        existing_cards = [{"question": r[0], "answer": r[1]} for r in existing_rows]
-        merged, stats = merge_cards(existing_cards, new_cards)
+        cur.execute("SELECT card_count FROM decks WHERE id = ?", (deck_id,))
+        row = cur.fetchone()
+        before = int(row[0]) if row else 0
 
-        # Insert only the newly added ones
-        existing_set = {_card_key(c) for c in existing_cards}
-        for c in merged:
-            k = _card_key(c)
-            if k in existing_set:
-                continue
-            # newly added
-            cur.execute(
-                "INSERT INTO cards(deck_id, question, answer, created_at, updated_at) VALUES(?, ?, ?, ?, ?)",
-                (deck_id, c["question"], c["answer"], now, now),
-            )
+        rows = iter(_card_rows(deck_id, cards, now, strict=True, keys=keys))
+        seen = added = near = 0
+        for first in rows:
+            # One transaction per commit_every rows (all rows if None), pulled lazily
+            part = chain((first,), islice(rows, commit_every - 1) if commit_every else rows)
+            if skip_near_duplicates:
+                part_seen, part_added, part_near = _insert_card_rows_skip_near(
+                    cur, deck_id, part, near_threshold or NEARDUP_THRESHOLD
+                )
+                near += part_near
+            else:
+                # The unique (deck_id, qa_key) index rejects duplicates, both against the
+                # deck and within the batch, without reading the existing cards.
+                part_seen, part_added = _insert_card_rows(cur, part, batch_size)
+            seen += part_seen
+            added += part_added
+            if commit_every:
+                conn.commit()
         # Update deck timestamp
         cur.execute("UPDATE decks SET updated_at = ? WHERE id = ?", (now, deck_id))
         conn.commit()
+        stats = {
+            "before": before,
+            "added": added,
+            "duplicates": seen - added - near,
+            "after": before + added,
+        }
+        if skip_near_duplicates:
+            stats["near_duplicates"] = near
         return stats
 
 
-def db_export_deck_apkg(deck_id: int, deck_name: str) -> str:
-    """Export a deck by id to .apkg and return the file path."""
-    from .services import create_apkg_from_cards
-
-    cards = db_get_deck_cards(deck_id)
-    cards_qa = [{"question": c["question"], "answer": c["answer"]} for c in cards]
-    return create_apkg_from_cards(cards_qa, deck_name)
+@instrumented
+def db_imported_file_keys() -> set:
+    """(sha256, deck_name) of every file imported by bulk.import_deck_files whose deck still exists."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT f.sha256, f.deck_name FROM imported_files f JOIN decks d ON d.id = f.deck_id")
+        return {(r[0], r[1]) for r in cur.fetchall()}
 
 
-def db_rename_deck(deck_id: int, new_name: str):
-    new_name = new_name.strip()
-    if not new_name:
-        raise Exception("New deck name cannot be empty.")
+@instrumented
+@writes
+def db_import_deck_files(parsed: List[Dict], batch_size: Optional[int] = None) -> List[Dict]:
+    """
+    Write already parsed deck files in one transaction. Each item has 'source', 'sha256',
+    'deck_name', 'pairs' ((question, answer) tuples), 'keys' (their _card_hash values) and
+    'guids' (their guid_for values).
+    Decks are created as needed; cards are deduplicated like db_add_cards_bulk. Each file is
+    recorded in imported_files. Returns per file {'source', 'sha256', 'deck_id', 'deck_name',
+    'cards', 'added', 'duplicates'}.
+    """
     now = datetime.datetime.now().isoformat()
+    results = []
     with _connect() as conn:
         cur = conn.cursor()
-        # Ensure uniqueness
-        cur.execute("SELECT id FROM decks WHERE name = ? AND id <> ?", (new_name, deck_id))
-        if cur.fetchone():
-            raise Exception("Another deck with this name already exists.")
-        cur.execute("UPDATE decks SET name = ?, updated_at = ? WHERE id = ?", (new_name, now, deck_id))
+        deck_ids: Dict[str, int] = {}
+        for item in parsed:
+            name = item["deck_name"]
+            deck_id = deck_ids.get(name)
+            if deck_id is None:
+                cur.execute("SELECT id FROM decks WHERE name = ?", (name,))
+                row = cur.fetchone()
+                if row:
+                    deck_id = row[0]
+                else:
+                    cur.execute("INSERT INTO decks(name, created_at, updated_at) VALUES(?, ?, ?)", (name, now, now))
+                    deck_id = cur.lastrowid
+                deck_ids[name] = deck_id
+            rows = (
+                (deck_id, q, a, key, guid, now, now)
+                for (q, a), key, guid in zip(item["pairs"], item["keys"], item["guids"])
+            )
+            seen, added = _insert_card_rows(cur, rows, batch_size)
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO imported_files(sha256, deck_name, deck_id, source, cards, added, imported_at)
+                VALUES(?, ?, ?, ?, ?, ?, ?)
+                """,
+                (item["sha256"], name, deck_id, item["source"], seen, added, now),
+            )
+            results.append({
+                "source": item["source"], "sha256": item["sha256"], "deck_id": deck_id, "deck_name": name,
+                "cards": seen, "added": added, "duplicates": seen - added,
+            })
+        cur.executemany("UPDATE decks SET updated_at = ? WHERE id = ?", [(now, i) for i in deck_ids.values()])
         conn.commit()
+    return results
 
 
-def db_delete_deck(deck_id: int):
+def _store_signature(cur: sqlite3.Cursor, card_id: int, sig: bytes):
+    cur.execute("INSERT OR REPLACE INTO card_minhash(card_id, sig) VALUES(?, ?)", (card_id, sig))
+    cur.executemany(
+        "INSERT OR IGNORE INTO card_lsh(bucket, card_id) VALUES(?, ?)",
+        [(b, card_id) for b in band_buckets(sig)],
+    )
+
+
+def _insert_card_rows_skip_near(
+    cur: sqlite3.Cursor, deck_id: int, rows: Iterable[tuple], threshold: float
+) -> Tuple[int, int, int]:
+    """
+    Insert rows one at a time, skipping exact duplicates and cards whose MinHash signature is
+    within threshold of one already in the deck (including cards added earlier in this call).
+    The deck must be indexed first. Returns (rows_seen, rows_added, near_duplicates).
+    """
+    seen = added = near = 0
+    for row in rows:
+        seen += 1
+        cur.execute("SELECT 1 FROM cards WHERE deck_id = ? AND qa_key = ?", (deck_id, row[3]))
+        if cur.fetchone():
+            continue
+        sig = minhash(row[1], row[2])
+        buckets = band_buckets(sig)
+        # CROSS JOIN keeps card_lsh as the outer loop (bucket lookups), not a scan of the deck's cards
+        cur.execute(
+            f"""
+            SELECT DISTINCT m.sig FROM card_lsh l
+            CROSS JOIN cards c ON c.id = l.card_id
+            CROSS JOIN card_minhash m ON m.card_id = l.card_id
+            WHERE l.bucket IN ({",".join("?" * len(buckets))}) AND c.deck_id = ?
+            """,
+            (*buckets, deck_id),
+        )
+        if any(similarity(sig, r[0]) >= threshold for r in cur.fetchall()):
+            near += 1
+            continue
+        cur.execute(_INSERT_CARD_SQL, row)
+        if cur.rowcount == 1:
+            added += 1
+            card_id = cur.lastrowid
+            _store_signature(cur, card_id, sig)
+            _link_card_media(cur, card_id, media_refs(row[1]) + media_refs(row[2]))
+    return seen, added, near
+
+
+@instrumented
+@writes
+def db_index_near_duplicates(deck_id: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """Compute MinHash signatures and LSH buckets for cards not indexed yet (one deck or all). Returns how many."""
+    batch_size = max(1, int(batch_size or DB_INSERT_BATCH_SIZE))
+    sql = "SELECT c.id, c.question, c.answer FROM cards c LEFT JOIN card_minhash m ON m.card_id = c.id WHERE m.card_id IS NULL"
+    params: tuple = ()
+    if deck_id is not None:
+        sql += " AND c.deck_id = ?"
+        params = (deck_id,)
+    indexed = 0
     with _connect() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM cards WHERE deck_id = ?", (deck_id,))
-        cur.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+        read = conn.cursor()
+        write = conn.cursor()
+        read.execute(sql, params)
+        while True:
+            chunk = read.fetchmany(batch_size)
+            if not chunk:
+                break
+            sigs, lsh = [], []
+            for card_id, question, answer in chunk:
+                sig = minhash(question, answer)
+                sigs.append((card_id, sig))
+                lsh.extend((b, card_id) for b in band_buckets(sig))
+            write.executemany("INSERT OR REPLACE INTO card_minhash(card_id, sig) VALUES(?, ?)", sigs)
+            write.executemany("INSERT OR IGNORE INTO card_lsh(bucket, card_id) VALUES(?, ?)", lsh)
+            indexed += len(chunk)
         conn.commit()
+    return indexed
 
 
+def _chunked(ids: List[int], size: int = 500) -> Iterator[List[int]]:
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+@instrumented
+def db_find_near_duplicates(deck_id: Optional[int] = None, threshold: Optional[float] = None, limit: int = 50) -> List[Dict]:
+    """
+    Return clusters of near-duplicate cards within one deck (or across all decks), largest first.
+    Only cards sharing an LSH bucket are compared, so the cost grows with the number of candidates
+    rather than the number of card pairs. Each cluster: { 'size', 'min_similarity', 'cards': [
+    { 'id', 'deck_id', 'deck_name', 'question', 'answer' } ] }.
+    """
+    threshold = NEARDUP_THRESHOLD if threshold is None else float(threshold)
+    db_index_near_duplicates(deck_id)
+    with _connect() as conn:
+        cur = conn.cursor()
+        if deck_id is None:
+            cur.execute("SELECT group_concat(card_id) FROM card_lsh GROUP BY bucket HAVING COUNT(1) > 1")
+        else:
+            cur.execute(
+                """
+                SELECT group_concat(l.card_id) FROM card_lsh l JOIN cards c ON c.id = l.card_id
+                WHERE c.deck_id = ? GROUP BY l.bucket HAVING COUNT(1) > 1
+                """,
+                (deck_id,),
+            )
+        # Very large buckets (e.g. one card copied into many decks) are capped to stay sub-quadratic
+        buckets = [sorted(int(x) for x in members.split(","))[:NEARDUP_MAX_BUCKET] for (members,) in cur.fetchall()]
+        if not buckets:
+            return []
+
+        sigs: Dict[int, bytes] = {}
+        for chunk in _chunked(sorted({x for ids in buckets for x in ids})):
+            cur.execute(f"SELECT card_id, sig FROM card_minhash WHERE card_id IN ({','.join('?' * len(chunk))})", chunk)
+            sigs.update((r[0], r[1]) for r in cur.fetchall())
+
+        uf = UnionFind()
+        min_sim: Dict[int, float] = {}
+        checked = set()
+        for ids in buckets:
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    # The same pair often shares several bands; compare it once
+                    if (a, b) in checked:
+                        continue
+                    checked.add((a, b))
+                    sim = similarity(sigs[a], sigs[b])
+                    if sim >= threshold:
+                        uf.union(a, b)
+                        min_sim[a] = min(min_sim.get(a, 1.0), sim)
+                        min_sim[b] = min(min_sim.get(b, 1.0), sim)
+        groups = sorted(uf.groups(), key=lambda g: (-len(g), g[0]))[:limit]
+
+        cards: Dict[int, Dict] = {}
+        for chunk in _chunked([x for g in groups for x in g]):
+            cur.execute(
+                f"""
+                SELECT c.id, c.deck_id, d.name AS deck_name, c.question, c.answer
+                FROM cards c JOIN decks d ON d.id = c.deck_id
+                WHERE c.id IN ({','.join('?' * len(chunk))})
+                """,
+                chunk,
+            )
+            cards.update((r["id"], dict(r)) for r in cur.fetchall())
+        return [
+            {
+                "size": len(g),
+                "min_similarity": round(min(min_sim[x] for x in g), 3),
+                "cards": [cards[x] for x in g if x in cards],
+            }
+            for g in groups
+        ]
+
+
+@instrumented
+def db_iter_deck_cards(deck_id: int, columns: str = "question, answer") -> Iterator[sqlite3.Row]:
+    """Yield a deck's cards (only the given columns) in id order straight from the cursor, without a full fetch."""
+    with _connect(transaction=False) as conn:
+        cur = conn.execute(f"SELECT {columns} FROM cards WHERE deck_id = ? ORDER BY id ASC", (deck_id,))
+        try:
+            yield from cur
+        finally:
+            cur.close()
+
+
+@instrumented
+def db_export_deck_apkg(deck_id: int, deck_name: str, use_cache: bool = True, prune: bool = True) -> str:
+    """
+    Export a deck by id to .apkg and return the file path. Streams cards from the database,
+    with their stored note GUIDs. If the deck's content revision and name match the last
+    export and the file is still on disk untouched, that file is returned as is (export
+    cache hit). Either way the export is logged in deck_exports as the base for
+    db_export_deck_delta. A fresh export then prunes the export cache (keeping this deck);
+    prune=False leaves that to the caller, e.g. bulk.export_decks, which prunes once per run.
+
+    Not @writes: a cache hit only touches export bookkeeping that no @cached read serves,
+    so it keeps the read cache; a fresh export invalidates it via db_record_artifact.
+    """
+    from .apkg import write_apkg
+    from .services import get_deck_apkg_path
+
+    path = get_deck_apkg_path(deck_name)
+    now = datetime.datetime.now().isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT revision, card_count FROM decks WHERE id = ?", (deck_id,))
+        row = cur.fetchone()
+        revision = int(row[0]) if row else 0
+        card_count = int(row[1]) if row else 0
+        # The revision is also the watermark. It is read before the cards, so a card changed
+        # meanwhile lands in the next delta (perhaps also in this file), never in neither
+        watermark = revision
+        if use_cache:
+            cur.execute(
+                "SELECT path, size, mtime FROM export_cache WHERE deck_id = ? AND revision = ? AND deck_name = ?",
+                (deck_id, revision, deck_name),
+            )
+            hit = cur.fetchone()
+            if hit and hit["path"] == path and _file_unchanged(path, hit["size"], hit["mtime"]):
+                cur.execute("UPDATE export_cache SET last_used_at = ? WHERE deck_id = ?", (now, deck_id))
+                _meta_incr(cur, "export_cache_hits")
+                _log_deck_export(cur, deck_id, "full", None, watermark, card_count, path, now)
+                conn.commit()
+                return path
+
+    # Write next to the target and swap in, so a cached file is never seen half-written
+    tmp_path = path + ".tmp"
+    write_apkg(tmp_path, deck_name, db_iter_deck_cards(deck_id, "question, answer, guid"), media=_deck_media(deck_id))
+    os.replace(tmp_path, path)
+    st = os.stat(path)
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT OR REPLACE INTO export_cache(deck_id, deck_name, revision, path, size, mtime, created_at, last_used_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (deck_id, deck_name, revision, path, st.st_size, st.st_mtime, now, now),
+        )
+        _meta_incr(cur, "export_cache_misses")
+        _log_deck_export(cur, deck_id, "full", None, watermark, card_count, path, now)
+        conn.commit()
+    db_record_artifact("apkg", path, deck_id=deck_id, deck_name=deck_name)
+    if prune:
+        db_prune_export_cache(keep_deck_id=deck_id)
+    return path
+
+
+@instrumented
+@writes
+def db_export_deck_text(
+    deck_id: int,
+    deck_name: str,
+    fmt: str = "csv",
+    delimiter: Optional[str] = None,
+    header: bool = True,
+) -> str:
+    """
+    Export a deck by id to Decks/<deck_name>.csv, .tsv or .ndjson (fmt) and return the
+    file path. Rows are streamed from the database cursor straight to the file; see
+    ankideck.textfmt.write_text for delimiter and header.
+    """
+    from .textfmt import TEXT_FORMATS, write_text
+    from .services import get_deck_export_path
+
+    if fmt not in TEXT_FORMATS:
+        raise Exception(f"Unknown text format '{fmt}'. Use one of: {', '.join(TEXT_FORMATS)}.")
+    path = get_deck_export_path(deck_name, TEXT_FORMATS[fmt])
+    tmp_path = path + ".tmp"
+    write_text(tmp_path, fmt, db_iter_deck_cards(deck_id), delimiter=delimiter, header=header)
+    os.replace(tmp_path, path)
+    db_record_artifact("text", path, deck_id=deck_id, deck_name=deck_name)
+    return path
+
+
+def _deck_media(deck_id: int, since: Optional[int] = None, until: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(name, path) of the media used by a deck's cards, or only by those with change_seq in (since, until]."""
+    with _connect(transaction=False) as conn:
+        cur = conn.cursor()
+        if since is None:
+            # card_media is the small side: walk it and keep this deck's cards
+            cur.execute(
+                "SELECT DISTINCT m.name FROM card_media m CROSS JOIN cards c ON c.id = m.card_id WHERE c.deck_id = ?",
+                (deck_id,),
+            )
+        else:
+            cur.execute(
+                """
+                SELECT DISTINCT m.name FROM cards c CROSS JOIN card_media m ON m.card_id = c.id
+                WHERE c.deck_id = ? AND c.change_seq > ? AND c.change_seq <= ?
+                """,
+                (deck_id, since, until),
+            )
+        return [(r[0], media_path(r[0])) for r in cur.fetchall()]
+
+
+def _deck_watermark(cur: sqlite3.Cursor, deck_id: int) -> int:
+    """
+    The deck's change sequence (decks.revision): every card written so far has a change_seq
+    at or below it, and every card written from now on (even by a transaction already
+    running) gets a higher one.
+    """
+    cur.execute("SELECT revision FROM decks WHERE id = ?", (deck_id,))
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def _log_deck_export(
+    cur: sqlite3.Cursor, deck_id: int, mode: str, since_export_id: Optional[int],
+    watermark: int, cards: int, path: str, now: str,
+) -> int:
+    cur.execute(
+        """
+        INSERT INTO deck_exports(deck_id, mode, since_export_id, change_seq, cards, path, created_at)
+        VALUES(?, ?, ?, ?, ?, ?, ?)
+        """,
+        (deck_id, mode, since_export_id, watermark, cards, path, now),
+    )
+    return cur.lastrowid
+
+
+@instrumented
+@writes
+def db_export_deck_delta(deck_id: int, deck_name: str, since_export_id: Optional[int] = None) -> Dict:
+    """
+    Export only the cards of a deck created or edited since an earlier export (the deck's
+    latest one by default) to Decks/<deck_name>_changes_<timestamp>.apkg. Notes keep their
+    stored GUIDs and the deck its name, so Anki adds the new cards to the same deck and
+    updates the edited ones in place. Deleted cards are not carried over. The work is
+    proportional to the number of changed cards. Returns {'path' (None when nothing
+    changed), 'cards', 'export_id', 'since_export_id'}.
+    """
+    from .apkg import write_apkg
+    from .services import get_deck_export_path
+
+    now = datetime.datetime.now().isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        if since_export_id is None:
+            cur.execute("SELECT id, change_seq FROM deck_exports WHERE deck_id = ? ORDER BY id DESC LIMIT 1", (deck_id,))
+        else:
+            cur.execute("SELECT id, change_seq FROM deck_exports WHERE deck_id = ? AND id = ?", (deck_id, since_export_id))
+        base = cur.fetchone()
+        if base is None:
+            raise Exception("This deck has no earlier export to compare against. Export the full deck first.")
+        since = base["change_seq"]
+        watermark = _deck_watermark(cur, deck_id)
+        # The revision also moves on deletes, which a delta does not carry
+        cur.execute(
+            "SELECT 1 FROM cards WHERE deck_id = ? AND change_seq > ? AND change_seq <= ? LIMIT 1",
+            (deck_id, since, watermark),
+        )
+        changed = cur.fetchone() is not None
+    result = {"path": None, "cards": 0, "export_id": None, "since_export_id": base["id"]}
+    if not changed:
+        return result
+
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = get_deck_export_path(f"{deck_name}_changes_{stamp}", ".apkg")
+    count = 0
+    tmp_path = path + ".tmp"
+    with _connect(transaction=False) as conn:
+        cur = conn.execute(
+            """
+            SELECT question, answer, guid FROM cards
+            WHERE deck_id = ? AND change_seq > ? AND change_seq <= ?
+            ORDER BY change_seq, id
+            """,
+            (deck_id, since, watermark),
+        )
+
+        def _counted():
+            nonlocal count
+            for row in cur:
+                count += 1
+                yield row
+
+        try:
+            write_apkg(tmp_path, deck_name, _counted(), media=_deck_media(deck_id, since, watermark))
+        finally:
+            cur.close()
+    os.replace(tmp_path, path)
+    with _connect() as conn:
+        export_id = _log_deck_export(conn.cursor(), deck_id, "delta", base["id"], watermark, count, path, now)
+        conn.commit()
+    db_record_artifact("apkg", path, deck_id=deck_id, deck_name=deck_name)
+    return {**result, "path": path, "cards": count, "export_id": export_id}
+
+
+@instrumented
+@writes
+def db_add_media(source, filename: Optional[str] = None, mime: Optional[str] = None) -> Dict:
+    """
+    Add an image/audio file (path, bytes or binary file object) to the media store and
+    register it. Returns {'name', 'sha256', 'size', 'mime', 'path'}; reference it from a
+    card as media.media_reference(name) gives it.
+    """
+    media = store_media(source, filename=filename, mime=mime)
+    with _connect() as conn:
+        _register_media(conn.cursor(), [media])
+        conn.commit()
+    return media
+
+
+@instrumented
+@writes
+def db_extract_stored_media() -> List[Dict]:
+    """
+    Move base64 data: URIs in existing cards (stored before the media store existed) into
+    the store, replacing each with the stored file's name. This rewrites those cards, so
+    they count as edited: they bump their deck's revision and show up in its next
+    'changes since last export'. Run it explicitly (python -m ankideck extract-media);
+    imports and edits already do this for new text. Returns {'deck_id', 'name', 'cards'}
+    per deck with rewritten cards.
+    """
+    with _connect() as conn:
+        cur = conn.cursor()
+        rewritten = _extract_stored_data_uris(cur)
+        conn.commit()
+        names = {}
+        if rewritten:
+            cur.execute(f"SELECT id, name FROM decks WHERE id IN ({','.join('?' * len(rewritten))})", list(rewritten))
+            names = {r[0]: r[1] for r in cur.fetchall()}
+    results = [{"deck_id": i, "name": names.get(i, str(i)), "cards": n} for i, n in sorted(rewritten.items())]
+    for r in results:
+        _log.info("Moved inline media of %d card(s) in deck %r (id %d) into the media store.", r["cards"], r["name"], r["deck_id"])
+    return results
+
+
+@instrumented
+@cached
+def db_media_stats() -> Dict:
+    """{'files', 'bytes', 'referenced'} over the media store."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(1), COALESCE(SUM(size), 0) FROM media")
+        files, size = cur.fetchone()
+        cur.execute("SELECT COUNT(DISTINCT name) FROM card_media")
+        return {"files": int(files), "bytes": int(size), "referenced": int(cur.fetchone()[0])}
+
+
+@instrumented
+@writes
+def db_prune_media(grace_hours: Optional[float] = None) -> int:
+    """
+    Delete stored media files no card references any more, and leftovers of interrupted
+    writes, once they are older than grace_hours (MEDIA_PRUNE_GRACE_HOURS; files added
+    recently may be about to be used). Registry rows for missing files are dropped too.
+    Returns the number of files removed.
+    """
+    grace_hours = MEDIA_PRUNE_GRACE_HOURS if grace_hours is None else grace_hours
+    cutoff = datetime.datetime.now().timestamp() - grace_hours * 3600
+    removed = 0
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT name FROM card_media")
+        referenced = {r[0] for r in cur.fetchall()}
+        gone = []
+        if os.path.isdir(MEDIA_DIR):
+            for root, _, files in os.walk(MEDIA_DIR):
+                for f in files:
+                    if f in referenced or not (MEDIA_NAME_RE.match(f) or f.endswith(".tmp")):
+                        continue
+                    path = os.path.join(root, f)
+                    try:
+                        if os.path.getmtime(path) >= cutoff:
+                            continue
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    removed += 1
+                    gone.append((f,))
+        cur.executemany("DELETE FROM media WHERE name = ?", gone)
+        cur.execute("SELECT name FROM media")
+        missing = [(r[0],) for r in cur.fetchall() if not os.path.exists(media_path(r[0]))]
+        cur.executemany("DELETE FROM media WHERE name = ?", missing)
+        conn.commit()
+    return removed
+
+
+@instrumented
+def db_list_deck_exports(deck_id: int, limit: int = 20) -> List[Dict]:
+    """A deck's exports, newest first: {'id', 'mode', 'since_export_id', 'change_seq', 'cards', 'path', 'created_at'}."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, mode, since_export_id, change_seq, cards, path, created_at
+            FROM deck_exports WHERE deck_id = ? ORDER BY id DESC LIMIT ?
+            """,
+            (deck_id, limit),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+def _file_unchanged(path: str, size: int, mtime: float) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and st.st_mtime == mtime
+
+
+@instrumented
+@writes
+def db_prune_export_cache(
+    max_bytes: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    keep_deck_id: Optional[int] = None,
+    keep_deck_ids: Iterable[int] = (),
+) -> int:
+    """
+    Evict cached exports (file and entry): first those unused for longer than max_age_days,
+    then least recently used ones until the total size fits in max_bytes. Entries whose file
+    has disappeared are dropped too. keep_deck_id and keep_deck_ids are never evicted.
+    Returns the number evicted.
+    """
+    keep = set(keep_deck_ids)
+    if keep_deck_id is not None:
+        keep.add(keep_deck_id)
+    max_bytes = EXPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age_days = EXPORT_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=max_age_days)).isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT deck_id, path, size, mtime, last_used_at FROM export_cache ORDER BY last_used_at DESC")
+        entries = cur.fetchall()
+        evict = {}
+        total = 0
+        for e in entries:
+            if e["deck_id"] in keep:
+                total += e["size"]
+            elif e["last_used_at"] < cutoff or not os.path.exists(e["path"]):
+                evict[e["deck_id"]] = e
+        for e in entries:
+            if e["deck_id"] in keep or e["deck_id"] in evict:
+                continue
+            if total + e["size"] > max_bytes:
+                evict[e["deck_id"]] = e
+            else:
+                total += e["size"]
+        for e in evict.values():
+            # Only remove the file if it is still the one we cached
+            if _file_unchanged(e["path"], e["size"], e["mtime"]):
+                try:
+                    os.remove(e["path"])
+                except OSError:
+                    pass
+                cur.execute("DELETE FROM artifacts WHERE path = ?", (e["path"],))
+        cur.executemany("DELETE FROM export_cache WHERE deck_id = ?", [(i,) for i in evict])
+        conn.commit()
+        return len(evict)
+
+
+@instrumented
+def db_export_cache_stats() -> Dict:
+    """Return { 'hits', 'misses', 'entries', 'bytes' } for the .apkg export cache."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(1), COALESCE(SUM(size), 0) FROM export_cache")
+        entries, size = cur.fetchone()
+        return {
+            "hits": int(_meta_get(cur, "export_cache_hits") or 0),
+            "misses": int(_meta_get(cur, "export_cache_misses") or 0),
+            "entries": int(entries),
+            "bytes": int(size),
+        }
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@instrumented
+@writes
+def db_record_artifact(kind: str, path: str, deck_id: Optional[int] = None, deck_name: Optional[str] = None) -> Dict:
+    """
+    Catalog a generated file (kind 'json', 'apkg', 'text' or 'bundle') with its size, mtime and SHA-256,
+    replacing any earlier entry for the same path. Returns the artifact dict. Nothing is pruned
+    here (a bulk export may still be collecting the files it just wrote); retention runs only
+    through db_prune_artifacts.
+    """
+    st = os.stat(path)
+    digest = _file_sha256(path)
+    now = datetime.datetime.now().isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        # A rewritten file (e.g. a re-exported deck) moves to the top as a new entry
+        cur.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+        cur.execute(
+            """
+            INSERT INTO artifacts(kind, path, size, mtime, sha256, deck_id, deck_name, created_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (kind, path, st.st_size, st.st_mtime, digest, deck_id, deck_name, now),
+        )
+        artifact_id = cur.lastrowid
+        conn.commit()
+    return {
+        "id": artifact_id, "kind": kind, "path": path, "size": st.st_size, "mtime": st.st_mtime,
+        "sha256": digest, "deck_id": deck_id, "deck_name": deck_name, "created_at": now,
+    }
+
+
+@instrumented
+@cached
+def db_list_artifacts(
+    kind: Optional[str] = None, deck_id: Optional[int] = None, limit: int = 20, before_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    Newest artifacts first, optionally of one kind and/or deck. Pass the last id of one page
+    as before_id to get the next (keyset pagination over the catalog's indexes).
+    """
+    where, args = ["id < ?"], [int(before_id) if before_id else 2**63 - 1]
+    if kind is not None:
+        where.append("kind = ?")
+        args.append(kind)
+    if deck_id is not None:
+        where.append("deck_id = ?")
+        args.append(deck_id)
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT * FROM artifacts WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?",
+            (*args, int(limit)),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@instrumented
+def db_get_artifact(artifact_id: int) -> Optional[Dict]:
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM artifacts WHERE id = ?", (artifact_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+@instrumented
+@cached
+def db_artifact_stats() -> Dict[str, Dict]:
+    """Return {kind: {'count', 'bytes'}} over the artifact catalog."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT kind, COUNT(1), COALESCE(SUM(size), 0) FROM artifacts GROUP BY kind")
+        return {r[0]: {"count": int(r[1]), "bytes": int(r[2])} for r in cur.fetchall()}
+
+
+def _remove_artifact_files(rows: List[sqlite3.Row]):
+    for r in rows:
+        # Only remove files we wrote (not ones found on disk), and only while unchanged
+        if r["managed"] and _file_unchanged(r["path"], r["size"], r["mtime"]):
+            try:
+                os.remove(r["path"])
+            except OSError:
+                pass
+
+
+@instrumented
+@writes
+def db_delete_artifact(artifact_id: int, delete_file: bool = True):
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT path, size, mtime, managed FROM artifacts WHERE id = ?", (artifact_id,))
+        rows = cur.fetchall()
+        cur.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+        conn.commit()
+    if delete_file:
+        _remove_artifact_files(rows)
+
+
+@instrumented
+@writes
+def db_prune_artifacts(
+    kind: Optional[str] = None,
+    keep: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    keep_id: Optional[int] = None,
+    check_files: bool = False,
+) -> int:
+    """
+    Apply the retention policy to one kind (all kinds if None): beyond the newest `keep`,
+    older than max_age_days, or beyond max_bytes in total (oldest go first); 0 means no
+    limit, None the ANKIDECK_ARTIFACT_* setting. Removes the entries and the files we
+    wrote; files found on disk when the catalog was created are only uncataloged. With
+    check_files, entries whose file is gone are dropped too. keep_id is never removed.
+    Returns the number of entries removed.
+    """
+    keep = ARTIFACT_KEEP_PER_KIND if keep is None else keep
+    max_age_days = ARTIFACT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    max_bytes = ARTIFACT_MAX_BYTES if max_bytes is None else max_bytes
+    with _connect() as conn:
+        cur = conn.cursor()
+        if kind is None:
+            cur.execute("SELECT DISTINCT kind FROM artifacts")
+            kinds = [r[0] for r in cur.fetchall()]
+        else:
+            kinds = [kind]
+        doomed: Dict[int, sqlite3.Row] = {}
+        for k in kinds:
+            if keep > 0:
+                cur.execute(
+                    "SELECT id, path, size, mtime, managed FROM artifacts WHERE kind = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                    (k, keep),
+                )
+                doomed.update((r["id"], r) for r in cur.fetchall())
+            if max_age_days > 0:
+                cutoff = (datetime.datetime.now() - datetime.timedelta(days=max_age_days)).isoformat()
+                cur.execute("SELECT id, path, size, mtime, managed FROM artifacts WHERE kind = ? AND created_at < ?", (k, cutoff))
+                doomed.update((r["id"], r) for r in cur.fetchall())
+            if max_bytes > 0 or check_files:
+                cur.execute("SELECT id, path, size, mtime, managed FROM artifacts WHERE kind = ? ORDER BY id DESC", (k,))
+                total = 0
+                for r in cur.fetchall():
+                    if r["id"] in doomed:
+                        continue
+                    if check_files and not os.path.exists(r["path"]):
+                        doomed[r["id"]] = r
+                    elif max_bytes > 0 and total + r["size"] > max_bytes and r["id"] != keep_id:
+                        doomed[r["id"]] = r
+                    else:
+                        total += r["size"]
+        doomed.pop(keep_id, None)
+        if not doomed:
+            return 0
+        cur.executemany("DELETE FROM artifacts WHERE id = ?", [(i,) for i in doomed])
+        conn.commit()
+    _remove_artifact_files(list(doomed.values()))
+    return len(doomed)
+
+
+def _job_row(row) -> Dict:
+    job = dict(row)
+    job["params"] = json.loads(job["params"]) if job["params"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+@instrumented
+@writes
+def db_create_job(kind: str, label: str, params: Dict, owner_pid: Optional[int] = None) -> int:
+    """Record a queued background job (see ankideck.jobs) owned by owner_pid (default this process). Returns its id."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO jobs(kind, label, params, status, created_at, owner_pid) VALUES(?, ?, ?, 'queued', ?, ?)",
+            (kind, label, json.dumps(params), datetime.datetime.now().isoformat(),
+             os.getpid() if owner_pid is None else owner_pid),
+        )
+        return cur.lastrowid
+
+
+@instrumented
+@writes
+def db_start_job(job_id: int):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+            (datetime.datetime.now().isoformat(), job_id),
+        )
+
+
+@instrumented
+@writes
+def db_finish_job(
+    job_id: int,
+    status: str,
+    result: Optional[Dict] = None,
+    error: Optional[str] = None,
+    progress_done: int = 0,
+    progress_total: int = 0,
+    message: Optional[str] = None,
+):
+    """Store a job's final status ('done', 'failed' or 'cancelled'), result or error, and last progress."""
+    with _connect() as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,
+                            progress_done = ?, progress_total = ?, message = ?
+            WHERE id = ?
+            """,
+            (
+                status,
+                json.dumps(result) if result is not None else None,
+                error,
+                datetime.datetime.now().isoformat(),
+                progress_done,
+                progress_total,
+                message,
+                job_id,
+            ),
+        )
+
+
+@instrumented
+@writes
+def db_request_job_cancel(job_id: int):
+    with _connect() as conn:
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+
+
+@instrumented
+@writes
+def db_fail_jobs(job_ids: List[int], error: str) -> int:
+    """Mark jobs failed with error (e.g. interrupted ones). Returns how many."""
+    now = datetime.datetime.now().isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            [(error, now, job_id) for job_id in job_ids],
+        )
+    return len(job_ids)
+
+
+@instrumented
+def db_active_jobs() -> List[Dict]:
+    """{'id', 'owner_pid'} of every queued or running job, read fresh (not from the read cache)."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, owner_pid FROM jobs WHERE status IN ('queued', 'running')")
+        return [dict(r) for r in cur.fetchall()]
+
+
+@instrumented
+def db_get_job(job_id: int) -> Optional[Dict]:
+    """A job row as a dict with params/result decoded, or None."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cur.fetchone()
+        return _job_row(row) if row else None
+
+
+@instrumented
+@cached
+def db_list_jobs(limit: int = 20) -> List[Dict]:
+    """The most recent jobs, newest first, as db_get_job returns them."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (int(limit),))
+        return [_job_row(r) for r in cur.fetchall()]
+
+
+@instrumented
+@writes
+def db_rename_deck(deck_id: int, new_name: str):
+    new_name = new_name.strip()
+    if not new_name:
+        raise Exception("New deck name cannot be empty.")
+    now = datetime.datetime.now().isoformat()
+    with _connect() as conn:
+        cur = conn.cursor()
+        # Ensure uniqueness
+        cur.execute("SELECT id FROM decks WHERE name = ? AND id <> ?", (new_name, deck_id))
+        if cur.fetchone():
+            raise Exception("Another deck with this name already exists.")
+        cur.execute("UPDATE decks SET name = ?, updated_at = ? WHERE id = ?", (new_name, now, deck_id))
+        conn.commit()
+
+
+@instrumented
+@writes
+def db_delete_deck(deck_id: int):
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM cards WHERE deck_id = ?", (deck_id,))
+        cur.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+        conn.commit()
+
+
+@instrumented
+@writes
 def db_update_card(card_id: int, question: str, answer: str):
     question = (question or "").strip()
     answer = (answer or "").strip()
     if not question or not answer:
         raise Exception("Question and Answer cannot be empty.")
     now = datetime.datetime.now().isoformat()
+    question = extract_data_uris(question)[0]
+    answer = extract_data_uris(answer)[0]
+    key = _card_hash({"question": question, "answer": answer})
     with _connect() as conn:
         cur = conn.cursor()
-        cur.execute(
-            "UPDATE cards SET question = ?, answer = ?, updated_at = ? WHERE id = ?",
-            (question, answer, now, card_id),
-        )
+        try:
+            cur.execute(
+                "UPDATE cards SET question = ?, answer = ?, qa_key = ?, updated_at = ? WHERE id = ?",
+                (question, answer, key, now, card_id),
+            )
+        except sqlite3.IntegrityError:
+            raise Exception("Another card with the same question and answer already exists in this deck.")
+        cur.execute("DELETE FROM card_media WHERE card_id = ?", (card_id,))
+        _link_card_media(cur, card_id, media_refs(question) + media_refs(answer))
         conn.commit()
 
 
+@instrumented
+@writes
 def db_delete_card(card_id: int):
     with _connect() as conn:
         cur = conn.cursor()
@@ -269,36 +2061,167 @@ def db_delete_card(card_id: int):
         conn.commit()
 
 
+def _transfer_cards(cur: sqlite3.Cursor, source_deck_id: int, target_deck_id: int, now: str, remove_source: bool) -> Tuple[int, int]:
+    """
+    Move or copy every card of source into target entirely in SQL, skipping cards whose
+    qa_key already exists in target. Returns (cards_in_source, cards_added_to_target).
+    Must run inside the caller's transaction.
+    """
+    if source_deck_id == target_deck_id:
+        raise Exception("Source and target deck must be different.")
+    cur.execute("SELECT card_count FROM decks WHERE id = ?", (source_deck_id,))
+    row = cur.fetchone()
+    total = int(row[0]) if row else 0
+    if remove_source:
+        # Re-home non-duplicate cards in place (ids survive the move); the unique
+        # (deck_id, qa_key) index makes OR IGNORE leave duplicates behind in source.
+        cur.execute(
+            "UPDATE OR IGNORE cards SET deck_id = ?, updated_at = ? WHERE deck_id = ?",
+            (target_deck_id, now, source_deck_id),
+        )
+        added = cur.rowcount
+        cur.execute("DELETE FROM cards WHERE deck_id = ?", (source_deck_id,))
+    else:
+        cur.execute(
+            """
+            INSERT OR IGNORE INTO cards(deck_id, question, answer, qa_key, guid, created_at, updated_at, change_seq)
+            SELECT ?1, question, answer, qa_key, guid, ?2, ?2, (SELECT revision + 1 FROM decks WHERE id = ?1)
+            FROM cards WHERE deck_id = ?3 ORDER BY id
+            """,
+            (target_deck_id, now, source_deck_id),
+        )
+        added = cur.rowcount
+        # Copies use the same media as their originals
+        cur.execute(
+            """
+            INSERT OR IGNORE INTO card_media(card_id, name)
+            SELECT t.id, m.name FROM card_media m
+            CROSS JOIN cards s ON s.id = m.card_id
+            CROSS JOIN cards t ON t.deck_id = ? AND t.qa_key = s.qa_key
+            WHERE s.deck_id = ?
+            """,
+            (target_deck_id, source_deck_id),
+        )
+    return total, added
+
+
+def _transfer_decks(source_deck_ids: List[int], target_deck_id: int, remove_source: bool) -> Dict:
+    now = datetime.datetime.now().isoformat()
+    total = added = 0
+    with _connect() as conn:
+        cur = conn.cursor()
+        for source_deck_id in source_deck_ids:
+            t, a = _transfer_cards(cur, source_deck_id, target_deck_id, now, remove_source)
+            total += t
+            added += a
+        touched = list(source_deck_ids) + [target_deck_id] if remove_source else [target_deck_id]
+        cur.executemany("UPDATE decks SET updated_at = ? WHERE id = ?", [(now, i) for i in touched])
+        cur.execute("SELECT card_count FROM decks WHERE id = ?", (target_deck_id,))
+        row = cur.fetchone()
+        conn.commit()
+    return {"total": total, "added": added, "duplicates": total - added, "after_target": int(row[0]) if row else 0}
+
+
+@instrumented
+@writes
 def db_move_deck_contents(source_deck_id: int, target_deck_id: int) -> Dict:
     """
     Move all cards from source deck to target deck with deduplication.
     - Cards that are duplicates in target (same normalized question+answer) will not be added.
     - All cards are removed from the source deck regardless, effectively emptying it.
+    Runs as one transaction of set-based SQL; memory use does not depend on deck size.
     Returns a stats dict: { 'moved': total_in_source, 'added': added_to_target, 'duplicates': skipped, 'after_target': total_in_target_after }
     """
-    if source_deck_id == target_deck_id:
-        raise Exception("Source and target deck must be different.")
+    stats = _transfer_decks([source_deck_id], target_deck_id, remove_source=True)
+    return {"moved": stats.pop("total"), **stats}
+
+
+@instrumented
+@writes
+def db_copy_deck_contents(source_deck_id: int, target_deck_id: int) -> Dict:
+    """
+    Copy all cards from source deck into target deck with deduplication, leaving source untouched.
+    Returns a stats dict: { 'copied': total_in_source, 'added', 'duplicates', 'after_target' }
+    """
+    stats = _transfer_decks([source_deck_id], target_deck_id, remove_source=False)
+    return {"copied": stats.pop("total"), **stats}
+
+
+@instrumented
+@writes
+def db_merge_decks(source_deck_ids: List[int], target_deck_id: int, remove_sources: bool = True) -> Dict:
+    """
+    Merge several source decks into target in a single transaction, deduplicating across all of them.
+    Sources are emptied unless remove_sources=False (then their cards are copied).
+    Returns the same stats dict as db_move_deck_contents (or, with remove_sources=False,
+    db_copy_deck_contents), summed over all sources.
+    """
+    source_deck_ids = list(dict.fromkeys(source_deck_ids))
+    if not source_deck_ids:
+        raise Exception("Select at least one source deck.")
+    stats = _transfer_decks(source_deck_ids, target_deck_id, remove_source=remove_sources)
+    return {"moved" if remove_sources else "copied": stats.pop("total"), **stats}
+
 
-    # Load source cards
+@instrumented
+@cached
+def db_list_quarantined_cards(limit: int = 100) -> Dict:
+    """
+    Duplicate cards the qa_key upgrade removed from their decks (an identical card, kept_card_id,
+    stayed). Returns {'count', 'cards': [{'card_id', 'deck_id', 'deck_name', 'kept_card_id',
+    'question', 'answer', 'created_at', 'quarantined_at'}]} with up to limit cards.
+    """
     with _connect() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT question, answer FROM cards WHERE deck_id = ?", (source_deck_id,))
-        rows = cur.fetchall()
-        source_cards = [{"question": r[0], "answer": r[1]} for r in rows]
-
-    total = len(source_cards)
+        cur.execute("SELECT COUNT(1) FROM cards_quarantine")
+        count = int(cur.fetchone()[0])
+        cur.execute(
+            """
+            SELECT q.card_id, q.deck_id, d.name AS deck_name, q.kept_card_id, q.question, q.answer,
+                   q.created_at, q.quarantined_at
+            FROM cards_quarantine q LEFT JOIN decks d ON d.id = q.deck_id
+            ORDER BY q.card_id LIMIT ?
+            """,
+            (int(limit),),
+        )
+        return {"count": count, "cards": [dict(r) for r in cur.fetchall()]}
 
-    # Append into target with deduplication using existing merge logic
-    stats = db_add_cards(target_deck_id, source_cards)
-    added = int(stats.get("added", 0))
-    skipped = total - added
 
-    # Remove everything from source and update timestamps
-    now = datetime.datetime.now().isoformat()
+@instrumented
+@writes
+def db_clear_quarantine() -> int:
+    """Delete the quarantined duplicate cards for good. Returns how many there were."""
     with _connect() as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM cards WHERE deck_id = ?", (source_deck_id,))
-        cur.execute("UPDATE decks SET updated_at = ? WHERE id IN (?, ?)", (now, source_deck_id, target_deck_id))
+        cur.execute("DELETE FROM cards_quarantine")
         conn.commit()
+        return cur.rowcount
 
-    return {"moved": total, "added": added, "duplicates": skipped, "after_target": int(stats.get("after", 0))}
+
+@instrumented
+def db_check_card_counts(repair: bool = False) -> List[Dict]:
+    """
+    Compare the denormalized decks.card_count and last_card_at with the real card count and
+    newest created_at per deck. Returns a list of mismatching decks:
+    { 'id', 'name', 'stored', 'actual', 'stored_last_card_at', 'actual_last_card_at' }.
+    With repair=True the mismatching decks are recounted in place. Not @writes: only a
+    repair changes anything, and only then is the read cache invalidated.
+    """
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT d.id, d.name, d.card_count AS stored, COUNT(c.id) AS actual,
+                   d.last_card_at AS stored_last_card_at, MAX(c.created_at) AS actual_last_card_at
+            FROM decks d LEFT JOIN cards c ON c.deck_id = d.id
+            GROUP BY d.id
+            HAVING stored <> actual OR stored_last_card_at IS NOT actual_last_card_at
+            ORDER BY d.id
+            """
+        )
+        mismatches = [dict(r) for r in cur.fetchall()]
+        if repair and mismatches:
+            _recount_decks(cur, [m["id"] for m in mismatches])
+            conn.commit()
+            readcache.invalidate()
+        return mismatches
@@ -0,0 +1,407 @@
+"""Opt-in instrumentation for ankideck.db.
+
+Off by default (set ANKIDECK_DIAGNOSTICS=1 or call set_enabled(True)); when off,
+each db_* function pays a single flag check. When on it records, per db_* function:
+call count, error count, a latency histogram, rows read (fetched) and rows written
+(rowcount of DML statements), plus a bounded log of statements slower than
+SLOW_QUERY_MS with their SQL, parameters and EXPLAIN QUERY PLAN. Call times are
+inclusive of nested db_* calls; rows and statements count toward the innermost one.
+
+Statement timing comes from a sqlite3 connection/cursor subclass that db._connect
+uses only while instrumentation is on; a statement's time includes fetching its rows.
+snapshot() and prometheus_text() expose the numbers, and dump() writes both to
+DIAGNOSTICS_DUMP_DIR (also done automatically every DIAGNOSTICS_DUMP_INTERVAL_S
+while enabled) for a local scraper, e.g. node_exporter's textfile collector.
+"""
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+import functools
+from collections import deque
+from typing import Dict, List, Optional
+
+from .config import (
+    DIAGNOSTICS_ENABLED,
+    SLOW_QUERY_MS,
+    SLOW_QUERY_LOG_SIZE,
+    DIAGNOSTICS_DUMP_DIR,
+    DIAGNOSTICS_DUMP_INTERVAL_S,
+)
+
+# inspect.CO_GENERATOR; importing inspect would add ~10 ms to every cold start
+_CO_GENERATOR = 0x20
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_PLANNABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+_enabled = DIAGNOSTICS_ENABLED
+_slow_query_ms = SLOW_QUERY_MS
+_lock = threading.Lock()
+_stats: Dict[str, Dict] = {}
+_slow_log: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_slow_total = 0
+_last_dump = 0.0
+_dump_lock = threading.Lock()
+_tls = threading.local()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool, slow_query_ms: Optional[float] = None):
+    """Turn instrumentation on or off. Connections switch over the next time each thread connects."""
+    global _enabled, _slow_query_ms
+    _enabled = bool(enabled)
+    if slow_query_ms is not None:
+        _slow_query_ms = float(slow_query_ms)
+
+
+def reset():
+    """Drop all collected numbers and the slow-query log."""
+    global _slow_total
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
+        _slow_total = 0
+
+
+class _Call:
+    __slots__ = ("name", "seconds", "rows_read", "rows_written", "statements")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.statements: List["_Statement"] = []
+
+
+class _Statement:
+    __slots__ = ("sql", "params", "many", "seconds", "plan", "planned")
+
+    def __init__(self, sql, params, many, seconds):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.seconds = seconds
+        self.plan: Optional[List[str]] = None
+        self.planned = False
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times each statement (execute plus fetches) and counts rows for the current db_* call."""
+
+    _stmt: Optional[_Statement] = None
+    _call: Optional[_Call] = None
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters, True)
+
+    def _run(self, method, sql, params, many):
+        call = getattr(_tls, "call", None)
+        t0 = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            if many:
+                # Keep (row count, first row) rather than every batch of parameters
+                params = (len(params), params[0]) if isinstance(params, (list, tuple)) and params else (None, None)
+            stmt = _Statement(sql, params, many, time.perf_counter() - t0)
+            self._stmt, self._call = stmt, call
+            self._plan_if_slow(stmt)
+            if call is not None:
+                call.statements.append(stmt)
+                if self.rowcount > 0:
+                    call.rows_written += self.rowcount
+            elif stmt.seconds * 1000 >= _slow_query_ms:
+                _log_slow(None, [stmt])
+
+    def _plan_if_slow(self, stmt: _Statement):
+        # Plan the statement as soon as it crosses the threshold, while the db_* function
+        # still holds this connection; once it returns, the pool may lease it to another thread
+        if not stmt.planned and stmt.seconds * 1000 >= _slow_query_ms:
+            stmt.planned = True
+            stmt.plan = _query_plan(self.connection, stmt)
+
+    def _account(self, t0: float, rows: int):
+        if self._stmt is not None:
+            self._stmt.seconds += time.perf_counter() - t0
+            self._plan_if_slow(self._stmt)
+        if self._call is not None:
+            self._call.rows_read += rows
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._account(t0, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._account(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._account(t0, len(rows))
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._account(t0, 0)
+            raise
+        self._account(t0, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+def connection_factory():
+    """The sqlite3 connection class db._connect should use right now."""
+    return InstrumentedConnection if _enabled else sqlite3.Connection
+
+
+def instrumented(fn):
+    """Decorator for db_* functions; generator functions are timed only while they run."""
+    name = fn.__name__
+
+    if fn.__code__.co_flags & _CO_GENERATOR:
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            if not _enabled:
+                return (yield from fn(*args, **kwargs))
+            call = _Call(name)
+            gen = fn(*args, **kwargs)
+            error = False
+            try:
+                while True:
+                    prev = getattr(_tls, "call", None)
+                    _tls.call = call
+                    t0 = time.perf_counter()
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        break
+                    except BaseException:
+                        error = True
+                        raise
+                    finally:
+                        call.seconds += time.perf_counter() - t0
+                        _tls.call = prev
+                    yield item
+            finally:
+                gen.close()
+                _record(call, error)
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        call = _Call(name)
+        prev = getattr(_tls, "call", None)
+        _tls.call = call
+        error = False
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            call.seconds = time.perf_counter() - t0
+            _tls.call = prev
+            _record(call, error)
+    return wrapper
+
+
+def _short(value, limit: int = 300) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _query_plan(conn: sqlite3.Connection, stmt: _Statement) -> Optional[List[str]]:
+    if not stmt.sql.lstrip().upper().startswith(_PLANNABLE):
+        return None
+    params = stmt.params[1] if stmt.many else stmt.params
+    if params is None:
+        return None
+    try:
+        # A plain sqlite3.Cursor, so the plan query itself is not instrumented
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + stmt.sql, params).fetchall()
+    except Exception:
+        return None
+    depth = {0: -1}
+    plan = []
+    for row in rows:
+        node, parent, detail = row[0], row[1], row[3]
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node] + detail)
+    return plan
+
+
+def _log_slow(function: Optional[str], statements: List[_Statement]):
+    global _slow_total
+    entries = []
+    for s in statements:
+        params = s.params
+        if s.many:
+            count, first = params
+            params = f"{count} rows, first: {_short(first)}" if count is not None else "<iterator>"
+        entries.append({
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "function": function,
+            "ms": round(s.seconds * 1000, 3),
+            "sql": " ".join(s.sql.split()),
+            "params": params if isinstance(params, str) else _short(params),
+            "plan": s.plan,
+        })
+    with _lock:
+        _slow_log.extend(entries)
+        _slow_total += len(entries)
+
+
+def _record(call: _Call, error: bool):
+    slow = [s for s in call.statements if s.seconds * 1000 >= _slow_query_ms]
+    if slow:
+        _log_slow(call.name, slow)
+    with _lock:
+        st = _stats.get(call.name)
+        if st is None:
+            st = _stats[call.name] = {
+                "calls": 0, "errors": 0, "seconds_sum": 0.0, "seconds_max": 0.0,
+                "rows_read": 0, "rows_written": 0, "statements": 0,
+                "buckets": [0] * (len(BUCKETS) + 1),
+            }
+        st["calls"] += 1
+        st["errors"] += int(error)
+        st["seconds_sum"] += call.seconds
+        st["seconds_max"] = max(st["seconds_max"], call.seconds)
+        st["rows_read"] += call.rows_read
+        st["rows_written"] += call.rows_written
+        st["statements"] += len(call.statements)
+        st["buckets"][next((i for i, b in enumerate(BUCKETS) if call.seconds <= b), len(BUCKETS))] += 1
+    _maybe_dump()
+
+
+def _quantile_ms(buckets: List[int], q: float) -> Optional[float]:
+    """Upper bound (ms) of the histogram bucket holding the q-quantile; None if above the last bound."""
+    total = sum(buckets)
+    if not total:
+        return None
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= q * total:
+            return BUCKETS[i] * 1000 if i < len(BUCKETS) else None
+    return None
+
+
+def snapshot() -> Dict:
+    """All collected numbers as a JSON-serializable dict."""
+    with _lock:
+        functions = {}
+        for name, st in sorted(_stats.items()):
+            functions[name] = {
+                "calls": st["calls"],
+                "errors": st["errors"],
+                "total_ms": round(st["seconds_sum"] * 1000, 3),
+                "mean_ms": round(st["seconds_sum"] / st["calls"] * 1000, 3),
+                "max_ms": round(st["seconds_max"] * 1000, 3),
+                "p50_ms_le": _quantile_ms(st["buckets"], 0.5),
+                "p99_ms_le": _quantile_ms(st["buckets"], 0.99),
+                "rows_read": st["rows_read"],
+                "rows_written": st["rows_written"],
+                "statements": st["statements"],
+                "histogram": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], st["buckets"])),
+            }
+        return {
+            "enabled": _enabled,
+            "slow_query_ms": _slow_query_ms,
+            "functions": functions,
+            "slow_queries_total": _slow_total,
+            "slow_queries": list(_slow_log),
+        }
+
+
+def prometheus_text() -> str:
+    """The same numbers in the Prometheus text exposition format."""
+    with _lock:
+        stats = {name: dict(st, buckets=list(st["buckets"])) for name, st in sorted(_stats.items())}
+        slow_total = _slow_total
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, key: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for fn, st in stats.items():
+            lines.append(f'{name}{{function="{fn}"}} {st[key]}')
+
+    metric("ankideck_db_calls_total", "counter", "Calls per ankideck.db function.", "calls")
+    metric("ankideck_db_errors_total", "counter", "Calls that raised.", "errors")
+    metric("ankideck_db_rows_read_total", "counter", "Rows fetched from SQLite.", "rows_read")
+    metric("ankideck_db_rows_written_total", "counter", "Rows changed by INSERT/UPDATE/DELETE.", "rows_written")
+    metric("ankideck_db_statements_total", "counter", "SQL statements executed.", "statements")
+
+    name = "ankideck_db_call_duration_seconds"
+    lines.append(f"# HELP {name} Wall time per call.")
+    lines.append(f"# TYPE {name} histogram")
+    for fn, st in stats.items():
+        cumulative = 0
+        for bound, n in zip([str(b) for b in BUCKETS] + ["+Inf"], st["buckets"]):
+            cumulative += n
+            lines.append(f'{name}_bucket{{function="{fn}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{function="{fn}"}} {st["seconds_sum"]:.6f}')
+        lines.append(f'{name}_count{{function="{fn}"}} {st["calls"]}')
+
+    lines.append("# HELP ankideck_db_slow_queries_total Statements slower than the slow-query threshold.")
+    lines.append("# TYPE ankideck_db_slow_queries_total counter")
+    lines.append(f"ankideck_db_slow_queries_total {slow_total}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def dump(directory: Optional[str] = None) -> Dict[str, str]:
+    """Write ankideck.json and ankideck.prom into directory (default DIAGNOSTICS_DUMP_DIR)."""
+    global _last_dump
+    directory = directory or DIAGNOSTICS_DUMP_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = {"json": os.path.join(directory, "ankideck.json"), "prometheus": os.path.join(directory, "ankideck.prom")}
+    _write_atomic(paths["json"], json.dumps(snapshot(), indent=2))
+    _write_atomic(paths["prometheus"], prometheus_text())
+    _last_dump = time.monotonic()
+    return paths
+
+
+def _maybe_dump():
+    if DIAGNOSTICS_DUMP_INTERVAL_S <= 0 or time.monotonic() - _last_dump < DIAGNOSTICS_DUMP_INTERVAL_S:
+        return
+    if not _dump_lock.acquire(blocking=False):
+        return
+    try:
+        dump()
+    except OSError:
+        pass
+    finally:
+        _dump_lock.release()
@@ -0,0 +1,275 @@
+"""Streaming card readers for large uploads.
+
+Cards are parsed incrementally from a binary file object (JSON array, NDJSON, or
+CSV/TSV), so neither the raw text nor the full card list is ever held in memory.
+Feed the iterators to db_add_cards_bulk, which validates and deduplicates as it inserts.
+"""
+import io
+import os
+import csv
+import json
+import codecs
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Union
+
+from .config import INGEST_READ_CHUNK_BYTES
+from .core import Card
+
+ReadProgressFn = Callable[[int], None]
+
+_WS = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+# A decode error this close to the end of the buffer may just be a value cut off by the
+# chunk boundary (e.g. 'tru', '-', a split \uXXXX escape); anything earlier is invalid input.
+_TRUNCATION_SLACK = 16
+
+
+def _maybe_truncated(e: json.JSONDecodeError, buf: str) -> bool:
+    return e.pos >= len(buf) - _TRUNCATION_SLACK or e.msg.startswith("Unterminated string")
+
+
+class _TextStream:
+    """Incrementally decoded UTF-8 text over a binary file, with a sliding buffer."""
+
+    def __init__(self, fp: BinaryIO, chunk_size: int, on_read: Optional[ReadProgressFn]):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.on_read = on_read
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer (dropping consumed text). Returns False at EOF."""
+        if self.eof:
+            return False
+        raw = self.fp.read(self.chunk_size)
+        self.bytes_read += len(raw)
+        if self.on_read:
+            self.on_read(self.bytes_read)
+        if not raw:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + self.decoder.decode(raw, final=self.eof)
+        self.pos = 0
+        return True
+
+    def skip_ws(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def decode_value(self):
+        """Decode one JSON value at the cursor, reading more input while it is incomplete."""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Only read on when the value may be incomplete, so a syntax error near the
+                # start of a large upload fails fast instead of buffering the rest of it
+                if _maybe_truncated(e, self.buf) and self.fill():
+                    continue
+                raise Exception(f"Invalid JSON. {e}")
+            # A value touching the end of the buffer (e.g. a number) may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _expect_end(s: _TextStream):
+    """Only whitespace may follow the top-level array, as with json.loads."""
+    if s.peek():
+        raise Exception("Invalid JSON. Extra data after the closing ']'.")
+
+
+def iter_json_array(fp: BinaryIO, chunk_size: Optional[int] = None, on_read: Optional[ReadProgressFn] = None) -> Iterator:
+    """Yield the elements of a top-level JSON array one at a time."""
+    s = _TextStream(fp, chunk_size or INGEST_READ_CHUNK_BYTES, on_read)
+    if s.peek() != "[":
+        raise Exception("JSON must be a list of objects with 'question' and 'answer' keys.")
+    s.pos += 1
+    if s.peek() == "]":
+        s.pos += 1
+        _expect_end(s)
+        return
+    while True:
+        yield s.decode_value()
+        ch = s.peek()
+        s.pos += 1
+        if ch == "]":
+            _expect_end(s)
+            return
+        if ch != ",":
+            raise Exception("Invalid JSON. Expected ',' or ']' between cards.")
+
+
+def iter_ndjson(fp: BinaryIO, chunk_size: Optional[int] = None, on_read: Optional[ReadProgressFn] = None) -> Iterator:
+    """Yield one decoded value per non-empty line of newline-delimited JSON."""
+    s = _TextStream(fp, chunk_size or INGEST_READ_CHUNK_BYTES, on_read)
+    line_no = 0
+    while True:
+        nl = s.buf.find("\n", s.pos)
+        if nl < 0:
+            if s.fill():
+                continue
+            nl = len(s.buf)
+            if s.pos >= nl:
+                return
+        line = s.buf[s.pos:nl].strip()
+        s.pos = nl + 1
+        line_no += 1
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise Exception(f"Invalid JSON on line {line_no}. {e}")
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw reader over a binary file that reports the bytes read so far."""
+
+    def __init__(self, fp: BinaryIO, on_read: Optional[ReadProgressFn]):
+        self.fp = fp
+        self.on_read = on_read
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.fp.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self.bytes_read += n
+        if self.on_read:
+            self.on_read(self.bytes_read)
+        return n
+
+
+def iter_delimited(
+    fp: BinaryIO,
+    delimiter: str = ",",
+    chunk_size: Optional[int] = None,
+    on_read: Optional[ReadProgressFn] = None,
+) -> Iterator[List[str]]:
+    """Yield the rows of a UTF-8 CSV/TSV file (RFC 4180 quoting) as lists of strings."""
+    # Card HTML can exceed the csv module's default 128 KiB field limit
+    csv.field_size_limit(2**31 - 1)
+    raw = io.BufferedReader(_CountingReader(fp, on_read), chunk_size or INGEST_READ_CHUNK_BYTES)
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        text.detach()  # leave the caller's file object open
+
+
+Column = Union[str, int]
+
+# File extension -> iter_cards format
+FORMATS_BY_EXTENSION = {
+    ".json": "auto",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".txt": "tsv",
+}
+
+
+def format_for_filename(name: str) -> str:
+    """The iter_cards format for a file name, from its extension ('auto' if unknown)."""
+    return FORMATS_BY_EXTENSION.get(os.path.splitext(name or "")[1].lower(), "auto")
+
+
+def parse_column(value: str) -> Column:
+    """A column given by a user: a 1-based number ('2') as a 0-based index, anything else as a header name."""
+    value = value.strip()
+    if value.isdigit():
+        if int(value) < 1:
+            raise Exception("Column numbers start at 1.")
+        return int(value) - 1
+    return value
+
+
+def _column_index(column: Column, header: Optional[Sequence[str]]) -> int:
+    if isinstance(column, int):
+        return column
+    if header is None:
+        raise Exception(f"Column {column!r} given by name, but the file has no header row.")
+    names = [h.strip().lower() for h in header]
+    if column.strip().lower() not in names:
+        raise Exception(f"Column {column!r} not found in the header ({', '.join(header)}).")
+    return names.index(column.strip().lower())
+
+
+def iter_delimited_cards(
+    fp: BinaryIO,
+    delimiter: str = ",",
+    header: bool = True,
+    columns: Optional[Sequence[Column]] = None,
+    chunk_size: Optional[int] = None,
+    on_read: Optional[ReadProgressFn] = None,
+) -> Iterator[Card]:
+    """
+    Yield cards from CSV/TSV rows. columns is (question, answer): header names (with
+    header=True; matched case-insensitively) or 0-based indexes. Defaults to the
+    'question' and 'answer' columns with a header, else the first two columns.
+    """
+    rows = iter_delimited(fp, delimiter, chunk_size, on_read)
+    head = next(rows, None) if header else None
+    if header and head is None:
+        return
+    if columns is None:
+        columns = ("question", "answer") if header else (0, 1)
+    qi, ai = (_column_index(c, head) for c in columns)
+    width = max(qi, ai)
+    for n, row in enumerate(rows, start=2 if header else 1):
+        if not row:
+            continue
+        if len(row) <= width:
+            raise Exception(f"Row {n} has {len(row)} column(s); expected at least {width + 1}.")
+        yield Card(None, row[qi], row[ai])
+
+
+def iter_cards(
+    fp: BinaryIO,
+    fmt: str = "auto",
+    chunk_size: Optional[int] = None,
+    on_read: Optional[ReadProgressFn] = None,
+    delimiter: Optional[str] = None,
+    header: bool = True,
+    columns: Optional[Sequence[Column]] = None,
+) -> Iterator[Card]:
+    """
+    Yield validated cards (Card records without an id) from a JSON array, NDJSON or CSV/TSV
+    file object. fmt is 'json', 'ndjson', 'csv', 'tsv' or 'auto' (a leading '[' means a JSON
+    array, otherwise NDJSON). For CSV/TSV, delimiter overrides ',' or tab and header/columns
+    are as in iter_delimited_cards. on_read(bytes_read) is called after every chunk read,
+    for progress reporting. A malformed record raises.
+    """
+    if fmt in ("csv", "tsv"):
+        delimiter = delimiter or ("," if fmt == "csv" else "\t")
+        yield from iter_delimited_cards(fp, delimiter, header, columns, chunk_size, on_read)
+        return
+    if fmt == "auto":
+        head = fp.read(4096)
+        fp.seek(0)
+        if head.startswith(codecs.BOM_UTF8):
+            head = head[len(codecs.BOM_UTF8):]
+        fmt = "json" if head.lstrip().startswith(b"[") else "ndjson"
+    reader = iter_json_array if fmt == "json" else iter_ndjson
+    for n, item in enumerate(reader(fp, chunk_size, on_read), start=1):
+        if not isinstance(item, dict) or "question" not in item or "answer" not in item:
+            raise Exception(f"Card #{n} is not structured correctly. Must contain 'question' and 'answer'.")
+        yield Card(None, item["question"], item["answer"])
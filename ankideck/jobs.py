@@ -0,0 +1,332 @@
+"""Background jobs for long imports, exports and moves.
+
+Jobs are recorded in the ``jobs`` table and executed by a small thread pool that
+lives as long as the app process, so they survive Streamlit reruns and browser
+refreshes. While a job runs, its progress is held in memory (the job's own
+write transactions would otherwise delay progress writes) and is written to the
+table when the job finishes. Each job records the pid of the process running it.
+When a process starts its runner, queued/running jobs whose process has exited
+(e.g. the app was restarted) are marked failed; jobs of another live process,
+such as the app while the CLI submits a job, are left alone.
+"""
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, List, Optional, BinaryIO
+
+from .config import JOB_WORKERS, UPLOADS_DIR, IMPORT_WRITE_BATCH_CARDS
+from .db import (
+    db_create_job, db_start_job, db_finish_job, db_request_job_cancel, db_fail_jobs, db_active_jobs,
+    db_get_job, db_list_jobs,
+    db_add_cards_bulk, db_export_deck_apkg, db_export_deck_text, db_export_deck_delta, db_move_deck_contents,
+)
+from .ingest import iter_cards
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (from JobContext.progress) once cancellation was requested."""
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting and cooperative cancellation."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        with _lock:
+            live = _live.get(self.job_id)
+            return bool(live and live["cancel"])
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Record progress; raises JobCancelled if the job was cancelled meanwhile."""
+        with _lock:
+            live = _live.get(self.job_id)
+            if live is not None:
+                live["progress_done"] = int(done)
+                if total is not None:
+                    live["progress_total"] = int(total)
+                if message is not None:
+                    live["message"] = message
+        if self.cancelled:
+            raise JobCancelled()
+
+
+JobHandler = Callable[[Dict, JobContext], Dict]
+_handlers: Dict[str, JobHandler] = {}
+_live: Dict[int, Dict] = {}
+_futures: Dict[int, Future] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def job_handler(kind: str):
+    """Register a function(params, ctx) -> result dict as the handler for a job kind."""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this pid is running (on this machine)."""
+    if os.name == "nt":
+        import ctypes  # os.kill(pid, 0) would terminate the process on Windows
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fail_orphaned_jobs():
+    """Mark queued/running jobs failed whose owning process has exited (or is this pid's previous life)."""
+    pid = os.getpid()
+    orphaned = [
+        j["id"] for j in db_active_jobs()
+        if j["owner_pid"] is None or j["owner_pid"] == pid or not _pid_alive(j["owner_pid"])
+    ]
+    if orphaned:
+        db_fail_jobs(orphaned, "Interrupted by an app restart.")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # This process has run no job yet, so any job still marked with its pid is a leftover
+            _fail_orphaned_jobs()
+            _executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix="ankideck-job")
+        return _executor
+
+
+def submit_job(kind: str, params: Dict, label: Optional[str] = None) -> int:
+    """Queue a job of a registered kind and return its id. params must be JSON-serializable."""
+    if kind not in _handlers:
+        raise Exception(f"Unknown job kind: {kind}")
+    executor = _get_executor()
+    job_id = db_create_job(kind, label or kind, params)
+    with _lock:
+        _live[job_id] = {"progress_done": 0, "progress_total": 0, "message": None, "cancel": False}
+        _futures[job_id] = executor.submit(_run_job, job_id, kind, params)
+    return job_id
+
+
+def _finish(job_id: int, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+    with _lock:
+        live = _live.pop(job_id, None) or {}
+        _futures.pop(job_id, None)
+    db_finish_job(
+        job_id, status, result=result, error=error,
+        progress_done=live.get("progress_done", 0),
+        progress_total=live.get("progress_total", 0),
+        message=live.get("message"),
+    )
+
+
+def _run_job(job_id: int, kind: str, params: Dict):
+    ctx = JobContext(job_id)
+    if ctx.cancelled:
+        _finish(job_id, "cancelled")
+        return
+    db_start_job(job_id)
+    try:
+        result = _handlers[kind](params, ctx)
+    except JobCancelled:
+        _finish(job_id, "cancelled")
+    except Exception as e:
+        _finish(job_id, "failed", error=str(e))
+    else:
+        _finish(job_id, "done", result=result)
+
+
+def _with_live_progress(row: Dict) -> Dict:
+    job = dict(row)  # a fresh dict, also when row is a cached one
+    with _lock:
+        live = _live.get(job["id"])
+        if live is not None:
+            job.update({k: live[k] for k in ("progress_done", "progress_total", "message")})
+            job["cancel_requested"] = int(live["cancel"] or job["cancel_requested"])
+    return job
+
+
+def job_status(job_id: int) -> Optional[Dict]:
+    """Return a job as a dict (params/result decoded, live progress merged in), or None."""
+    row = db_get_job(job_id)
+    return _with_live_progress(row) if row else None
+
+
+def list_jobs(limit: int = 20) -> List[Dict]:
+    """Return the most recent jobs, newest first. Rows come from the read cache; live progress is merged in."""
+    return [_with_live_progress(r) for r in db_list_jobs(limit)]
+
+
+def cancel_job(job_id: int) -> bool:
+    """Request cancellation. Queued jobs never start; running ones stop at their next progress report."""
+    with _lock:
+        live = _live.get(job_id)
+        if live is None:
+            return False
+        live["cancel"] = True
+        fut = _futures.get(job_id)
+    db_request_job_cancel(job_id)
+    if fut is not None and fut.cancel():
+        _finish(job_id, "cancelled")
+    return True
+
+
+def stage_upload(fp: BinaryIO, filename: str) -> str:
+    """Copy an uploaded file object to data/uploads/ in chunks so a job can read it after the rerun."""
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    path = os.path.join(UPLOADS_DIR, f"{uuid.uuid4().hex}_{os.path.basename(filename)}")
+    fp.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fp, out, 1024 * 1024)
+    return path
+
+
+@job_handler("import_cards")
+def _import_cards_job(params: Dict, ctx: JobContext) -> Dict:
+    """
+    params: deck_id, path (staged upload, removed afterwards), fmt ('auto'|'json'|'ndjson'|'csv'|'tsv'),
+    skip_near_duplicates; for CSV/TSV also delimiter, header and columns (see ingest.iter_cards).
+    Cards are committed every IMPORT_WRITE_BATCH_CARDS, so the import does not hold the
+    write lock for the whole file; a cancelled import keeps what was committed.
+    """
+    path = params["path"]
+    try:
+        total = os.path.getsize(path)
+        with open(path, "rb") as fp:
+            cards = iter_cards(
+                fp,
+                params.get("fmt", "auto"),
+                on_read=lambda n: ctx.progress(n, total, f"Read {n / 2**20:.1f} of {total / 2**20:.1f} MB"),
+                delimiter=params.get("delimiter"),
+                header=params.get("header", True),
+                columns=params.get("columns"),
+            )
+            return db_add_cards_bulk(
+                params["deck_id"],
+                cards,
+                skip_near_duplicates=params.get("skip_near_duplicates", False),
+                commit_every=IMPORT_WRITE_BATCH_CARDS,
+            )
+    finally:
+        if params.get("delete_after", True):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+@job_handler("import_anki")
+def _import_anki_job(params: Dict, ctx: JobContext) -> Dict:
+    """params: path (staged .apkg/.colpkg, removed afterwards), deck_name (optional single target), skip_near_duplicates."""
+    from .anki_import import import_anki_package
+
+    path = params["path"]
+    try:
+        return import_anki_package(
+            path,
+            deck_name=params.get("deck_name"),
+            skip_near_duplicates=params.get("skip_near_duplicates", False),
+            on_progress=lambda done, total: ctx.progress(done, total, f"Imported {done} of {total} notes"),
+        )
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@job_handler("import_batch")
+def _import_batch_job(params: Dict, ctx: JobContext) -> Dict:
+    """params: path (zip archive or directory), workers, force, delete_after (remove a staged zip afterwards)."""
+    from .bulk import import_deck_files
+
+    path = params["path"]
+    try:
+        results = import_deck_files(
+            path,
+            workers=params.get("workers"),
+            force=params.get("force", False),
+            progress=lambda done, total, r: ctx.progress(done, total, f"{r['source']} {r['status']}"),
+        )
+    finally:
+        if params.get("delete_after", False):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return {
+        "files": len(results),
+        "added": sum(r["added"] for r in results),
+        "skipped": sum(r["status"] == "skipped" for r in results),
+        "failed": [{"source": r["source"], "error": r["error"]} for r in results if r["status"] == "failed"],
+    }
+
+
+@job_handler("export_deck")
+def _export_deck_job(params: Dict, ctx: JobContext) -> Dict:
+    """
+    params: deck_id, deck_name, fmt ('apkg' or a text format: 'csv'|'tsv'|'ndjson'), delimiter, header;
+    changes_only (with since_export_id, optional) exports an .apkg of the cards changed since an earlier export.
+    """
+    ctx.progress(0, 1, f"Exporting {params['deck_name']}")
+    fmt = params.get("fmt", "apkg")
+    if params.get("changes_only"):
+        result = db_export_deck_delta(params["deck_id"], params["deck_name"], params.get("since_export_id"))
+        ctx.progress(1, 1, "Export finished")
+        return {"path": result["path"], "cards": result["cards"]}
+    if fmt == "apkg":
+        path = db_export_deck_apkg(params["deck_id"], params["deck_name"])
+    else:
+        path = db_export_deck_text(
+            params["deck_id"], params["deck_name"], fmt,
+            delimiter=params.get("delimiter"), header=params.get("header", True),
+        )
+    ctx.progress(1, 1, "Export finished")
+    return {"path": path}
+
+
+@job_handler("export_decks")
+def _export_decks_job(params: Dict, ctx: JobContext) -> Dict:
+    """params: deck_ids (None for all), workers, bundle (bool), fmt ('apkg'|'csv'|'tsv'|'ndjson')."""
+    from .bulk import export_decks, bundle_exports
+
+    results = export_decks(
+        params.get("deck_ids"),
+        workers=params.get("workers"),
+        fmt=params.get("fmt", "apkg"),
+        progress=lambda done, total, r: ctx.progress(done, total, f"{r['name']} {'done' if r['ok'] else 'failed'}"),
+    )
+    out = {"results": results}
+    if params.get("bundle"):
+        out["path"] = bundle_exports([r for r in results if r["ok"]])
+    return out
+
+
+@job_handler("move_deck")
+def _move_deck_job(params: Dict, ctx: JobContext) -> Dict:
+    """params: source_deck_id, target_deck_id."""
+    ctx.progress(0, 1, "Moving cards")
+    stats = db_move_deck_contents(params["source_deck_id"], params["target_deck_id"])
+    ctx.progress(1, 1, "Move finished")
+    return stats
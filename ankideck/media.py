@@ -0,0 +1,128 @@
+"""Content-addressed media store for images and audio on cards.
+
+Files live under MEDIA_DIR named after the SHA-256 of their content (``<sha256><ext>``,
+in a directory per first two hex digits), so the same file added for several cards or
+decks is stored once. Cards reference media the way Anki does, ``<img src="NAME">`` or
+``[sound:NAME]``, so the cards table only holds the short name. base64 ``data:`` URIs
+pasted into card HTML are moved into the store on import (extract_data_uris). The
+database side (media and card_media tables) is in ankideck.db.
+"""
+import os
+import re
+import base64
+import hashlib
+import binascii
+import mimetypes
+import tempfile
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from .config import MEDIA_DIR
+
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+MEDIA_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,8}$")
+_REF_RE = re.compile(r"""(?:\bsrc\s*=\s*["']?|\[sound:)([0-9a-f]{64}\.[a-z0-9]{1,8})""")
+_DATA_URI_RE = re.compile(r"data:([\w.+-]+/[\w.+-]+)(?:;[\w=.+-]+)*;base64,([A-Za-z0-9+/]+=*)")
+
+
+def media_path(name: str) -> str:
+    """Where a stored file lives on disk."""
+    return os.path.join(MEDIA_DIR, name[:2], name)
+
+
+def _extension(filename: Optional[str], mime: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext and mime:
+        ext = mimetypes.guess_extension(mime) or ""
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ".bin"
+
+
+def store_media(source: Union[str, bytes, BinaryIO], filename: Optional[str] = None, mime: Optional[str] = None) -> Dict:
+    """
+    Add a file (path, bytes or binary file object) to the store, hashing it while it is
+    copied in chunks. Content already stored is not written twice. filename (or the path)
+    gives the extension, else mime does. Returns {'name', 'sha256', 'size', 'mime', 'path'}.
+    """
+    if isinstance(source, str):
+        filename = filename or source
+    ext = _extension(filename, mime)
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=MEDIA_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if isinstance(source, bytes):
+                digest.update(source)
+                out.write(source)
+                size = len(source)
+            else:
+                src = open(source, "rb") if isinstance(source, str) else source
+                try:
+                    while True:
+                        chunk = src.read(_COPY_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+                finally:
+                    if isinstance(source, str):
+                        src.close()
+        sha = digest.hexdigest()
+        name = sha + ext
+        path = media_path(name)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return {"name": name, "sha256": sha, "size": size, "mime": mime or mimetypes.guess_type(name)[0], "path": path}
+
+
+def may_reference_media(text) -> bool:
+    """Cheap substring pre-check for media_refs: False means text references no media."""
+    return isinstance(text, str) and ("src" in text or "[sound:" in text)
+
+
+def media_refs(text: str) -> List[str]:
+    """Stored media names a card's HTML references (src="..." or [sound:...]), in order, without repeats."""
+    if not may_reference_media(text):
+        return []
+    return list(dict.fromkeys(_REF_RE.findall(text)))
+
+
+def media_reference(name: str) -> str:
+    """The snippet to put in a card to show (image) or play (audio/video) a stored file."""
+    mime = mimetypes.guess_type(name)[0] or ""
+    if mime.startswith(("audio/", "video/")):
+        return f"[sound:{name}]"
+    return f'<img src="{name}">'
+
+
+def extract_data_uris(text: str) -> Tuple[str, List[Dict]]:
+    """
+    Move base64 data: URIs in text into the store, replacing each with the stored name.
+    Returns (new text, stored media dicts). Text without 'data:' (or a non-string field,
+    e.g. a number) is returned as is.
+    """
+    if not isinstance(text, str) or "data:" not in text:
+        return text, []
+    stored: List[Dict] = []
+
+    def _replace(m: "re.Match") -> str:
+        try:
+            data = base64.b64decode(m.group(2), validate=True)
+        except (binascii.Error, ValueError):
+            return m.group(0)
+        media = store_media(data, mime=m.group(1).lower())
+        stored.append(media)
+        return media["name"]
+
+    return _DATA_URI_RE.sub(_replace, text), stored
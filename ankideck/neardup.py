@@ -0,0 +1,133 @@
+"""MinHash signatures and LSH buckets for near-duplicate card detection.
+
+A card's shingles are the words of its question and answer after lowercasing and
+dropping punctuation and articles, as sets, so cards that differ only in those or
+in word order get the same shingles. Each shingle is hashed into NEARDUP_NUM_PERM
+independent 32-bit values (one SHAKE-128 digest); the signature is their
+element-wise minimum, and the fraction of equal positions between two signatures
+estimates the Jaccard similarity of the shingle sets.
+
+For LSH the signature is cut into NEARDUP_BANDS bands; each band hashes to one
+64-bit bucket id. Cards sharing any bucket are candidates, so only candidates are
+compared instead of every pair. With the defaults (16 bands of 8) a pair at 0.9
+similarity becomes a candidate with probability > 99.9%, at 0.8 about 95%, and at
+0.5 about 6%; typical unrelated cards (similarity 0.1-0.2) almost never.
+"""
+import re
+import struct
+import hashlib
+import functools
+from typing import List, Set
+
+from .config import NEARDUP_NUM_PERM, NEARDUP_BANDS
+
+if NEARDUP_NUM_PERM % NEARDUP_BANDS:
+    raise Exception("ANKIDECK_NEARDUP_NUM_PERM must be a multiple of ANKIDECK_NEARDUP_BANDS.")
+
+ROWS_PER_BAND = NEARDUP_NUM_PERM // NEARDUP_BANDS
+PARAMS_TAG = f"{NEARDUP_NUM_PERM}x{NEARDUP_BANDS}"
+
+_STOPWORDS = frozenset(("a", "an", "the"))
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_SIG_FORMAT = f"<{NEARDUP_NUM_PERM}I"
+_MASK64 = (1 << 64) - 1
+# Fixed odd multipliers and per-band offsets for band_buckets
+_BAND_MULT = [m | 1 for m in struct.unpack(f"<{ROWS_PER_BAND}Q", hashlib.shake_128(b"ankideck-lsh-mult").digest(8 * ROWS_PER_BAND))]
+_BAND_SALT = list(struct.unpack(f"<{NEARDUP_BANDS}Q", hashlib.shake_128(b"ankideck-lsh-band").digest(8 * NEARDUP_BANDS)))
+_np = False  # numpy, imported on first use so importing ankideck.db stays cheap
+
+
+def _numpy():
+    """numpy, or None without it (it ships with Streamlit; the pure-Python path gives identical signatures)."""
+    global _np, _BAND_MULT_NP, _BAND_SALT_NP
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            _BAND_MULT_NP = numpy.array(_BAND_MULT, dtype=numpy.uint64)
+            _BAND_SALT_NP = numpy.array(_BAND_SALT, dtype=numpy.uint64)
+        _np = numpy
+    return _np
+
+
+def _words(text) -> Set[str]:
+    if text is None:
+        return set()
+    return {w for w in _NON_WORD.sub(" ", str(text).lower()).split() if w not in _STOPWORDS}
+
+
+def shingles(question, answer) -> Set[str]:
+    """Question and answer word sets, kept apart so a swapped card is not a duplicate."""
+    return {"q:" + w for w in _words(question)} | {"a:" + w for w in _words(answer)}
+
+
+@functools.lru_cache(maxsize=65536)
+def _shingle_hashes(shingle: str):
+    digest = hashlib.shake_128(shingle.encode("utf-8")).digest(4 * NEARDUP_NUM_PERM)
+    np = _numpy()
+    return np.frombuffer(digest, dtype="<u4") if np is not None else struct.unpack(_SIG_FORMAT, digest)
+
+
+def minhash(question, answer) -> bytes:
+    """The card's MinHash signature: NEARDUP_NUM_PERM little-endian uint32 values, as bytes."""
+    hashes = [_shingle_hashes(s) for s in (shingles(question, answer) or {"q:"})]
+    np = _numpy()
+    if np is not None:
+        return np.minimum.reduce(hashes).tobytes()
+    return struct.pack(_SIG_FORMAT, *map(min, zip(*hashes)))
+
+
+def band_buckets(sig: bytes) -> List[int]:
+    """
+    One signed 64-bit bucket id per band: a multilinear hash of the band's values (mod 2**64)
+    plus a per-band constant, so equal bands in different positions never share a bucket.
+    """
+    np = _numpy()
+    if np is not None:
+        rows = np.frombuffer(sig, dtype="<u4").astype(np.uint64).reshape(NEARDUP_BANDS, ROWS_PER_BAND)
+        return ((rows * _BAND_MULT_NP).sum(axis=1, dtype=np.uint64) + _BAND_SALT_NP).view(np.int64).tolist()
+    values = struct.unpack(_SIG_FORMAT, sig)
+    out = []
+    for band in range(NEARDUP_BANDS):
+        chunk = values[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        h = (sum(v * m for v, m in zip(chunk, _BAND_MULT)) + _BAND_SALT[band]) & _MASK64
+        out.append(h - (1 << 64) if h >= 1 << 63 else h)
+    return out
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    np = _numpy()
+    if np is not None:
+        return float(np.count_nonzero(np.frombuffer(a, dtype="<u4") == np.frombuffer(b, dtype="<u4"))) / NEARDUP_NUM_PERM
+    return sum(x == y for x, y in zip(struct.unpack(_SIG_FORMAT, a), struct.unpack(_SIG_FORMAT, b))) / NEARDUP_NUM_PERM
+
+
+class UnionFind:
+    """Disjoint sets over card ids, for turning similar pairs into clusters."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        root = parent.setdefault(x, x)
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+    def groups(self, min_size: int = 2) -> List[List[int]]:
+        out = {}
+        for x in self.parent:
+            out.setdefault(self.find(x), []).append(x)
+        return [sorted(g) for g in out.values() if len(g) >= min_size]
+
@@ -0,0 +1,160 @@
+"""Process-wide read cache for ankideck.db, shared by all sessions and threads.
+
+Results of @cached db_* reads (deck lists, lookups, counts, card pages) are kept in
+one LRU, bounded by READ_CACHE_MAX_ENTRIES and by READ_CACHE_MAX_ROWS rows in total.
+Each entry remembers the cache version it was read at and is only served while that
+version is current. The version changes when:
+
+- a @writes db_* function in this process returns (successfully or not), or
+- PRAGMA data_version, read on a private connection, changes — i.e. any other
+  connection committed: another process (CLI, bulk export workers) or code writing
+  without going through a @writes function. This is checked at most once every
+  READ_CACHE_CHECK_INTERVAL_S seconds, so cached reads of an idle library cost one
+  PRAGMA data_version per interval rather than a query per call, and writes from
+  other processes show up within that interval.
+
+Only the reads are covered here; db.db_init, which the app calls on every rerun,
+sets up the schema once per process and is a no-op after that.
+
+Callers get copies of the cached dicts, lists and Card records, never the cached
+objects themselves.
+"""
+import os
+import time
+import sqlite3
+import threading
+import functools
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .config import DB_PATH, READ_CACHE_MAX_ENTRIES, READ_CACHE_MAX_ROWS, READ_CACHE_CHECK_INTERVAL_S
+from .core import Card
+
+_lock = threading.RLock()
+_entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (version, rows, value)
+_rows = 0
+_version = 0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "data_version_changes": 0, "evictions": 0}
+_probe: Optional[sqlite3.Connection] = None
+_probe_key: Optional[tuple] = None
+_probe_data_version: Optional[int] = None
+_next_check = 0.0
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, Card):
+        return Card(value.id, value.question, value.answer)
+    return value
+
+
+def _weight(value) -> int:
+    return len(value) if isinstance(value, list) else 1
+
+
+def invalidate():
+    """Make every cached entry stale (they are dropped lazily, or by the LRU)."""
+    global _version
+    with _lock:
+        _version += 1
+        _stats["invalidations"] += 1
+
+
+def clear():
+    """Drop all entries and the data_version probe connection (e.g. when the database is closed)."""
+    global _rows, _probe, _probe_key, _probe_data_version
+    with _lock:
+        _entries.clear()
+        _rows = 0
+        if _probe is not None:
+            _probe.close()
+        _probe = _probe_key = _probe_data_version = None
+    invalidate()
+
+
+def _check_external_writes():
+    """Bump the version if another connection committed since the last check (rate-limited)."""
+    global _next_check, _probe, _probe_key, _probe_data_version
+    now = time.monotonic()
+    if now < _next_check:
+        return
+    _next_check = now + READ_CACHE_CHECK_INTERVAL_S
+    key = (os.getpid(), os.path.abspath(DB_PATH))
+    if _probe is not None and _probe_key != key:
+        _probe.close()
+        _probe = None
+    if _probe is None:
+        if not os.path.exists(DB_PATH):
+            return
+        _probe = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _probe_key, _probe_data_version = key, None
+    data_version = _probe.execute("PRAGMA data_version").fetchone()[0]
+    if data_version != _probe_data_version:
+        if _probe_data_version is not None:
+            _stats["data_version_changes"] += 1
+        # A fresh probe cannot tell what happened before it opened, so that also invalidates
+        _probe_data_version = data_version
+        invalidate()
+
+
+def cached(fn):
+    """Decorator for read-only db_* functions whose arguments are hashable."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _rows
+        if READ_CACHE_MAX_ENTRIES <= 0:
+            return fn(*args, **kwargs)
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with _lock:
+            _check_external_writes()
+            version = _version
+            hit = _entries.get(key)
+            if hit is not None:
+                if hit[0] == version:
+                    _entries.move_to_end(key)
+                    _stats["hits"] += 1
+                    return _copy(hit[2])
+                del _entries[key]
+                _rows -= hit[1]
+            _stats["misses"] += 1
+        value = fn(*args, **kwargs)
+        rows = _weight(value)
+        with _lock:
+            # Only store what was read at a still-current version; a write during the read makes it stale
+            if version == _version and rows <= READ_CACHE_MAX_ROWS:
+                old = _entries.pop(key, None)
+                if old is not None:
+                    _rows -= old[1]
+                _entries[key] = (version, rows, _copy(value))
+                _rows += rows
+                while len(_entries) > READ_CACHE_MAX_ENTRIES or _rows > READ_CACHE_MAX_ROWS:
+                    _, (_, old_rows, _) = _entries.popitem(last=False)
+                    _rows -= old_rows
+                    _stats["evictions"] += 1
+        return value
+
+    return wrapper
+
+
+def writes(fn):
+    """Decorator for mutating db_* functions: bumps the cache version once they return."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            invalidate()
+
+    return wrapper
+
+
+def stats() -> Dict:
+    """Hit/miss/invalidation counters and the current size."""
+    with _lock:
+        return {**_stats, "entries": len(_entries), "rows": _rows, "version": _version}
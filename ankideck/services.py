@@ -1,15 +1,19 @@
 import os
 import json
 import datetime
-import genanki
-from typing import List, Dict
+from typing import Iterable, Optional
 
 from .config import DECK_LIBRARY_DIR
-from .core import validate_cards, sanitize_filename
+from .core import validate_cards, sanitize_filename, card_pairs
 
 
-def save_validated_json(json_str: str, deck_name: str) -> str:
-    """Validate and save JSON to JSONs/<deck_name>_<timestamp>.json. Return full path."""
+def _record_artifact(kind: str, path: str, deck_id: Optional[int], deck_name: str):
+    from .db import db_record_artifact  # ankideck.db imports this module
+    db_record_artifact(kind, path, deck_id=deck_id, deck_name=deck_name)
+
+
+def save_validated_json(json_str: str, deck_name: str, deck_id: Optional[int] = None) -> str:
+    """Validate and save JSON to JSONs/<deck_name>_<timestamp>.json and catalog it. Return full path."""
     try:
         cards = json.loads(json_str)
     except Exception:
@@ -24,6 +28,7 @@ def save_validated_json(json_str: str, deck_name: str) -> str:
     json_path = os.path.join("JSONs", json_filename)
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(cards, f, ensure_ascii=False, indent=4)
+    _record_artifact("json", json_path, deck_id, deck_name)
     return json_path
 
 
@@ -34,33 +39,45 @@ def create_apkg(file_path: str, deck_name: str) -> str:
     return create_apkg_from_cards(cards, deck_name)
 
 
-def create_apkg_from_cards(cards: List[Dict], deck_name: str) -> str:
-    """Create an .apkg file directly from a list of card dicts and return its path."""
-    model = genanki.Model(
-        1607392319,
-        'Simple Model',
-        fields=[
-            {'name': 'Question'},
-            {'name': 'Answer'},
-        ],
-        templates=[
-            {
-                'name': 'Card 1',
-                'qfmt': '{{Question}}',
-                'afmt': '{{FrontSide}}<hr id="answer">{{Answer}}',
-            },
-        ])
-
-    deck = genanki.Deck(2059400110, deck_name)
-    for card in cards:
-        note = genanki.Note(model=model, fields=[card['question'], card['answer']])
+def create_apkg_from_cards(cards: Iterable, deck_name: str, deck_id: Optional[int] = None) -> str:
+    """
+    Create an .apkg file directly from card dicts, Card records or a CardBatch, catalog it and
+    return its path. base64 data: URIs are moved into the media store, and stored media the
+    cards reference is packaged with them.
+    """
+    import genanki  # heavy; only loaded once something is actually exported
+    from .apkg import anki_model, ANKI_DECK_ID
+    from .media import extract_data_uris, media_refs, media_path
+
+    model = anki_model()
+
+    deck = genanki.Deck(ANKI_DECK_ID, deck_name)
+    media = {}
+    for question, answer in card_pairs(cards):
+        question = extract_data_uris(question)[0]
+        answer = extract_data_uris(answer)[0]
+        for name in media_refs(question) + media_refs(answer):
+            media[name] = media_path(name)
+        note = genanki.Note(model=model, fields=[question, answer])
         deck.add_note(note)
 
+    apkg_path = get_deck_apkg_path(deck_name)
+    # genanki streams each file into the zip under its base name (the stored name)
+    genanki.Package(deck, media_files=[p for p in media.values() if os.path.isfile(p)]).write_to_file(apkg_path)
+    _record_artifact("apkg", apkg_path, deck_id, deck_name)
+    return apkg_path
+
+
+def get_deck_apkg_path(deck_name: str) -> str:
+    """Return the Decks/<deck_name>.apkg export path, creating Decks/ if needed."""
+    return get_deck_export_path(deck_name, ".apkg")
+
+
+def get_deck_export_path(deck_name: str, ext: str) -> str:
+    """Return the Decks/<deck_name><ext> export path, creating Decks/ if needed."""
     decks_dir = "Decks"
     os.makedirs(decks_dir, exist_ok=True)
-    apkg_path = os.path.join(decks_dir, deck_name + '.apkg')
-    genanki.Package(deck).write_to_file(apkg_path)
-    return apkg_path
+    return os.path.join(decks_dir, deck_name + ext)
 
 
 def get_deck_library_path(deck_name: str) -> str:
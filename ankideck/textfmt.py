@@ -0,0 +1,68 @@
+"""Streaming CSV/TSV and NDJSON writers.
+
+Write (question, answer) pairs — typically a live SQLite cursor — to a delimited or
+NDJSON text file one row at a time, in bounded memory. The readers for the same
+formats are in ankideck.ingest (iter_cards with fmt='csv', 'tsv' or 'ndjson').
+"""
+import csv
+import json
+from typing import Iterable, Optional, Tuple
+
+from .config import TEXT_EXPORT_BUFFER_BYTES
+
+# Text export format -> file extension
+TEXT_FORMATS = {"csv": ".csv", "tsv": ".tsv", "ndjson": ".ndjson"}
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def write_ndjson(path: str, cards: Iterable[Tuple[str, str]]) -> int:
+    """Write one {"question", "answer"} JSON object per line. Returns the number of cards."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="\n", buffering=TEXT_EXPORT_BUFFER_BYTES) as f:
+        write = f.write
+        for q, a in cards:
+            write('{"question": %s, "answer": %s}\n' % (_encode(q), _encode(a)))
+            count += 1
+    return count
+
+
+def write_delimited(
+    path: str,
+    cards: Iterable[Tuple[str, str]],
+    delimiter: str = ",",
+    header: bool = True,
+) -> int:
+    """
+    Write cards as UTF-8 CSV/TSV (RFC 4180 quoting, '\\n' line endings), with a
+    question,answer header row unless header=False. Returns the number of cards.
+    """
+    count = 0
+
+    def _counted():
+        nonlocal count
+        for row in cards:
+            count += 1
+            yield row
+
+    with open(path, "w", encoding="utf-8", newline="", buffering=TEXT_EXPORT_BUFFER_BYTES) as f:
+        writer = csv.writer(f, delimiter=delimiter, lineterminator="\n")
+        if header:
+            writer.writerow(("question", "answer"))
+        writer.writerows(_counted())
+    return count
+
+
+def write_text(
+    path: str,
+    fmt: str,
+    cards: Iterable[Tuple[str, str]],
+    delimiter: Optional[str] = None,
+    header: bool = True,
+) -> int:
+    """Write cards in one of TEXT_FORMATS ('csv', 'tsv' or 'ndjson'). Returns the number of cards."""
+    if fmt == "ndjson":
+        return write_ndjson(path, cards)
+    if fmt in ("csv", "tsv"):
+        return write_delimited(path, cards, delimiter or ("," if fmt == "csv" else "\t"), header)
+    raise Exception(f"Unknown text format '{fmt}'. Use one of: {', '.join(TEXT_FORMATS)}.")
@@ -9,3 +9,5 @@ from .mydecks import render_mydecks_tab
 from .preview import render_preview_tab
 from .history import render_history_tab
 from .sidebar import render_sidebar
+from .jobs import render_jobs_panel
+from .diagnostics import render_diagnostics_panel
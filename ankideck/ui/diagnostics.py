@@ -0,0 +1,62 @@
+import json
+import streamlit as st
+
+from ankideck import diagnostics, readcache
+
+
+def render_diagnostics_panel():
+    """Hidden panel (open the app with ?diag=1): db_* call stats and the slow-query log."""
+    st.markdown("---")
+    st.subheader("Diagnostics")
+    c1, c2, c3 = st.columns([1, 1, 1])
+    enabled = c1.toggle("Instrument database calls", value=diagnostics.is_enabled(), key="diag_enabled")
+    slow_ms = c2.number_input(
+        "Slow query threshold (ms)", min_value=0.0, value=float(diagnostics.snapshot()["slow_query_ms"]),
+        step=10.0, key="diag_slow_ms",
+    )
+    if enabled != diagnostics.is_enabled() or slow_ms != diagnostics.snapshot()["slow_query_ms"]:
+        diagnostics.set_enabled(enabled, slow_query_ms=slow_ms)
+    if c3.button("Reset", key="diag_reset"):
+        diagnostics.reset()
+
+    snap = diagnostics.snapshot()
+    if not snap["functions"]:
+        st.caption("No calls recorded yet." if snap["enabled"] else "Instrumentation is off.")
+    else:
+        rows = [
+            {
+                "Function": name,
+                "Calls": f["calls"],
+                "Errors": f["errors"],
+                "Mean ms": f["mean_ms"],
+                "p50 ≤ ms": f["p50_ms_le"],
+                "p99 ≤ ms": f["p99_ms_le"],
+                "Max ms": f["max_ms"],
+                "Total ms": f["total_ms"],
+                "Rows read": f["rows_read"],
+                "Rows written": f["rows_written"],
+                "Statements": f["statements"],
+            }
+            for name, f in sorted(snap["functions"].items(), key=lambda kv: -kv[1]["total_ms"])
+        ]
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    rc = readcache.stats()
+    st.caption(
+        f"Read cache: {rc['hits']} hits, {rc['misses']} misses, {rc['entries']} entries ({rc['rows']} rows), "
+        f"{rc['invalidations']} invalidations, {rc['evictions']} evictions."
+    )
+
+    st.markdown(f"**Slow queries** ({snap['slow_queries_total']} over {snap['slow_query_ms']:g} ms)")
+    for q in reversed(snap["slow_queries"][-20:]):
+        with st.expander(f"{q['ms']:.1f} ms — {q['function'] or 'outside db_*'} — {q['sql'][:80]}", expanded=False):
+            st.code(q["sql"], language="sql")
+            st.caption(f"Parameters: {q['params']}  ·  {q['at']}")
+            if q["plan"]:
+                st.code("\n".join(q["plan"]), language="text")
+
+    d1, d2 = st.columns(2)
+    d1.download_button("Download JSON", data=json.dumps(snap, indent=2), file_name="ankideck-diagnostics.json",
+                       mime="application/json", key="diag_dl_json")
+    d2.download_button("Download Prometheus text", data=diagnostics.prometheus_text(), file_name="ankideck.prom",
+                       mime="text/plain", key="diag_dl_prom")
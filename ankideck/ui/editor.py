@@ -3,8 +3,161 @@ import json
 import streamlit as st
 import streamlit.components.v1 as components
 
-from ankideck import sanitize_filename, db_get_deck_by_name, db_create_deck, db_add_cards
-from .helpers import parse_cards_from_text
+from ankideck import sanitize_filename, db_get_deck_by_name, db_create_deck, db_add_cards_bulk
+from ankideck.config import STREAMING_UPLOAD_THRESHOLD_BYTES, IMPORT_WORKERS
+from ankideck.ingest import iter_cards, format_for_filename, parse_column
+from ankideck.anki_import import import_anki_package
+from ankideck.jobs import submit_job, stage_upload
+from .helpers import parse_cards
+
+
+_SKIP_NEAR_HELP = "Also skip cards that are almost the same as one already in the deck (punctuation, articles, word order)."
+
+
+def _stats_message(stats) -> str:
+    msg = f"Added {stats['added']} new, {stats['duplicates']} duplicates"
+    if stats.get("near_duplicates"):
+        msg += f", {stats['near_duplicates']} near-duplicates skipped"
+    return msg + f". Now {stats['after']} total."
+
+
+def _should_stream(uploaded_file) -> bool:
+    # NDJSON and CSV/TSV never go through the JSON editor
+    return uploaded_file.size > STREAMING_UPLOAD_THRESHOLD_BYTES or format_for_filename(uploaded_file.name) != "auto"
+
+
+def _delimited_options(fmt: str) -> dict:
+    """CSV/TSV reader options from the user: iter_cards keyword arguments (JSON-serializable for jobs)."""
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        delimiter = st.text_input(
+            "Delimiter", value="," if fmt == "csv" else "tab", key="stream_delimiter", help="One character, or 'tab'."
+        )
+    with c2:
+        header = st.checkbox("Header row", value=True, key="stream_header")
+    with c3:
+        question = st.text_input(
+            "Question column", value="question" if header else "1", key="stream_question_col",
+            help="Header name, or column number (1 = first).",
+        )
+    with c4:
+        answer = st.text_input("Answer column", value="answer" if header else "2", key="stream_answer_col")
+    return {
+        "delimiter": "\t" if delimiter.strip().lower() in ("tab", "\\t") else delimiter,
+        "header": header,
+        "columns": [parse_column(question), parse_column(answer)],
+    }
+
+
+def _render_streaming_import(uploaded_file, deckname: str):
+    size_mb = uploaded_file.size / 2**20
+    st.info(
+        f"{uploaded_file.name} ({size_mb:.1f} MB) is imported directly into the deck without "
+        "loading it into the editor. Each card is validated and deduplicated as it is read."
+    )
+    fmt = format_for_filename(uploaded_file.name)
+    try:
+        options = _delimited_options(fmt) if fmt in ("csv", "tsv") else {}
+    except Exception as e:
+        st.error(f"Error: {e}")
+        return
+    background = st.checkbox(
+        "Run in background", value=True, key="stream_import_background",
+        help="Keep using the app while the file is imported; progress shows in the sidebar.",
+    )
+    skip_near = st.checkbox("Skip near-duplicates", value=False, key="stream_skip_near", help=_SKIP_NEAR_HELP)
+    if not st.button("Import into deck", type="primary", key="stream_import_btn"):
+        return
+    if not deckname.strip():
+        st.error("Please enter a deck name.")
+        return
+    deck_name = sanitize_filename(deckname)
+    deck = db_get_deck_by_name(deck_name) or db_create_deck(deck_name)
+    if background:
+        path = stage_upload(uploaded_file, uploaded_file.name)
+        submit_job(
+            "import_cards",
+            {"deck_id": deck["id"], "path": path, "fmt": fmt, "skip_near_duplicates": skip_near, **options},
+            label=f"Import {uploaded_file.name} into {deck_name}",
+        )
+        st.rerun()
+    bar = st.progress(0.0, text="Importing…")
+    total = max(1, uploaded_file.size)
+
+    def _on_read(bytes_read: int):
+        bar.progress(min(1.0, bytes_read / total), text=f"Read {bytes_read / 2**20:.1f} of {size_mb:.1f} MB")
+
+    try:
+        uploaded_file.seek(0)
+        cards = iter_cards(uploaded_file, fmt, on_read=_on_read, **options)
+        stats = db_add_cards_bulk(deck["id"], cards, skip_near_duplicates=skip_near)
+    except Exception as e:
+        st.error(f"Error: {e}")
+        return
+    bar.progress(1.0, text="Import finished")
+    st.success(_stats_message(stats))
+
+
+def _render_anki_import(uploaded_file, deckname: str):
+    st.info(
+        f"{uploaded_file.name} ({uploaded_file.size / 2**20:.1f} MB) is an Anki package. Its notes are imported "
+        "straight into the database (first field as question, second as answer), one deck per Anki deck."
+    )
+    into_one = st.checkbox(
+        "Put all cards into the deck named in the sidebar", value=False, key="anki_import_into_one",
+        help="Otherwise each Anki deck becomes a deck of the same name ('Parent::Child' becomes 'Parent - Child').",
+    )
+    background = st.checkbox("Run in background", value=True, key="anki_import_background")
+    skip_near = st.checkbox("Skip near-duplicates", value=False, key="anki_skip_near", help=_SKIP_NEAR_HELP)
+    if not st.button("Import package", type="primary", key="anki_import_btn"):
+        return
+    if into_one and not deckname.strip():
+        st.error("Please enter a deck name.")
+        return
+    target = deckname if into_one else None
+    if background:
+        path = stage_upload(uploaded_file, uploaded_file.name)
+        submit_job(
+            "import_anki",
+            {"path": path, "deck_name": target, "skip_near_duplicates": skip_near},
+            label=f"Import {uploaded_file.name}",
+        )
+        st.rerun()
+    bar = st.progress(0.0, text="Importing…")
+
+    def _on_progress(done: int, total: int):
+        bar.progress(min(1.0, done / max(1, total)), text=f"Imported {done} of {total} notes")
+
+    try:
+        uploaded_file.seek(0)
+        result = import_anki_package(uploaded_file, deck_name=target, skip_near_duplicates=skip_near, on_progress=_on_progress)
+    except Exception as e:
+        st.error(f"Error: {e}")
+        return
+    bar.progress(1.0, text="Import finished")
+    st.success(f"Imported {result['notes']} notes into {len(result['decks'])} deck(s).")
+    for r in result["decks"]:
+        st.caption(f"{r['name']}: " + _stats_message(r))
+
+
+def _render_batch_import(uploaded_file):
+    st.info(
+        f"{uploaded_file.name} ({uploaded_file.size / 2**20:.1f} MB) is imported as a batch: every JSON, NDJSON, "
+        "CSV or TSV file inside becomes (or is added to) the deck named after it. Files already imported "
+        "unchanged are skipped, so the same archive can be imported again safely."
+    )
+    c1, c2 = st.columns(2)
+    workers = c1.number_input("Worker processes", min_value=1, max_value=64, value=IMPORT_WORKERS, step=1, key="batch_import_workers")
+    force = c2.checkbox("Re-import unchanged files", value=False, key="batch_import_force")
+    if not st.button("Import archive", type="primary", key="batch_import_btn"):
+        return
+    path = stage_upload(uploaded_file, uploaded_file.name)
+    submit_job(
+        "import_batch",
+        {"path": path, "workers": int(workers), "force": force, "delete_after": True},
+        label=f"Import {uploaded_file.name}",
+    )
+    st.rerun()
 
 
 def render_editor_tab(input_mode: str, deckname: str):
@@ -14,7 +167,20 @@ def render_editor_tab(input_mode: str, deckname: str):
     uploaded_file = None
 
     if input_mode == "Upload JSON":
-        uploaded_file = st.file_uploader("Upload a JSON file", type=["json"], key="uploader")
+        uploaded_file = st.file_uploader(
+            "Upload a JSON, NDJSON, CSV/TSV file, an Anki package or a .zip of deck files",
+            type=["json", "ndjson", "jsonl", "csv", "tsv", "txt", "apkg", "colpkg", "zip"], key="uploader",
+        )
+        if uploaded_file is not None and (uploaded_file.name or "").lower().endswith((".apkg", ".colpkg")):
+            _render_anki_import(uploaded_file, deckname)
+            return
+        if uploaded_file is not None and (uploaded_file.name or "").lower().endswith(".zip"):
+            _render_batch_import(uploaded_file)
+            return
+        if uploaded_file is not None and _should_stream(uploaded_file):
+            # Too big (or NDJSON/CSV/TSV) for the text editor: import straight from the file object
+            _render_streaming_import(uploaded_file, deckname)
+            return
         if uploaded_file is not None:
             try:
                 json_text = uploaded_file.read().decode("utf-8")
@@ -26,6 +192,8 @@ def render_editor_tab(input_mode: str, deckname: str):
     else:
         json_text = st.text_area("Paste JSON here", value=json_text, height=200, key="json_text")
 
+    skip_near = st.checkbox("Skip near-duplicates", value=False, key="skip_near_dups", help=_SKIP_NEAR_HELP)
+
     # Place Validate on the left and Generate on the far right
     col_left, col_right = st.columns([4, 1])
     with col_left:
@@ -91,16 +259,17 @@ def render_editor_tab(input_mode: str, deckname: str):
         )
 
     if validate_clicked:
-        cards, err = parse_cards_from_text(st.session_state.get("json_text", ""))
-        if err:
-            st.error(err)
+        parsed = parse_cards(st.session_state.get("json_text", ""))
+        if parsed.error:
+            st.error(parsed.error)
         else:
+            cards = parsed.cards
             st.success("JSON looks good!")
             st.markdown("#### Quick stats")
             c1, c2 = st.columns(2)
             with c1:
                 st.markdown("<div class='metric-card'>Cards</div>", unsafe_allow_html=True)
-                st.metric(label="Total", value=len(cards))
+                st.metric(label="Total", value=len(cards), delta=f"{parsed.duplicates} repeated" if parsed.duplicates else None, delta_color="off")
             with c2:
                 st.markdown("<div class='metric-card'>Fields</div>", unsafe_allow_html=True)
                 st.metric(label="Per card", value="question, answer")
@@ -117,9 +286,9 @@ def render_editor_tab(input_mode: str, deckname: str):
             st.error("Please enter a deck name.")
         else:
             try:
-                cards, err = parse_cards_from_text(raw_text)
-                if err:
-                    st.error(err)
+                parsed = parse_cards(raw_text)
+                if parsed.error:
+                    st.error(parsed.error)
                 else:
                     deck_name = sanitize_filename(deckname)
                     # Create a new deck in DB if needed, or reuse existing by name
@@ -127,8 +296,8 @@ def render_editor_tab(input_mode: str, deckname: str):
                     if not deck:
                         deck = db_create_deck(deck_name)
 
-                    # Add cards to the deck
-                    stats = db_add_cards(deck["id"], cards)
+                    # Add cards to the deck, reusing the dedup keys computed while parsing
+                    stats = db_add_cards_bulk(deck["id"], parsed.cards, keys=parsed.keys, skip_near_duplicates=skip_near)
 
                     # Switch to My Decks tab on next render, but do not auto-open deck contents
                     # Clear any previously selected deck so My Decks shows only the list
@@ -137,7 +306,7 @@ def render_editor_tab(input_mode: str, deckname: str):
                     st.session_state["switch_to_mydecks"] = True
 
                     # Optionally show a quick success before rerun (may not be visible due to rerun)
-                    st.success(f"Added {stats['added']} new, {stats['duplicates']} duplicates. Now {stats['after']} total.")
+                    st.success(_stats_message(stats))
 
                     # Rerun to apply the tab switch
                     st.rerun()
@@ -1,7 +1,8 @@
-import json
 from typing import Tuple, List, Dict
 
-from ankideck import validate_cards
+import streamlit as st
+
+from ankideck import card_pipeline, ParsedCards, Card, db_get_deck_cards_page, db_count_deck_cards
 
 SAMPLE_JSON: List[Dict[str, str]] = [
     {"question": "What is the capital of France?", "answer": "Paris"},
@@ -9,14 +10,63 @@ SAMPLE_JSON: List[Dict[str, str]] = [
 ]
 
 
+def read_file(path: str) -> bytes:
+    """File contents, for a lazy st.download_button: functools.partial(read_file, path) is only called on click."""
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
 def parse_cards_from_text(txt: str) -> Tuple[List[Dict[str, str]] | None, str | None]:
-    txt = (txt or "").strip()
-    if not txt:
-        return None, "Please provide JSON data."
-    try:
-        data = json.loads(txt)
-    except Exception as e:
-        return None, f"Invalid JSON. {e}"
-    if not validate_cards(data):
-        return None, "JSON must be a list of objects with 'question' and 'answer' keys."
-    return data, None
+    parsed = parse_cards(txt)
+    if parsed.error:
+        return None, parsed.error
+    return parsed.cards, None
+
+
+def parse_cards(txt: str) -> ParsedCards:
+    """Parse, validate and key the cards in txt once; repeat calls with the same text hit the shared cache."""
+    return card_pipeline.run(txt)
+
+
+def render_card_pager(key: str, deck_id: int, page_size: int) -> Tuple[List[Card], int]:
+    """Render Prev/Next controls for a deck and return (cards_on_page, total_cards).
+
+    Pages are fetched by keyset (id > last id of the previous page); the stack of page
+    start cursors lives in session_state under `key`. Buttons use on_click callbacks so
+    this also works inside dialogs without a full-app rerun.
+    """
+    state = st.session_state.get(key)
+    if not state or state.get("deck_id") != deck_id:
+        state = {"deck_id": deck_id, "cursors": [0]}
+        st.session_state[key] = state
+    cursors = state["cursors"]
+
+    total = db_count_deck_cards(deck_id)
+    cards = db_get_deck_cards_page(deck_id, cursors[-1], page_size)
+    while not cards and len(cursors) > 1:
+        # Current page emptied (e.g. after deletes): fall back to the previous one
+        cursors.pop()
+        cards = db_get_deck_cards_page(deck_id, cursors[-1], page_size)
+
+    page = len(cursors)
+    max_page = max(1, (total + page_size - 1) // page_size)
+    has_next = len(cards) == page_size and page < max_page
+
+    def _prev():
+        if len(cursors) > 1:
+            cursors.pop()
+
+    def _next(after_id: int):
+        cursors.append(after_id)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("◀ Prev", key=f"{key}_prev", on_click=_prev, disabled=page <= 1)
+    info_col.caption(f"Page {page} of {max_page}")
+    next_col.button(
+        "Next ▶",
+        key=f"{key}_next",
+        on_click=_next,
+        args=(cards[-1]["id"] if cards else 0,),
+        disabled=not has_next,
+    )
+    return cards, total
@@ -1,61 +1,105 @@
 import os
+import functools
 import streamlit as st
 
+from ankideck import db_list_artifacts, db_artifact_stats, db_prune_artifacts
+from ankideck.config import ARTIFACT_KEEP_PER_KIND, ARTIFACT_MAX_AGE_DAYS, ARTIFACT_MAX_BYTES
+from .helpers import read_file
+
+
+_PAGE_SIZE = 20
+
+
+def _render_artifacts(kind: str, title: str, mime: str, empty: str):
+    st.subheader(title)
+    stats = db_artifact_stats().get(kind)
+    if not stats:
+        st.caption(empty)
+        return
+    st.caption(f"{stats['count']} files, {stats['bytes'] / 2**20:.1f} MB")
+    # Keyset pages over the catalog; the stack of page cursors lives in session_state
+    cursors = st.session_state.setdefault(f"history_{kind}_cursors", [None])
+    artifacts = db_list_artifacts(kind, limit=_PAGE_SIZE, before_id=cursors[-1])
+    for a in artifacts:
+        name = os.path.basename(a["path"])
+        if not os.path.exists(a["path"]):
+            st.caption(f"{name} — no longer on disk")
+            continue
+        # The file is only read when the button is clicked
+        st.download_button(
+            label=f"⬇️ {name}",
+            data=functools.partial(read_file, a["path"]),
+            file_name=name,
+            mime=mime,
+            key=f"artifact_{a['id']}",
+            width="content",
+        )
+        st.caption(f"{a['size'] / 1024:.1f} KB · {a['created_at'][:19].replace('T', ' ')}")
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("◀ Newer", key=f"history_{kind}_prev", disabled=len(cursors) <= 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Older ▶", key=f"history_{kind}_next", disabled=len(artifacts) < _PAGE_SIZE):
+        cursors.append(artifacts[-1]["id"])
+        st.rerun()
+
+
+def _render_quarantine():
+    """Duplicate cards the database upgrade took out of their decks (shown only if there are any)."""
+    from ankideck import db_list_quarantined_cards, db_clear_quarantine
+
+    quarantine = db_list_quarantined_cards(limit=_PAGE_SIZE)
+    if not quarantine["count"]:
+        return
+    st.warning(
+        f"{quarantine['count']} duplicate card(s) were removed from their decks when the database was "
+        "upgraded: each had the same question and answer as an older card in the same deck, which was kept."
+    )
+    with st.expander("Removed duplicates", expanded=False):
+        for c in quarantine["cards"]:
+            st.markdown(f"- **{c['deck_name'] or 'deleted deck'}**: {c['question']} → {c['answer']}")
+        if quarantine["count"] > len(quarantine["cards"]):
+            st.caption(f"… and {quarantine['count'] - len(quarantine['cards'])} more.")
+        if st.button("Discard them", key="quarantine_clear"):
+            db_clear_quarantine()
+            st.rerun()
+
 
 def render_history_tab():
     st.markdown("### Recent Files")
     col1, col2 = st.columns(2)
 
     with col1:
-        st.subheader("JSONs")
         try:
-            json_files = sorted(
-                [f for f in os.listdir("JSONs") if f.lower().endswith(".json")],
-                reverse=True,
-            )[:20]
-            if not json_files:
-                st.caption("No saved JSONs yet.")
-            for jf in json_files:
-                path = os.path.join("JSONs", jf)
-                with open(path, "r", encoding="utf-8") as fh:
-                    st.download_button(
-                        label=f"⬇️ {jf}",
-                        data=fh.read(),
-                        file_name=jf,
-                        mime="application/json",
-                        key=f"json_{jf}",
-                        width="content",
-                    )
+            _render_artifacts("json", "JSONs", "application/json", "No saved JSONs yet.")
         except Exception as e:
             st.warning(f"Could not list JSONs: {e}")
 
     with col2:
-        st.subheader("Decks (.apkg)")
         try:
-            deck_files = sorted(
-                [f for f in os.listdir("Decks") if f.lower().endswith(".apkg")],
-                reverse=True,
-            )[:20]
-            if not deck_files:
-                st.caption("No decks generated yet.")
-            for df in deck_files:
-                path = os.path.join("Decks", df)
-                try:
-                    with open(path, "rb") as fh:
-                        st.download_button(
-                            label=f"⬇️ {df}",
-                            data=fh,
-                            file_name=df,
-                            mime="application/octet-stream",
-                            key=f"deck_{df}",
-                            width="content",
-                        )
-                        st.caption(os.path.abspath(path))
-                except Exception as e:
-                    st.warning(f"Could not read {df}: {e}")
+            _render_artifacts("apkg", "Decks (.apkg)", "application/octet-stream", "No decks generated yet.")
+            if db_artifact_stats().get("bundle"):
+                _render_artifacts("bundle", "Bundles (.zip)", "application/zip", "")
+            if db_artifact_stats().get("text"):
+                _render_artifacts("text", "Text exports (CSV/TSV/NDJSON)", "text/plain", "")
         except Exception as e:
             st.warning(f"Could not list Decks: {e}")
 
+    with st.expander("Retention", expanded=False):
+        st.caption(
+            "Generated files are kept until you prune them here: keep the newest N per kind, and "
+            "optionally limit age and total size (0 = no limit). Files that were in JSONs/ and Decks/ "
+            "before the catalog existed are only removed from the list, never deleted. Entries whose "
+            "file was deleted by hand are dropped too:"
+        )
+        r1, r2, r3 = st.columns(3)
+        keep = r1.number_input("Keep newest", min_value=0, value=ARTIFACT_KEEP_PER_KIND, step=50, key="retention_keep")
+        max_age = r2.number_input("Max age (days, 0 = any)", min_value=0.0, value=ARTIFACT_MAX_AGE_DAYS, key="retention_age")
+        max_mb = r3.number_input("Max size per kind (MB, 0 = any)", min_value=0, value=ARTIFACT_MAX_BYTES // 2**20, key="retention_mb")
+        if st.button("Apply retention", key="retention_apply"):
+            removed = db_prune_artifacts(keep=int(keep), max_age_days=float(max_age), max_bytes=int(max_mb) * 2**20, check_files=True)
+            st.success(f"Removed {removed} file(s).")
+
     st.markdown("---")
     st.subheader("Database Decks (persistent)")
     try:
@@ -67,3 +111,33 @@ def render_history_tab():
             st.markdown(f"- {d['name']} — {d['card_count']} cards")
     except Exception as e:
         st.warning(f"Could not list database decks: {e}")
+    _render_quarantine()
+
+    st.markdown("---")
+    st.subheader("Export cache")
+    try:
+        from ankideck import db_export_cache_stats
+        stats = db_export_cache_stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Hits", stats["hits"])
+        c2.metric("Misses", stats["misses"])
+        c3.metric("Cached decks", stats["entries"])
+        c4.metric("Cache size", f"{stats['bytes'] / 2**20:.1f} MB")
+        st.caption("Exports of unchanged decks are served from the cache instead of being rebuilt.")
+    except Exception as e:
+        st.warning(f"Could not read export cache stats: {e}")
+
+    st.markdown("---")
+    st.subheader("Media store")
+    try:
+        from ankideck import db_media_stats, db_prune_media
+        stats = db_media_stats()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Files", stats["files"])
+        c2.metric("In use", stats["referenced"])
+        c3.metric("Size", f"{stats['bytes'] / 2**20:.1f} MB")
+        st.caption("Images and audio are stored once by content hash, however many cards or decks use them.")
+        if st.button("Remove unused media", key="media_prune"):
+            st.success(f"Removed {db_prune_media()} file(s).")
+    except Exception as e:
+        st.warning(f"Could not read media stats: {e}")
@@ -0,0 +1,79 @@
+import os
+import functools
+import streamlit as st
+
+from ankideck.jobs import list_jobs, cancel_job, ACTIVE_STATUSES
+from .helpers import read_file
+
+_STATUS_ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "🚫"}
+
+
+def _render_job(job):
+    icon = _STATUS_ICONS.get(job["status"], "•")
+    st.markdown(f"{icon} **{job['label']}**")
+    if job["status"] in ACTIVE_STATUSES:
+        total = job["progress_total"] or 0
+        frac = min(1.0, job["progress_done"] / total) if total else 0.0
+        st.progress(frac, text=job["message"] or job["status"].capitalize())
+        if job["cancel_requested"]:
+            st.caption("Cancelling…")
+        elif st.button("Cancel", key=f"job_cancel_{job['id']}"):
+            cancel_job(job["id"])
+            st.rerun()
+        return
+    if job["status"] == "failed":
+        st.caption(job["error"] or "Failed")
+        return
+    result = job["result"] or {}
+    if "notes" in result:
+        st.caption(f"Imported {result['notes']} notes into {len(result['decks'])} deck(s): {result['added']} new, {result['duplicates']} duplicates.")
+    elif "files" in result:
+        failed = result["failed"]
+        st.caption(
+            f"Imported {result['files'] - result['skipped'] - len(failed)} of {result['files']} file(s): "
+            f"{result['added']} new cards, {result['skipped']} unchanged file(s) skipped"
+            + (f", {len(failed)} failed ({', '.join(f['source'] for f in failed[:5])})." if failed else ".")
+        )
+    elif "moved" in result:  # before "added": move stats have it too
+        st.caption(f"Moved {result['moved']} cards ({result['duplicates']} duplicates dropped).")
+    elif "added" in result:
+        near = f", {result['near_duplicates']} near-duplicates skipped" if result.get("near_duplicates") else ""
+        st.caption(f"Added {result['added']} new, {result['duplicates']} duplicates{near}. Now {result['after']} total.")
+    elif "cards" in result:
+        st.caption(f"Exported {result['cards']} changed card(s)." if result["path"] else "No changes since the last export.")
+    elif "results" in result:
+        failed = [r for r in result["results"] if not r["ok"]]
+        st.caption(f"Exported {len(result['results']) - len(failed)} deck(s)" + (f", {len(failed)} failed." if failed else "."))
+    path = result.get("path")
+    if path and os.path.exists(path):
+        # Read on click only: the panel is a fragment that reruns every couple of seconds
+        st.download_button(
+            label=f"Download {os.path.basename(path)}",
+            data=functools.partial(read_file, path),
+            file_name=os.path.basename(path),
+            mime="application/zip" if path.endswith(".zip") else "application/octet-stream",
+            key=f"job_dl_{job['id']}",
+        )
+
+
+def render_jobs_panel(limit: int = 5):
+    """Recent background jobs, refreshed every couple of seconds while any is active."""
+    jobs = list_jobs(limit)
+    if not jobs:
+        return
+    active = any(j["status"] in ACTIVE_STATUSES for j in jobs)
+    _fragment = getattr(st, "fragment", None)
+
+    def _panel():
+        current = list_jobs(limit)
+        if active and not any(j["status"] in ACTIVE_STATUSES for j in current):
+            # Everything finished: rerun the whole app so deck lists and counts pick up the changes
+            st.rerun()
+        st.subheader("Background jobs")
+        for job in current:
+            _render_job(job)
+
+    if _fragment and active:
+        _fragment(run_every="2s")(_panel)()
+    else:
+        _panel()
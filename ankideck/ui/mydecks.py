@@ -5,9 +5,147 @@ import streamlit.components.v1 as components
 
 
 from ankideck import (
-    db_list_decks, db_create_deck, db_export_deck_apkg, db_delete_deck,
-    db_get_deck_cards, db_add_cards, db_update_card, db_get_deck_by_name, db_rename_deck,
+    db_list_decks, db_create_deck, db_delete_deck,
+    db_count_deck_cards, db_add_cards, db_update_card, db_get_deck_by_name, db_rename_deck,
+    db_search_cards, db_find_near_duplicates, db_delete_card, db_list_deck_exports,
+    db_add_media,
 )
+from ankideck.media import media_reference
+from ankideck.bulk import export_decks, bundle_exports
+from ankideck.config import EXPORT_WORKERS, NEARDUP_THRESHOLD
+from ankideck.jobs import submit_job
+from .helpers import render_card_pager
+
+
+_EXPORT_FORMATS = {
+    "apkg": "Anki package (.apkg)",
+    "csv": "CSV (.csv)",
+    "tsv": "TSV (.tsv)",
+    "ndjson": "NDJSON (.ndjson)",
+}
+
+
+def _render_bulk_export(decks):
+    with st.expander("Export several decks", expanded=False):
+        names = {d["id"]: d["name"] for d in decks}
+        selected = st.multiselect(
+            "Decks",
+            options=list(names),
+            default=list(names),
+            format_func=lambda i: names[i],
+            key="bulk_export_ids",
+        )
+        c1, c2 = st.columns(2)
+        workers = c1.number_input(
+            "Worker processes", min_value=1, max_value=64, value=EXPORT_WORKERS, step=1, key="bulk_export_workers",
+            help="With more than one worker the export runs as a background job, listed under Background jobs.",
+        )
+        fmt = c1.selectbox("Format", _EXPORT_FORMATS, format_func=_EXPORT_FORMATS.get, key="bulk_export_format")
+        as_bundle = c2.checkbox("Bundle as one .zip", value=True, key="bulk_export_bundle")
+        if st.button("Export selected 📦", key="bulk_export_btn", disabled=not selected):
+            # A process pool would block this session until every deck is written: hand it to
+            # the job runner. A single worker exports in-process, with a progress bar here.
+            if int(workers) > 1:
+                submit_job(
+                    "export_decks",
+                    {"deck_ids": list(selected), "workers": int(workers), "bundle": bool(as_bundle), "fmt": fmt},
+                    label=f"Export {len(selected)} deck(s)",
+                )
+                st.rerun()
+            bar = st.progress(0.0, text="Starting export…")
+
+            def _progress(done, total, result):
+                status = "done" if result["ok"] else f"failed: {result['error']}"
+                bar.progress(done / total, text=f"{done}/{total} — {result['name']} {status}")
+
+            results = export_decks(selected, workers=int(workers), progress=_progress, fmt=fmt)
+            failed = [r for r in results if not r["ok"]]
+            if failed:
+                st.error("Failed: " + ", ".join(f"{r['name']} ({r['error']})" for r in failed))
+            ok = [r for r in results if r["ok"]]
+            if as_bundle and ok:
+                path = bundle_exports(ok)
+                with open(path, "rb") as f:
+                    st.download_button(
+                        label=f"Download {os.path.basename(path)}",
+                        data=f,
+                        file_name=os.path.basename(path),
+                        mime="application/zip",
+                        key="bulk_export_dl",
+                    )
+                st.caption(os.path.abspath(path))
+            else:
+                for r in ok:
+                    st.caption(os.path.abspath(r["path"]))
+
+
+def _render_export_changes(deck: dict):
+    with st.expander("Export changes since last export", expanded=False):
+        exports = db_list_deck_exports(deck["id"], 1)
+        if not exports:
+            st.caption("This deck has not been exported yet. Export the full deck first.")
+            return
+        last = exports[0]
+        st.caption(
+            f"Last export: {last['created_at'][:16].replace('T', ' ')} ({last['mode']}, {last['cards']} cards). "
+            "The package only holds new and edited cards; Anki adds them to the same deck and updates edited notes."
+        )
+        if st.button("Export changes 📤", key=f"manage_delta_btn_{deck['id']}"):
+            submit_job(
+                "export_deck",
+                {"deck_id": deck["id"], "deck_name": deck["name"], "changes_only": True},
+                label=f"Export changes of {deck['name']}",
+            )
+            st.rerun()
+
+
+_MEDIA_TYPES = ["png", "jpg", "jpeg", "gif", "webp", "svg", "mp3", "ogg", "wav", "m4a", "mp4", "webm"]
+
+
+def _render_media_upload(deck_id: int):
+    with st.expander("Add images or audio", expanded=False):
+        files = st.file_uploader(
+            "Media files", type=_MEDIA_TYPES, accept_multiple_files=True, key=f"manage_media_{deck_id}"
+        )
+        if not files:
+            st.caption("Files are stored once by content and packaged with every export of a card that uses them.")
+            return
+        st.caption("Paste these into a card's question or answer:")
+        added = st.session_state.setdefault("media_added", {})  # upload id -> stored name, so reruns don't re-hash
+        for f in files:
+            if f.file_id not in added:
+                added[f.file_id] = db_add_media(f, filename=f.name, mime=f.type)["name"]
+            st.code(media_reference(added[f.file_id]), language="html")
+
+
+def _render_near_duplicates(deck_id: int):
+    with st.expander("Near-duplicates", expanded=False):
+        c1, c2 = st.columns(2)
+        scope = c1.radio("Look in", ["This deck", "All decks"], horizontal=True, key="neardup_scope")
+        threshold = c2.slider("Minimum similarity", 0.5, 1.0, NEARDUP_THRESHOLD, 0.05, key="neardup_threshold")
+        if st.button("Find near-duplicates", key="neardup_find"):
+            with st.spinner("Indexing and comparing cards…"):
+                st.session_state["neardup_clusters"] = db_find_near_duplicates(
+                    None if scope == "All decks" else deck_id, threshold
+                )
+        clusters = st.session_state.get("neardup_clusters")
+        if clusters is None:
+            return
+        if not clusters:
+            st.caption("No near-duplicates found.")
+            return
+        for cluster in clusters:
+            if len(cluster["cards"]) < 2:
+                continue
+            st.markdown(f"**{len(cluster['cards'])} cards** · similarity ≥ {cluster['min_similarity']:.2f}")
+            for c in cluster["cards"]:
+                q_col, a_col, act_col = st.columns([3, 3, 1])
+                q_col.write(c["question"])
+                a_col.write(f"{c['answer']} · _{c['deck_name']}_")
+                if act_col.button("Delete", key=f"neardup_del_{c['id']}"):
+                    db_delete_card(c["id"])
+                    cluster["cards"] = [x for x in cluster["cards"] if x["id"] != c["id"]]
+                    st.rerun()
 
 
 def render_mydecks_tab():
@@ -113,9 +251,31 @@ def render_mydecks_tab():
 
     colL = st.container()
     with colL:
-        decks = db_list_decks("")
+        search = st.text_input(
+            "Search",
+            key="mydecks_search",
+            placeholder="Search deck names and card text…",
+            label_visibility="collapsed",
+        ).strip()
+        if search:
+            hits = db_search_cards(search, limit=25)
+            st.markdown(f"##### Matching cards ({len(hits)}{'+' if len(hits) == 25 else ''})")
+            if not hits:
+                st.caption("No cards match this search.")
+            for h in hits:
+                st.markdown(
+                    f"- **{h['deck_name']}** · Q: {h['question_snippet']} — A: {h['answer_snippet']}"
+                )
+            st.markdown("##### Matching decks")
+
+        decks = db_list_decks(search)
+        if decks:
+            _render_bulk_export(decks)
         if not decks:
-            st.info("No decks yet. Use the + button to create one.")
+            if search:
+                st.caption("No deck names match this search.")
+            else:
+                st.info("No decks yet. Use the + button to create one.")
         else:
             for d in decks:
                 # Marker to style the following horizontal block as a card
@@ -130,20 +290,13 @@ def render_mydecks_tab():
                         if st.button("Manage ⚙️", key=f"manage_{d['id']}", help="Rename or append cards"):
                             st.session_state['manage_deck_id'] = d['id']
                     with b2:
-                        if st.button("Export 📤", key=f"export_{d['id']}", help="Export as Anki .apkg"):
-                            path = db_export_deck_apkg(d['id'], d['name'])
-                            if os.path.exists(path):
-                                with open(path, 'rb') as f:
-                                    st.download_button(
-                                        label=f"Download {os.path.basename(path)}",
-                                        data=f,
-                                        file_name=os.path.basename(path),
-                                        mime="application/octet-stream",
-                                        key=f"dl_{d['id']}",
-                                    )
-                                    st.caption(os.path.abspath(path))
-                            else:
-                                st.error("Failed to export deck.")
+                        if st.button("Export 📤", key=f"export_{d['id']}", help="Export as Anki .apkg (download it under Background jobs)"):
+                            submit_job(
+                                "export_deck",
+                                {"deck_id": d["id"], "deck_name": d["name"], "fmt": "apkg"},
+                                label=f"Export {d['name']}",
+                            )
+                            st.rerun()
                     with b3:
                         if st.button("Delete 🗑️", key=f"del_{d['id']}", help="Delete this deck"):
                             st.session_state['confirm_delete_deck_id'] = d['id']
@@ -239,23 +392,50 @@ def render_mydecks_tab():
 
                     # Deck contents (compact, paginated) inside expander
                     with st.expander("Deck contents", expanded=False):
-                        cards = db_get_deck_cards(target["id"])
-                        total = len(cards)
-                        page_size = 10
-                        max_page = max(1, (total + page_size - 1) // page_size)
-                        page = st.number_input(
-                            "Page",
-                            min_value=1,
-                            max_value=max_page,
-                            value=1,
-                            step=1,
-                            key=f"manage_cards_page_{target['id']}"
-                        )
-                        start = (page - 1) * page_size
-                        end = min(start + page_size, total)
-                        view_rows = [{"Question": c["question"], "Answer": c["answer"]} for c in cards[start:end]]
+                        cards, _ = render_card_pager(f"manage_cards_page_{target['id']}", target["id"], page_size=10)
+                        view_rows = [{"Question": c["question"], "Answer": c["answer"]} for c in cards]
                         st.dataframe(view_rows, use_container_width=True, hide_index=True, height=260)
 
+                    # Move everything into another deck as a background job
+                    others = {d["id"]: d["name"] for d in decks if d["id"] != target["id"]}
+                    if others:
+                        with st.expander("Move all cards to another deck", expanded=False):
+                            dest = st.selectbox(
+                                "Target deck",
+                                options=list(others),
+                                format_func=lambda i: others[i],
+                                key=f"manage_move_target_{target['id']}",
+                            )
+                            if st.button("Move cards", key=f"manage_move_btn_{target['id']}"):
+                                submit_job(
+                                    "move_deck",
+                                    {"source_deck_id": target["id"], "target_deck_id": dest},
+                                    label=f"Move {target['name']} → {others[dest]}",
+                                )
+                                st.rerun()
+
+                    _render_media_upload(target["id"])
+                    _render_export_changes(target)
+
+                    # Stream the deck to a CSV/TSV/NDJSON file as a background job (shows up in History)
+                    with st.expander("Export as text", expanded=False):
+                        text_formats = {k: v for k, v in _EXPORT_FORMATS.items() if k != "apkg"}
+                        c1, c2 = st.columns(2)
+                        text_fmt = c1.selectbox(
+                            "Format", text_formats, format_func=text_formats.get, key=f"manage_text_fmt_{target['id']}"
+                        )
+                        header = c2.checkbox(
+                            "Header row", value=True, key=f"manage_text_header_{target['id']}",
+                            disabled=text_fmt == "ndjson",
+                        )
+                        if st.button("Export", key=f"manage_text_export_btn_{target['id']}"):
+                            submit_job(
+                                "export_deck",
+                                {"deck_id": target["id"], "deck_name": target["name"], "fmt": text_fmt, "header": header},
+                                label=f"Export {target['name']} as {text_fmt.upper()}",
+                            )
+                            st.rerun()
+
                     # Rename deck (moved to bottom) inside expander
                     with st.expander("Rename deck", expanded=False):
                         new_name = st.text_input("New name", value=target["name"], key=f"manage_rename_{target['id']}")
@@ -280,18 +460,12 @@ def render_mydecks_tab():
     sel_id = st.session_state.get("selected_deck_id")
     sel_name = st.session_state.get("selected_deck_name", "")
     if sel_id:
-        cards = db_get_deck_cards(sel_id)
-        total = len(cards)
-        st.markdown(f"#### Deck: {sel_name} — {total} cards")
-        page_size = 20
-        max_page = max(1, (total + page_size - 1) // page_size)
-        page = st.number_input("Page", min_value=1, max_value=max_page, value=1, step=1, key="cards_page")
-        start = (page - 1) * page_size
-        end = min(start + page_size, total)
+        st.markdown(f"#### Deck: {sel_name} — {db_count_deck_cards(sel_id)} cards")
+        cards, total = render_card_pager("cards_page", sel_id, page_size=20)
         if total == 0:
             st.info("This deck is empty. Append some cards.")
         else:
-            for c in cards[start:end]:
+            for c in cards:
                 with st.container():
                     q_col, a_col, act_col = st.columns([3, 3, 1])
                     new_q = q_col.text_input("Question", value=c["question"], key=f"q_{c['id']}")
@@ -307,6 +481,7 @@ def render_mydecks_tab():
                         db_delete_card(c["id"])
                         st.warning("Deleted")
                         st.rerun()
+        _render_near_duplicates(sel_id)
 
     components.html(
         """
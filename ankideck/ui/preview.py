@@ -1,6 +1,6 @@
 import streamlit as st
 
-from ankideck import db_get_deck_cards_by_name, sanitize_filename
+from ankideck import db_get_deck_by_name, db_get_deck_cards_page, db_count_deck_cards, sanitize_filename, cards_as_dicts
 from .helpers import parse_cards_from_text
 
 
@@ -27,15 +27,16 @@ def render_preview_tab(deckname: str):
     st.markdown("### Current Database Deck Snapshot")
     if deckname.strip():
         safe_name = sanitize_filename(deckname)
-        db_cards = db_get_deck_cards_by_name(safe_name)
+        deck = db_get_deck_by_name(safe_name)
+        db_cards = db_get_deck_cards_page(deck["id"], 0, 20) if deck else []
         c1, c2 = st.columns(2)
         with c1:
-            st.metric("Saved cards", len(db_cards))
+            st.metric("Saved cards", db_count_deck_cards(deck["id"]) if deck else 0)
         with c2:
             st.metric("Deck name", safe_name)
         if db_cards:
             st.markdown("#### First 20 from saved deck")
-            st.dataframe(db_cards[:20], height=300, width="content")
+            st.dataframe(cards_as_dicts(db_cards), height=300, width="content")
         else:
             st.info("No saved deck with this name in the database yet. Create one from My Decks.")
     else:
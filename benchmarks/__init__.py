@@ -0,0 +1,5 @@
+"""Benchmarks for the ankideck data layer and exporters.
+
+Run a benchmark as a module from the repository root, e.g.
+``python -m benchmarks.apkg_export --cards 100000``.
+"""
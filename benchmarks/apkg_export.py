@@ -0,0 +1,109 @@
+"""Compare the genanki export path with the streaming .apkg writer.
+
+    python -m benchmarks.apkg_export --cards 100000
+
+Both exporters run against the same synthetic deck in a throwaway working
+directory. For each one it reports wall time and peak Python heap
+(tracemalloc). It also checks that the two packages hold the same
+collection once ids and timestamps are pinned.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+
+import genanki
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _collection_dump(apkg_path: str) -> dict:
+    """Read back the parts of a package that Anki imports."""
+    with tempfile.TemporaryDirectory() as tmp:
+        with zipfile.ZipFile(apkg_path) as z:
+            names = sorted(z.namelist())
+            media = z.read("media").decode("utf-8")
+            z.extract("collection.anki2", tmp)
+        conn = sqlite3.connect(os.path.join(tmp, "collection.anki2"))
+        try:
+            dump = {
+                "files": names,
+                "media": media,
+                "col": conn.execute("SELECT crt, mod, scm, ver, conf, models, decks, dconf, tags FROM col").fetchall(),
+                "notes": conn.execute("SELECT id, guid, mid, mod, tags, flds, sfld, csum, flags, data FROM notes ORDER BY id").fetchall(),
+                "cards": conn.execute("SELECT * FROM cards ORDER BY id").fetchall(),
+            }
+        finally:
+            conn.close()
+    return dump
+
+
+def run(n_cards: int, verify: bool = True) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ankideck-bench-")
+    os.chdir(workdir)
+    import ankideck
+    from ankideck.apkg import write_apkg, anki_model, ANKI_DECK_ID
+
+    ankideck.db_init()
+    deck = ankideck.db_create_deck("bench")
+    ankideck.db_add_cards_bulk(
+        deck["id"],
+        ({"question": f"Question {i} <b>about</b> topic {i % 97}", "answer": f"Answer {i}"} for i in range(n_cards)),
+    )
+
+    def current_path():
+        return ankideck.create_apkg_from_cards(ankideck.db_get_deck_cards(deck["id"]), "bench_genanki")
+
+    def streaming_path():
+        return ankideck.db_export_deck_apkg(deck["id"], "bench_streaming")
+
+    report = {"cards": n_cards}
+    for label, fn in (("genanki", current_path), ("streaming", streaming_path)):
+        path, elapsed, peak = _measure(fn)
+        report[label] = {
+            "seconds": round(elapsed, 3),
+            "cards_per_second": round(n_cards / elapsed) if elapsed else None,
+            "peak_python_heap_mb": round(peak / 2**20, 1),
+            "apkg_bytes": os.path.getsize(path),
+        }
+
+    if verify:
+        ts = 1_700_000_000.0
+        g_deck = genanki.Deck(ANKI_DECK_ID, "bench")
+        model = anki_model()
+        for row in ankideck.db_iter_deck_cards(deck["id"]):
+            g_deck.add_note(genanki.Note(model=model, fields=[row[0], row[1]]))
+        genanki.Package(g_deck).write_to_file("verify_genanki.apkg", timestamp=ts)
+        write_apkg("verify_streaming.apkg", "bench", ankideck.db_iter_deck_cards(deck["id"]), timestamp=ts)
+        report["equivalent"] = _collection_dump("verify_genanki.apkg") == _collection_dump("verify_streaming.apkg")
+
+    report["workdir"] = workdir
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=50_000)
+    parser.add_argument("--no-verify", action="store_true", help="Skip the package equivalence check.")
+    args = parser.parse_args(argv)
+    report = run(args.cards, verify=not args.no_verify)
+    print(json.dumps(report, indent=2))
+    return 0 if report.get("equivalent", True) else 1
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())
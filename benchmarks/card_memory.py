@@ -0,0 +1,79 @@
+"""Memory held by one full-deck read as card dicts, Card records and a CardBatch.
+
+    python -m benchmarks.card_memory --cards 1000000
+
+Each variant reads the same deck from the database with its own cursor and keeps
+the result; the figure is what tracemalloc still sees allocated afterwards, so the
+question/answer strings are included in every variant. "per_card_overhead" is that
+figure minus the strings, i.e. the container cost per card.
+"""
+import os
+import gc
+import sys
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def run(n_cards: int) -> dict:
+    import ankideck
+    from ankideck import Card, CardBatch
+    from ankideck.db import _connect
+
+    os.chdir(tempfile.mkdtemp(prefix="ankideck-bench-"))
+    ankideck.db_init()
+    deck = ankideck.db_create_deck("memory")
+    ankideck.db_add_cards_bulk(
+        deck["id"],
+        ({"question": f"Question {i} about topic {i % 97}?", "answer": f"Answer {i}"} for i in range(n_cards)),
+    )
+    sql = "SELECT id, question, answer FROM cards WHERE deck_id = ? ORDER BY id ASC"
+
+    def rows():
+        with _connect() as conn:
+            yield from conn.execute(sql, (deck["id"],))
+
+    variants = {
+        "dicts": lambda: [{"id": r[0], "question": r[1], "answer": r[2]} for r in rows()],
+        "cards": lambda: [Card(*r) for r in rows()],
+        "batch": lambda: CardBatch.from_rows(rows()),
+    }
+    report = {"cards": n_cards}
+    strings = None
+    for label, build in variants.items():
+        result, current, peak = _measure(build)
+        if strings is None:
+            strings = sum(sys.getsizeof(c["question"]) + sys.getsizeof(c["answer"]) for c in result)
+        report[label] = {
+            "retained_mb": round(current / 2**20, 1),
+            "peak_mb": round(peak / 2**20, 1),
+            "per_card_overhead_bytes": round((current - strings) / n_cards, 1),
+        }
+        del result
+    report["string_mb"] = round(strings / 2**20, 1)
+    for label in ("cards", "batch"):
+        report[label]["saved_vs_dicts_pct"] = round(100 * (1 - report[label]["retained_mb"] / report["dicts"]["retained_mb"]), 1)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.cards), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())
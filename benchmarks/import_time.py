@@ -0,0 +1,91 @@
+"""Cold-import budget check for the ankideck package.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 40 --db-budget-ms 120 --runs 7
+
+Each statement runs in a fresh interpreter under ``python -X importtime``; the cost
+is the summed cumulative time of every module the statement imported (everything
+after interpreter start-up), best of --runs. The exit status is 1 if a statement
+goes over its budget or pulls in a module that should only load on demand
+(genanki for exports, numpy for near-duplicate detection), so it can run in CI.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+# Modules that must not be loaded by these imports
+HEAVY_MODULES = ("genanki", "numpy", "pandas")
+# Default budgets (ms) for the checked statements
+BUDGET_MS = 25.0
+DB_BUDGET_MS = 100.0
+
+
+def _import_profile(statement: str) -> Tuple[float, List[str]]:
+    """(milliseconds, imported top-level module names) for one cold run of statement."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, cwd=os.getcwd(), check=True,
+    )
+    total_us = 0
+    modules = []
+    started = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not started:
+            # Interpreter start-up ends with site and its dependencies
+            started = name.strip() == "site"
+            continue
+        modules.append(name.strip())
+        if not name[1:].startswith(" "):  # top level: its cumulative time covers its children
+            total_us += int(cumulative)
+    return total_us / 1000.0, modules
+
+
+def run(statements: Dict[str, float], runs: int) -> Dict:
+    report = {}
+    for statement, budget_ms in statements.items():
+        samples = []
+        loaded = set()
+        for _ in range(runs):
+            ms, modules = _import_profile(statement)
+            samples.append(ms)
+            loaded.update(m.split(".")[0] for m in modules)
+        heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+        best = min(samples)
+        report[statement] = {
+            "best_ms": round(best, 1),
+            "median_ms": round(sorted(samples)[len(samples) // 2], 1),
+            "budget_ms": budget_ms,
+            "heavy_modules": heavy,
+            "ok": best <= budget_ms and not heavy,
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Budget for 'import ankideck'.")
+    parser.add_argument("--db-budget-ms", type=float, default=DB_BUDGET_MS, help="Budget for 'from ankideck import db_init'.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    report = run(
+        {"import ankideck": args.budget_ms, "from ankideck import db_init": args.db_budget_ms},
+        max(1, args.runs),
+    )
+    print(json.dumps(report, indent=2))
+    failed = [s for s, r in report.items() if not r["ok"]]
+    for s in failed:
+        r = report[s]
+        reason = f"pulled in {', '.join(r['heavy_modules'])}" if r["heavy_modules"] else f"{r['best_ms']} ms > {r['budget_ms']} ms"
+        print(f"Import budget exceeded: {s!r} {reason}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Benchmark suite for the ankideck data layer and exporters.
+
+    python -m benchmarks.suite --sizes 1000,10000,100000 --output bench.json
+    python -m benchmarks.suite --sizes 1000,10000,100000 --baseline bench.json
+
+Every (case, size) pair runs in its own Python process with its own throwaway
+working directory and database, so peak RSS is per case and one case cannot warm
+the caches of the next. Cards come from benchmarks.synthetic with a fixed seed.
+
+The JSON report has stable keys and ordering and no timestamps, so two reports can
+be diffed directly. With --baseline, p50 latencies are compared with an earlier
+report and the exit status is 1 if any case got slower than --tolerance allows.
+
+Latencies are per operation; p50/p99 use the nearest-rank method over the
+--repeats samples (db_list_decks is sampled 20x as often, being a cheap call).
+Throughput is items per second at the p50 latency.
+"""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .synthetic import synthetic_cards
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CaseFn = Callable[[List[Dict], argparse.Namespace], Tuple[int, List[float]]]
+CASES: Dict[str, CaseFn] = {}
+
+
+def _case(name: str):
+    def decorator(fn: CaseFn) -> CaseFn:
+        CASES[name] = fn
+        return fn
+    return decorator
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    s = sorted(samples)
+    return s[max(0, math.ceil(pct / 100 * len(s)) - 1)]
+
+
+def _split(cards: List[Dict], parts: int) -> List[List[Dict]]:
+    size = max(1, math.ceil(len(cards) / parts))
+    return [cards[i:i + size] for i in range(0, len(cards), size)]
+
+
+@_case("merge_cards")
+def _bench_merge_cards(cards, args):
+    from ankideck import merge_cards
+    half = len(cards) // 2
+    existing, new = cards[:half], cards[half:]
+    return len(cards), [_timed(lambda: merge_cards(existing, new)) for _ in range(args.repeats)]
+
+
+@_case("db_add_cards")
+def _bench_db_add_cards(cards, args):
+    import ankideck
+    ankideck.db_init()
+    samples = []
+    for r in range(args.repeats):
+        deck = ankideck.db_create_deck(f"add {r}")
+        samples.append(_timed(lambda: ankideck.db_add_cards(deck["id"], cards)))
+    return len(cards), samples
+
+
+@_case("db_list_decks")
+def _bench_db_list_decks(cards, args):
+    import ankideck
+    ankideck.db_init()
+    chunks = _split(cards, args.decks)
+    for i, chunk in enumerate(chunks):
+        ankideck.db_add_cards_bulk(ankideck.db_create_deck(f"deck {i}")["id"], chunk)
+    return len(chunks), [_timed(lambda: ankideck.db_list_decks("")) for _ in range(args.repeats * 20)]
+
+
+@_case("db_get_deck_cards")
+def _bench_db_get_deck_cards(cards, args):
+    import ankideck
+    ankideck.db_init()
+    deck = ankideck.db_create_deck("read")
+    ankideck.db_add_cards_bulk(deck["id"], cards)
+    return len(cards), [_timed(lambda: ankideck.db_get_deck_cards(deck["id"])) for _ in range(args.repeats)]
+
+
+@_case("db_move_deck_contents")
+def _bench_db_move_deck_contents(cards, args):
+    import ankideck
+    ankideck.db_init()
+    samples = []
+    for r in range(args.repeats):
+        src = ankideck.db_create_deck(f"src {r}")
+        dst = ankideck.db_create_deck(f"dst {r}")
+        ankideck.db_add_cards_bulk(src["id"], cards)
+        samples.append(_timed(lambda: ankideck.db_move_deck_contents(src["id"], dst["id"])))
+    return len(cards), samples
+
+
+@_case("create_apkg_from_cards")
+def _bench_create_apkg(cards, args):
+    from ankideck import db_init, create_apkg_from_cards
+    db_init()
+    return len(cards), [_timed(lambda: create_apkg_from_cards(cards, "bench")) for _ in range(args.repeats)]
+
+
+@_case("json_migration")
+def _bench_json_migration(cards, args):
+    import ankideck
+    from ankideck.config import DECK_LIBRARY_DIR
+    samples = []
+    for _ in range(args.repeats):
+        # A fresh directory per repeat: the migration only runs on a new database
+        ankideck.db_close()
+        os.chdir(tempfile.mkdtemp(prefix="ankideck-bench-"))
+        os.makedirs(DECK_LIBRARY_DIR)
+        for i, chunk in enumerate(_split(cards, args.decks)):
+            with open(os.path.join(DECK_LIBRARY_DIR, f"deck {i}.json"), "w", encoding="utf-8") as f:
+                json.dump(chunk, f, ensure_ascii=False)
+        samples.append(_timed(ankideck.db_init))
+    return len(cards), samples
+
+
+def _run_worker(args) -> Dict:
+    os.chdir(tempfile.mkdtemp(prefix="ankideck-bench-"))
+    cards = synthetic_cards(args.cards, args.text_length, args.dup_rate, args.seed)
+    data_rss = _peak_rss_mb()
+    items, samples = CASES[args.worker](cards, args)
+    p50 = _percentile(samples, 50)
+    return {
+        "case": args.worker,
+        "cards": args.cards,
+        "items_per_op": items,
+        "samples": len(samples),
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "throughput_per_s": round(items / p50, 1) if p50 > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "data_rss_mb": data_rss,
+    }
+
+
+def _worker_argv(args, case: str, size: int) -> List[str]:
+    return [
+        sys.executable, "-m", "benchmarks.suite", "--worker", case, "--cards", str(size),
+        "--text-length", str(args.text_length), "--dup-rate", str(args.dup_rate), "--seed", str(args.seed),
+        "--repeats", str(args.repeats), "--decks", str(args.decks),
+    ]
+
+
+def _compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a line per case whose p50 latency regressed beyond tolerance (a fraction)."""
+    old = {(r["case"], r["cards"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in report["results"]:
+        b = old.get((r["case"], r["cards"]))
+        if "error" in r or not b or not b.get("p50_ms"):
+            continue
+        ratio = r["p50_ms"] / b["p50_ms"]
+        line = f"{r['case']:<24} {r['cards']:>9}  p50 {b['p50_ms']:>10.3f} -> {r['p50_ms']:>10.3f} ms  x{ratio:.2f}"
+        print(line, file=sys.stderr)
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated deck sizes (up to 1000000).")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--text-length", type=int, default=60, help="Approximate question length in characters.")
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="Fraction of cards that duplicate earlier ones.")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed samples per case.")
+    parser.add_argument("--decks", type=int, default=100, help="Decks the cards are spread over (db_list_decks, json_migration).")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare p50 latencies against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown vs the baseline (0.2 = 20%%).")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--cards", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(_run_worker(args)))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    import sqlite3
+    import ankideck
+    report = {
+        "meta": {
+            "ankideck": ankideck.__version__,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(terse=True),
+            "params": {
+                "sizes": sizes, "text_length": args.text_length, "dup_rate": args.dup_rate,
+                "seed": args.seed, "repeats": args.repeats, "decks": args.decks,
+            },
+        },
+        "results": [],
+    }
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for case in cases:
+        for size in sizes:
+            print(f"{case} @ {size} cards…", file=sys.stderr)
+            proc = subprocess.run(_worker_argv(args, case, size), cwd=root, capture_output=True, text=True)
+            if proc.returncode != 0:
+                report["results"].append({"case": case, "cards": size, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            report["results"].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = _compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print("  " + line, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Deterministic synthetic decks for benchmarks.
+
+The same (n_cards, text_length, dup_rate, seed) always yields the same cards, so
+runs on different machines or versions measure identical workloads.
+"""
+import random
+from typing import Dict, Iterator, List
+
+_WORDS = (
+    "anki card deck memory recall spaced repetition question answer review note field "
+    "cell protein enzyme river capital theorem proof vector matrix integral derivative "
+    "history empire treaty battle poem novel author verb noun tense chord scale rhythm"
+).split()
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    words: List[str] = []
+    size = 0
+    while size < length:
+        w = rng.choice(_WORDS)
+        words.append(w)
+        size += len(w) + 1
+    return " ".join(words)[:max(1, length)]
+
+
+def iter_synthetic_cards(
+    n_cards: int,
+    text_length: int = 60,
+    dup_rate: float = 0.1,
+    seed: int = 1234,
+) -> Iterator[Dict]:
+    """
+    Yield n_cards {'question', 'answer'} dicts. Roughly dup_rate of them repeat an earlier
+    card with different case/whitespace, so they count as duplicates after normalization.
+    Questions are about text_length characters, answers about half that.
+    """
+    rng = random.Random(seed)
+    recent: List[Dict] = []
+    for i in range(n_cards):
+        if recent and rng.random() < dup_rate:
+            c = rng.choice(recent)
+            yield {"question": f"  {c['question'].upper()} ", "answer": c["answer"].title()}
+            continue
+        card = {
+            "question": f"{i}: {_sentence(rng, text_length)}?",
+            "answer": _sentence(rng, max(1, text_length // 2)),
+        }
+        # Keep a bounded window of candidates so memory stays flat for 1M-card decks
+        if len(recent) < 4096:
+            recent.append(card)
+        else:
+            recent[rng.randrange(4096)] = card
+        yield card
+
+
+def synthetic_cards(n_cards: int, text_length: int = 60, dup_rate: float = 0.1, seed: int = 1234) -> List[Dict]:
+    """List form of iter_synthetic_cards."""
+    return list(iter_synthetic_cards(n_cards, text_length, dup_rate, seed))
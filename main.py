@@ -10,6 +10,8 @@ from ankideck.ui import (
     render_mydecks_tab,
     render_preview_tab,
     render_history_tab,
+    render_jobs_panel,
+    render_diagnostics_panel,
 )
 
 # --- Page setup ---
@@ -55,6 +57,7 @@ with st.container():
 st.markdown('<div style="height: 12px"></div>', unsafe_allow_html=True)
 with st.sidebar:
     input_mode = render_sidebar()
+    render_jobs_panel()
 
 # --- Main content ---
 mydecks_tab, create_tab, history_tab = st.tabs(["My Decks", "Create New Deck", "History"])
@@ -130,6 +133,11 @@ if st.session_state.get("switch_to_mydecks"):
     # Clear flag so we don't keep switching on subsequent reruns
     st.session_state.pop("switch_to_mydecks", None)
 
+# --- Hidden diagnostics panel (?diag=1) ---
+_diag_flag = st.query_params.get("diag", None)
+if (_diag_flag[0] if isinstance(_diag_flag, list) and _diag_flag else _diag_flag) == "1":
+    render_diagnostics_panel()
+
 # --- Footer note ---
 st.markdown("\n")
 st.caption("Tip: Use the sidebar to switch between paste and upload modes, and load the sample to get started quickly.")
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ankideck import db  # noqa: E402
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """A fresh, initialized library in a temporary working directory (data/, Decks/, media)."""
+    db.db_close()
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("Decks", exist_ok=True)
+    db.db_init()
+    yield db
+    db.db_close()
@@ -0,0 +1,74 @@
+import genanki
+import pytest
+
+from ankideck.anki_import import anki_deck_name, import_anki_package
+from ankideck.apkg import anki_model, write_apkg
+
+IMG = '<img src="paris.jpg">'
+SOUND = "[sound:bonjour.mp3]"
+
+
+def _package(tmp_path):
+    """Two Anki decks: 'Lang::French' (3 notes, one repeated) and 'Math' (2 notes)."""
+    model = anki_model()
+    french = genanki.Deck(1, "Lang::French")
+    math = genanki.Deck(2, "Math")
+    for deck, fields in (
+        (french, ["Capital of France?", f"Paris {IMG}"]),
+        (french, ["Hello", f"Bonjour {SOUND}"]),
+        (french, ["hello ", "bonjour " + SOUND]),
+        (math, ["1+1", "2"]),
+        (math, ["2+2", "4"]),
+    ):
+        deck.add_note(genanki.Note(model=model, fields=fields))
+    path = str(tmp_path / "pkg.apkg")
+    genanki.Package([french, math]).write_to_file(path)
+    return path
+
+
+def _cards(library, deck_id):
+    return sorted(library.db_get_deck_cards(deck_id).pairs())
+
+
+def test_one_deck_per_anki_deck(library, tmp_path):
+    result = import_anki_package(_package(tmp_path))
+    assert result["notes"] == 5
+    assert (result["added"], result["duplicates"]) == (4, 1)
+    decks = {d["anki_deck"]: d for d in result["decks"]}
+    assert set(decks) == {"Lang::French", "Math"}
+    assert decks["Lang::French"]["name"] == "Lang - French" == anki_deck_name("Lang::French")
+    assert (decks["Lang::French"]["added"], decks["Lang::French"]["duplicates"]) == (2, 1)
+    assert (decks["Math"]["added"], decks["Math"]["duplicates"]) == (2, 0)
+    assert library.db_get_deck_by_name("Lang - French")["id"] == decks["Lang::French"]["deck_id"]
+    # Media references in the fields are kept as they are
+    assert _cards(library, decks["Lang::French"]["deck_id"]) == [
+        ("Capital of France?", f"Paris {IMG}"),
+        ("Hello", f"Bonjour {SOUND}"),
+    ]
+    assert _cards(library, decks["Math"]["deck_id"]) == [("1+1", "2"), ("2+2", "4")]
+
+
+def test_deck_name_override_and_reimport(library, tmp_path):
+    path = _package(tmp_path)
+    result = import_anki_package(path, deck_name="All")
+    assert {d["name"] for d in result["decks"]} == {"All"}
+    assert (result["added"], result["duplicates"]) == (4, 1)
+    assert len(library.db_list_decks("")) == 1
+
+    with open(path, "rb") as f:
+        again = import_anki_package(f, deck_name="All")
+    assert (again["added"], again["duplicates"]) == (0, 5)
+
+
+def test_round_trip_through_write_apkg(library, tmp_path):
+    path = write_apkg(str(tmp_path / "out.apkg"), "Exported", [("q1", "a1"), ("q2", "")])
+    result = import_anki_package(path)
+    assert [d["name"] for d in result["decks"]] == ["Exported"]
+    assert _cards(library, result["decks"][0]["deck_id"]) == [("q1", "a1"), ("q2", "")]
+
+
+def test_rejects_files_that_are_not_packages(library, tmp_path):
+    bad = tmp_path / "bad.apkg"
+    bad.write_bytes(b"not a zip")
+    with pytest.raises(Exception, match="not a zip"):
+        import_anki_package(str(bad))
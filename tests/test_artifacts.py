@@ -0,0 +1,36 @@
+import os
+import zipfile
+
+from ankideck import bulk, db
+
+
+def test_bulk_export_is_not_pruned_while_running(library, monkeypatch):
+    monkeypatch.setattr(db, "ARTIFACT_KEEP_PER_KIND", 3)
+    for i in range(6):
+        deck = library.db_create_deck(f"d{i}")
+        library.db_add_cards(deck["id"], [{"question": f"q{i}", "answer": "a"}])
+    results = bulk.export_decks(workers=1)
+    assert all(r["ok"] for r in results)
+    with zipfile.ZipFile(bulk.bundle_exports(results)) as z:
+        assert len(z.namelist()) == 6
+    assert library.db_artifact_stats()["apkg"]["count"] == 6
+
+
+def test_prune_never_deletes_files_found_on_disk(library, tmp_path):
+    library.db_close()
+    os.makedirs(tmp_path / "pre" / "Decks")
+    os.chdir(tmp_path / "pre")
+    for i in range(3):
+        (tmp_path / "pre" / "Decks" / f"old{i}.apkg").write_bytes(b"x")
+    library.db_init()
+    deck = library.db_create_deck("new")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    new_path = library.db_export_deck_apkg(deck["id"], "new")
+
+    assert library.db_prune_artifacts("apkg", keep=1) == 3
+    assert sorted(os.listdir("Decks")) == ["new.apkg", "old0.apkg", "old1.apkg", "old2.apkg"]
+    assert [a["path"] for a in library.db_list_artifacts("apkg")] == [new_path]
+
+    library.db_record_artifact("apkg", "Decks/old0.apkg")  # rewritten by us: now ours to delete
+    assert library.db_prune_artifacts("apkg", keep=1) == 1
+    assert not os.path.exists(new_path)
@@ -0,0 +1,45 @@
+import os
+import zipfile
+
+import pytest
+
+from ankideck import bulk
+
+
+def test_parallel_export_writes_every_deck(library):
+    for name in ("A", "B"):
+        deck = library.db_create_deck(name)
+        library.db_add_cards(deck["id"], [{"question": f"q {name}", "answer": "a"}])
+    progress = []
+    results = bulk.export_decks(workers=2, progress=lambda done, total, r: progress.append((done, total)))
+    assert sorted(r["name"] for r in results) == ["A", "B"]
+    assert all(r["ok"] and r["error"] is None for r in results)
+    for r in results:
+        assert os.path.isfile(r["path"]) and zipfile.is_zipfile(r["path"])
+    assert progress == [(1, 2), (2, 2)]
+    assert library.db_artifact_stats()["apkg"]["count"] == 2
+
+
+def test_bulk_export_under_a_tiny_cache_limit_keeps_every_file(library, monkeypatch):
+    monkeypatch.setattr(library, "EXPORT_CACHE_MAX_BYTES", 1)
+    for name in ("A", "B", "C"):
+        deck = library.db_create_deck(name)
+        library.db_add_cards(deck["id"], [{"question": f"q {name}", "answer": "a"}])
+    results = bulk.export_decks(workers=1)
+    assert sorted(r["name"] for r in results) == ["A", "B", "C"]
+    assert all(r["ok"] and os.path.isfile(r["path"]) for r in results)
+    with zipfile.ZipFile(bulk.bundle_exports(results)) as z:
+        assert sorted(z.namelist()) == ["A.apkg", "B.apkg", "C.apkg"]
+
+
+def test_bundle_fails_cleanly_when_a_file_is_missing(library, tmp_path):
+    present = tmp_path / "A.apkg"
+    present.write_bytes(b"x")
+    results = [
+        {"name": "A", "path": str(present), "ok": True},
+        {"name": "B", "path": str(tmp_path / "B.apkg"), "ok": True},
+    ]
+    bundle = tmp_path / "bundle.zip"
+    with pytest.raises(Exception, match="B.apkg"):
+        bulk.bundle_exports(results, str(bundle))
+    assert not bundle.exists() and not (tmp_path / "bundle.zip.tmp").exists()
@@ -0,0 +1,48 @@
+import json
+
+from ankideck import bulk
+
+
+def _write_decks(tmp_path):
+    src = tmp_path / "in"
+    (src / "sub").mkdir(parents=True)
+    (src / "French.json").write_text(json.dumps([{"question": "q1", "answer": "a1"}, {"question": "q2", "answer": "a2"}]))
+    (src / "sub" / "Math.csv").write_text("question,answer\n1+1,2\n")
+    (src / "notes.md").write_text("ignored")
+    return str(src)
+
+
+def _by_deck(results):
+    return {r["deck_name"]: r for r in results}
+
+
+def test_rerun_skips_imported_files_unless_forced(library, tmp_path):
+    src = _write_decks(tmp_path)
+    first = _by_deck(bulk.import_deck_files(src, workers=1))
+    assert set(first) == {"French", "Math"}
+    assert {n: (r["status"], r["added"]) for n, r in first.items()} == {"French": ("imported", 2), "Math": ("imported", 1)}
+
+    again = _by_deck(bulk.import_deck_files(src, workers=1))
+    assert {n: r["status"] for n, r in again.items()} == {"French": "skipped", "Math": "skipped"}
+    assert again["French"]["sha256"] == first["French"]["sha256"]
+
+    forced = _by_deck(bulk.import_deck_files(src, workers=1, force=True))
+    assert {n: (r["status"], r["added"], r["duplicates"]) for n, r in forced.items()} == {
+        "French": ("imported", 0, 2), "Math": ("imported", 0, 1),
+    }
+    counts = {d["name"]: d["card_count"] for d in library.db_list_decks("")}
+    assert counts == {"French": 2, "Math": 1}
+
+
+def test_a_file_that_fails_to_parse_is_retried(library, tmp_path):
+    src = _write_decks(tmp_path)
+    bad = tmp_path / "in" / "Broken.json"
+    bad.write_text('[{"question": "q"}]')
+    first = _by_deck(bulk.import_deck_files(src, workers=1))
+    assert first["Broken"]["status"] == "failed" and "Card #1" in first["Broken"]["error"]
+    assert first["French"]["status"] == first["Math"]["status"] == "imported"
+    assert library.db_get_deck_by_name("Broken") is None
+
+    bad.write_text('[{"question": "q", "answer": "a"}]')
+    again = _by_deck(bulk.import_deck_files(src, workers=1))
+    assert {n: r["status"] for n, r in again.items()} == {"Broken": "imported", "French": "skipped", "Math": "skipped"}
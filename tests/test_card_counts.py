@@ -0,0 +1,90 @@
+from ankideck import readcache
+from ankideck.__main__ import main
+
+
+def _stored(library):
+    with library._connect() as conn:
+        rows = conn.execute("SELECT id, card_count, last_card_at FROM decks").fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+
+def _actual(library):
+    with library._connect() as conn:
+        rows = conn.execute(
+            "SELECT d.id, COUNT(c.id), MAX(c.created_at) FROM decks d LEFT JOIN cards c ON c.deck_id = d.id GROUP BY d.id"
+        ).fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+
+def _add(library, deck, *questions):
+    for q in questions:  # one call per card, so each gets its own created_at
+        library.db_add_cards(deck["id"], [{"question": q, "answer": "a"}])
+
+
+def _card_ids(library, deck):
+    return [c.id for c in library.db_get_deck_cards(deck["id"])]
+
+
+def test_counts_follow_inserts_deletes_and_moves(library):
+    a = library.db_create_deck("A")
+    b = library.db_create_deck("B")
+    _add(library, a, "a1", "a2", "a3")
+    _add(library, b, "b1")
+    assert _stored(library) == _actual(library)
+    assert _stored(library)[a["id"]][0] == 3
+
+    newest = _card_ids(library, a)[-1]
+    library.db_delete_card(newest)  # the deck's newest card: last_card_at falls back
+    assert _stored(library) == _actual(library)
+    library.db_delete_card(_card_ids(library, a)[0])
+    assert _stored(library) == _actual(library)
+
+    # b1 is newer than a's remaining card, which moves into b and must not lower b's last_card_at
+    library.db_move_deck_contents(a["id"], b["id"])
+    assert _stored(library) == _actual(library)
+    assert _stored(library)[a["id"]] == (0, None)
+    assert _stored(library)[b["id"]][0] == 2
+
+    _add(library, a, "again")
+    library.db_delete_deck(b["id"])
+    assert _stored(library) == _actual(library) == {a["id"]: _actual(library)[a["id"]]}
+
+
+def test_check_counts_reports_and_repairs_drift(library, capsys):
+    deck = library.db_create_deck("A")
+    _add(library, deck, "q1", "q2")
+    assert library.db_check_card_counts() == []
+    with library._connect() as conn:
+        conn.execute("UPDATE decks SET card_count = 7 WHERE id = ?", (deck["id"],))
+
+    [m] = library.db_check_card_counts()
+    assert (m["id"], m["name"], m["stored"], m["actual"]) == (deck["id"], "A", 7, 2)
+    assert m["stored_last_card_at"] == m["actual_last_card_at"]
+    assert main(["check-counts"]) == 1
+    assert "stored 7, actual 2" in capsys.readouterr().out
+    assert _stored(library)[deck["id"]][0] == 7  # reported, not changed
+
+    assert main(["check-counts", "--repair"]) == 0
+    assert "Repaired 1 deck(s)." in capsys.readouterr().out
+    assert _stored(library) == _actual(library)
+    assert main(["check-counts"]) == 0
+
+
+def test_check_counts_covers_last_card_at_and_keeps_the_read_cache(library, capsys):
+    deck = library.db_create_deck("A")
+    _add(library, deck, "q1")
+    actual = _actual(library)[deck["id"]][1]
+    with library._connect() as conn:
+        conn.execute("UPDATE decks SET last_card_at = 'long ago' WHERE id = ?", (deck["id"],))
+
+    version = readcache.stats()["version"]
+    [m] = library.db_check_card_counts()
+    assert (m["stored"], m["actual"]) == (1, 1)
+    assert (m["stored_last_card_at"], m["actual_last_card_at"]) == ("long ago", actual)
+    assert readcache.stats()["version"] == version  # a plain check changes nothing
+
+    assert main(["check-counts", "--repair"]) == 0
+    assert "last card stored long ago" in capsys.readouterr().out
+    assert readcache.stats()["version"] > version
+    assert _stored(library) == _actual(library)
+    assert library.db_check_card_counts() == []
@@ -0,0 +1,76 @@
+def _reset_to_legacy_schema(library, deck_id, rows):
+    """Rebuild the state of a database from before qa_key: duplicates allowed, keys missing."""
+    with library._connect() as conn:
+        conn.execute("DROP INDEX idx_cards_deck_key")
+        conn.execute("UPDATE cards SET qa_key = NULL")
+        conn.executemany(
+            "INSERT INTO cards(deck_id, question, answer, guid, created_at, updated_at) VALUES(?, ?, ?, 'g', 'then', 'then')",
+            [(deck_id, q, a) for q, a in rows],
+        )
+        conn.execute("UPDATE app_meta SET value = '0' WHERE key = 'qa_key_backfilled'")
+    library.db_close()
+
+
+def test_add_cards_reports_duplicates(library):
+    deck = library.db_create_deck("D")
+    stats = library.db_add_cards(deck["id"], [
+        {"question": "Capital of France?", "answer": "Paris"},
+        {"question": "  capital of france? ", "answer": "PARIS"},  # same after normalization
+        {"question": "Capital of Italy?", "answer": "Rome"},
+    ])
+    assert stats == {"before": 0, "added": 2, "duplicates": 1, "after": 2}
+    stats = library.db_add_cards(deck["id"], [{"question": "Capital of Italy?", "answer": "Rome"}, {"question": "x", "answer": "y"}])
+    assert stats == {"before": 2, "added": 1, "duplicates": 1, "after": 3}
+
+
+def test_duplicates_are_per_deck(library):
+    one = library.db_create_deck("1")
+    two = library.db_create_deck("2")
+    card = [{"question": "q", "answer": "a"}]
+    assert library.db_add_cards(one["id"], card)["added"] == 1
+    assert library.db_add_cards(two["id"], card)["added"] == 1
+
+
+def test_key_backfill_quarantines_duplicates(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    _reset_to_legacy_schema(library, deck["id"], [("q", "a"), ("Q ", "A"), ("other", "b")])
+    library.db_init()
+
+    assert sorted(c.question for c in library.db_get_deck_cards(deck["id"])) == ["other", "q"]
+    assert library.db_list_decks("")[0]["card_count"] == 2
+    quarantine = library.db_list_quarantined_cards()
+    assert quarantine["count"] == 2
+    assert sorted(c["question"] for c in quarantine["cards"]) == ["Q ", "q"]
+    assert {c["deck_name"] for c in quarantine["cards"]} == {"D"}
+    kept = library.db_get_deck_cards(deck["id"])
+    assert {c["kept_card_id"] for c in quarantine["cards"]} == {next(c.id for c in kept if c.question == "q")}
+
+    assert library.db_clear_quarantine() == 2
+    assert library.db_list_quarantined_cards()["count"] == 0
+
+
+def test_upgrade_keeps_one_card_per_deck_and_logs_quarantine(library, caplog):
+    one = library.db_create_deck("One")
+    two = library.db_create_deck("Two")
+    library.db_add_cards(one["id"], [{"question": "q", "answer": "a"}])
+    library.db_add_cards(two["id"], [{"question": "q", "answer": "a"}])
+    with library._connect() as conn:
+        conn.execute(
+            "INSERT INTO cards(deck_id, question, answer, guid, created_at, updated_at) VALUES(?, 'q', 'a', 'g', 'then', 'then')",
+            (two["id"],),
+        )
+    _reset_to_legacy_schema(library, one["id"], [("q", "a"), ("q", "a"), ("q", "a")])
+    with caplog.at_level("WARNING", logger="ankideck.db"):
+        library.db_init()
+
+    for deck in (one, two):
+        assert [c.question for c in library.db_get_deck_cards(deck["id"])] == ["q"]
+    counts = {d["name"]: d["card_count"] for d in library.db_list_decks("")}
+    assert counts == {"One": 1, "Two": 1}
+    quarantine = library.db_list_quarantined_cards()
+    assert quarantine["count"] == 4
+    assert sorted(c["deck_name"] for c in quarantine["cards"]) == ["One", "One", "One", "Two"]
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("3 duplicate card(s) of deck 'One'" in m for m in messages)
+    assert any("1 duplicate card(s) of deck 'Two'" in m for m in messages)
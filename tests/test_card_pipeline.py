@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from ankideck.core import CardPipeline, _card_hash
+
+CARDS = [
+    {"question": "Q1", "answer": "A1"},
+    {"question": "  q1 ", "answer": "a1"},
+    {"question": "Q2", "answer": "A2"},
+]
+
+
+def test_identical_text_is_a_cache_hit():
+    pipeline = CardPipeline()
+    text = json.dumps(CARDS)
+    first = pipeline.run(text)
+    assert pipeline.run(text) is first
+    assert pipeline.run(f"\n  {text}\t\n") is first
+    assert first.error is None
+    assert first.cards == CARDS
+    assert first.keys == [_card_hash(c) for c in CARDS]
+
+
+def test_least_recently_used_entry_is_evicted():
+    pipeline = CardPipeline(max_entries=2)
+    a, b, c = (json.dumps([{"question": str(i), "answer": "x"}]) for i in range(3))
+    first_a = pipeline.run(a)
+    pipeline.run(b)
+    assert pipeline.run(a) is first_a  # a is now the most recently used
+    first_b = pipeline.run(b)
+    pipeline.run(c)  # evicts a
+    assert pipeline.run(b) is first_b
+    assert pipeline.run(a) is not first_a
+    assert len(pipeline._cache) == 2
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Please provide JSON data."),
+    ("   \n", "Please provide JSON data."),
+    ("[{", "Invalid JSON."),
+    ('{"question": "q", "answer": "a"}', "JSON must be a list"),
+    ('[{"question": "q", "answer": "a"}, {"question": "q"}]', "JSON must be a list"),
+    ('[{"question": "q", "answer": "a"}, 3]', "JSON must be a list"),
+])
+def test_errors(text, message):
+    result = CardPipeline().run(text)
+    assert result.error.startswith(message)
+    assert result.cards == [] and result.keys == []
+
+
+def test_duplicates_within_one_input():
+    result = CardPipeline().run(json.dumps(CARDS + [CARDS[2]]))
+    assert len(result.cards) == 4
+    assert result.unique == 2
+    assert result.duplicates == 2
@@ -0,0 +1,61 @@
+import pytest
+
+from ankideck.core import Card, CardBatch, card_pairs, cards_as_dicts
+
+
+def test_card_reads_like_a_dict():
+    card = Card(7, "q", "a")
+    assert card["id"] == 7 and card["question"] == "q" and card["answer"] == "a"
+    assert card.get("answer") == "a" and card.get("tags", "-") == "-"
+    assert dict(card) == {"id": 7, "question": "q", "answer": "a"}
+    assert card == {"id": 7, "question": "q", "answer": "a"}
+    assert card != {"question": "q", "answer": "a"}
+    assert "id" in card and len(card) == 3
+    with pytest.raises(KeyError):
+        card["tags"]
+
+
+def test_unsaved_card_has_no_id_key():
+    card = Card(None, "q", "a")
+    assert list(card.keys()) == ["question", "answer"]
+    assert dict(card) == {"question": "q", "answer": "a"} == card
+    assert "id" not in card and card.get("id") is None
+    with pytest.raises(KeyError):
+        card["id"]
+
+
+def test_batch_indexing_and_slicing():
+    batch = CardBatch([1, 2, 3], ["q1", "q2", "q3"], ["a1", "a2", "a3"])
+    assert len(batch) == 3
+    assert batch[0] == Card(1, "q1", "a1") and batch[-1] == Card(3, "q3", "a3")
+    part = batch[1:]
+    assert isinstance(part, CardBatch) and list(part.ids) == [2, 3]
+    assert list(part) == [Card(2, "q2", "a2"), Card(3, "q3", "a3")]
+    assert list(batch[::2].pairs()) == [("q1", "a1"), ("q3", "a3")]
+    with pytest.raises(IndexError):
+        batch[3]
+
+
+def test_batch_columns_must_have_the_same_length():
+    with pytest.raises(Exception, match="same length"):
+        CardBatch([1, 2], ["q1", "q2"], ["a1"])
+
+
+def test_read_functions_round_trip(library):
+    deck = library.db_create_deck("D")
+    cards = [{"question": f"q{i}", "answer": f"a{i}"} for i in range(5)]
+    library.db_add_cards(deck["id"], cards)
+
+    batch = library.db_get_deck_cards(deck["id"])
+    assert isinstance(batch, CardBatch)
+    dicts = cards_as_dicts(batch)
+    assert [{"question": d["question"], "answer": d["answer"]} for d in dicts] == cards
+    assert list(batch) == dicts
+    assert list(card_pairs(batch)) == [(c["question"], c["answer"]) for c in cards]
+    assert CardBatch.from_rows((c.id, c.question, c.answer) for c in batch).to_dicts() == dicts
+
+    page = library.db_get_deck_cards_page(deck["id"], after_id=batch[1].id, limit=2)
+    assert page == dicts[2:4]
+    assert cards_as_dicts(page) == dicts[2:4]
+    assert library.db_get_deck_cards_by_name("D").to_dicts() == dicts
+    assert len(library.db_get_deck_cards_by_name("missing")) == 0
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+
+def _in_thread(fn):
+    out = []
+
+    def run():
+        try:
+            out.append(fn())
+        except Exception as e:
+            out.append(e)
+
+    t = threading.Thread(target=run)
+    t.start()
+    t.join()
+    if isinstance(out[0], Exception):
+        raise out[0]
+    return out[0]
+
+
+def _lease_id(library):
+    with library._connect() as conn:
+        return id(conn)
+
+
+def test_threads_reuse_pooled_connections(library):
+    ids = {_in_thread(lambda: _lease_id(library)) for _ in range(10)}
+    assert len(ids) == 1
+    assert library._pool_open == 1
+
+
+def test_nested_blocks_share_the_connection(library):
+    with library._connect() as outer:
+        with library._connect() as inner:
+            assert inner is outer
+        library.db_create_deck("inside")  # uses the same connection and transaction
+    assert [d["name"] for d in library.db_list_decks("")] == ["inside"]
+
+
+def test_pool_is_bounded(library, monkeypatch):
+    monkeypatch.setattr(library, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(library, "DB_BUSY_TIMEOUT_MS", 50)
+    library.db_close()
+    with library._connect():
+        with pytest.raises(Exception, match="connections are busy"):
+            _in_thread(lambda: _lease_id(library))
+    assert _in_thread(lambda: _lease_id(library))
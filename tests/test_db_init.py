@@ -0,0 +1,17 @@
+def test_db_init_runs_once_per_process(library):
+    statements = []
+    with library._connect() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            library.db_init()
+            library.db_init()
+        finally:
+            conn.set_trace_callback(None)
+    assert statements == []
+
+
+def test_db_init_after_close_checks_schema_again(library):
+    library.db_create_deck("kept")
+    library.db_close()
+    library.db_init()
+    assert [d["name"] for d in library.db_list_decks("")] == ["kept"]
@@ -0,0 +1,69 @@
+import json
+import sqlite3
+import zipfile
+
+from ankideck.config import DB_PATH
+
+
+def _questions(path):
+    with zipfile.ZipFile(path) as z:
+        z.extract("collection.anki2", path + ".d")
+    conn = sqlite3.connect(path + ".d/collection.anki2")
+    try:
+        return sorted(r[0].split("\x1f")[0] for r in conn.execute("SELECT flds FROM notes"))
+    finally:
+        conn.close()
+
+
+def _card_id(library, deck_id, question):
+    return next(c.id for c in library.db_get_deck_cards(deck_id) if c.question == question)
+
+
+def test_delta_carries_added_edited_and_moved_cards(library):
+    deck = library.db_create_deck("D")
+    other = library.db_create_deck("O")
+    library.db_add_cards(deck["id"], [{"question": f"q{i}", "answer": "a"} for i in range(5)])
+    library.db_add_cards(other["id"], [{"question": "moved", "answer": "a"}])
+    library.db_export_deck_apkg(deck["id"], "D")
+    assert library.db_export_deck_delta(deck["id"], "D")["path"] is None
+
+    library.db_add_cards(deck["id"], [{"question": "new", "answer": "a"}])
+    library.db_update_card(_card_id(library, deck["id"], "q1"), "q1 edited", "a")
+    library.db_move_deck_contents(other["id"], deck["id"])
+    delta = library.db_export_deck_delta(deck["id"], "D")
+    assert delta["cards"] == 3
+    assert _questions(delta["path"]) == ["moved", "new", "q1 edited"]
+
+    library.db_delete_card(_card_id(library, deck["id"], "q2"))
+    assert library.db_export_deck_delta(deck["id"], "D")["path"] is None
+
+
+def test_delta_does_not_depend_on_timestamps(library):
+    """A card committed after an export is in the next delta even if its timestamp is older."""
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    first = library.db_export_deck_apkg(deck["id"], "D")
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO cards(deck_id, question, answer, qa_key, guid, created_at, updated_at)"
+        " VALUES(?, 'late', 'a', x'01', 'g', '2000-01-01', '2000-01-01')",
+        (deck["id"],),
+    )
+    conn.commit()
+    conn.close()
+    delta = library.db_export_deck_delta(deck["id"], "D")
+    assert first and delta["cards"] == 1
+    assert _questions(delta["path"]) == ["late"]
+
+
+def test_exports_are_logged_with_their_change_sequence(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    library.db_export_deck_apkg(deck["id"], "D")
+    library.db_add_cards(deck["id"], [{"question": "q2", "answer": "a"}])
+    delta = library.db_export_deck_delta(deck["id"], "D")
+    log = library.db_list_deck_exports(deck["id"])
+    assert [(e["mode"], e["since_export_id"]) for e in log] == [("delta", log[1]["id"]), ("full", None)]
+    assert log[0]["change_seq"] > log[1]["change_seq"]
+    assert delta["export_id"] == log[0]["id"]
+    assert json.loads(json.dumps(log))  # plain values
@@ -0,0 +1,21 @@
+from ankideck import diagnostics
+
+
+def test_slow_queries_are_logged_with_their_plan(library):
+    library.db_close()
+    diagnostics.reset()
+    diagnostics.set_enabled(True, slow_query_ms=0)
+    try:
+        deck = library.db_create_deck("d")
+        library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+        assert len(library.db_get_deck_cards(deck["id"])) == 1
+        snap = diagnostics.snapshot()
+    finally:
+        diagnostics.set_enabled(False, slow_query_ms=diagnostics.SLOW_QUERY_MS)
+        library.db_close()
+
+    assert snap["functions"]["db_get_deck_cards"]["calls"] == 1
+    assert snap["functions"]["db_get_deck_cards"]["rows_read"] >= 1
+    entries = [e for e in snap["slow_queries"] if e["function"] == "db_get_deck_cards" and "FROM cards" in e["sql"]]
+    assert entries
+    assert entries[0]["plan"] and any("cards" in line for line in entries[0]["plan"])
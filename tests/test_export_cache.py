@@ -0,0 +1,57 @@
+import os
+import time
+
+
+def _stats(library):
+    s = library.db_export_cache_stats()
+    return s["hits"], s["misses"]
+
+
+def test_unchanged_deck_is_served_from_the_cache(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    path = library.db_export_deck_apkg(deck["id"], "D")
+    mtime = os.stat(path).st_mtime_ns
+    assert _stats(library) == (0, 1)
+
+    assert library.db_export_deck_apkg(deck["id"], "D") == path
+    assert _stats(library) == (1, 1)
+    assert os.stat(path).st_mtime_ns == mtime  # not rewritten
+    assert library.db_export_cache_stats()["entries"] == 1
+
+
+def test_changes_and_tampering_rebuild_the_export(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    path = library.db_export_deck_apkg(deck["id"], "D")
+
+    library.db_add_cards(deck["id"], [{"question": "q2", "answer": "a"}])
+    library.db_export_deck_apkg(deck["id"], "D")
+    assert _stats(library) == (0, 2)
+
+    time.sleep(0.01)
+    with open(path, "ab") as f:
+        f.write(b"tampered")
+    library.db_export_deck_apkg(deck["id"], "D")
+    assert _stats(library) == (0, 3)
+
+    library.db_rename_deck(deck["id"], "E")
+    library.db_export_deck_apkg(deck["id"], "E")
+    assert _stats(library) == (0, 4)
+
+    library.db_export_deck_apkg(deck["id"], "E", use_cache=False)
+    assert _stats(library) == (0, 5)
+
+
+def test_prune_evicts_least_recently_used(library):
+    decks = []
+    for name in ("A", "B"):
+        deck = library.db_create_deck(name)
+        library.db_add_cards(deck["id"], [{"question": name, "answer": "a"}])
+        decks.append(deck)
+    a = library.db_export_deck_apkg(decks[0]["id"], "A")
+    time.sleep(0.01)
+    b = library.db_export_deck_apkg(decks[1]["id"], "B")
+    assert library.db_prune_export_cache(max_bytes=os.path.getsize(b)) == 1
+    assert not os.path.exists(a) and os.path.exists(b)
+    assert library.db_export_cache_stats()["entries"] == 1
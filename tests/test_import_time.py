@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from benchmarks import import_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATEMENTS = {"import ankideck": import_time.BUDGET_MS, "from ankideck import db_init": import_time.DB_BUDGET_MS}
+
+
+def test_import_does_not_load_heavy_modules(monkeypatch):
+    monkeypatch.chdir(ROOT)  # the statements import the package from the working directory
+    for statement, result in import_time.run(STATEMENTS, runs=1).items():
+        assert not result["heavy_modules"], f"{statement!r} pulled in {result['heavy_modules']}"
+
+
+# Wall-clock budgets depend on the machine; CI on a quiet runner (or python -m benchmarks.import_time) opts in
+@pytest.mark.skipif(not os.environ.get("ANKIDECK_CHECK_IMPORT_BUDGET"), reason="set ANKIDECK_CHECK_IMPORT_BUDGET=1 to check import time")
+def test_import_stays_within_budget(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    for statement, result in import_time.run(STATEMENTS, runs=5).items():
+        assert result["ok"], f"{statement!r} took {result['best_ms']} ms > {result['budget_ms']} ms"
@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from ankideck.ingest import iter_cards, iter_json_array, iter_ndjson, parse_column
+
+CARDS = [
+    {"question": "Größe?", "answer": "big"},
+    {"question": "q,\"quoted\"\nmultiline", "answer": "x" * 100},
+    {"question": 7, "answer": 1.5},
+]
+
+
+def _pairs(cards):
+    return [(c.question, c.answer) for c in cards]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 4096])
+def test_json_array_across_chunk_boundaries(chunk_size):
+    data = json.dumps(CARDS, ensure_ascii=False, indent=1).encode("utf-8")
+    assert list(iter_json_array(io.BytesIO(data), chunk_size)) == CARDS
+    assert list(iter_json_array(io.BytesIO(b"\xef\xbb\xbf [ 1 , 22 ,333 ] \n"), chunk_size)) == [1, 22, 333]
+
+
+@pytest.mark.parametrize("data", [b"[1,2] xx", b"[] x", b"[1]]", b"[1] [2]"])
+def test_json_array_rejects_trailing_data(data):
+    with pytest.raises(Exception, match="Invalid JSON"):
+        list(iter_json_array(io.BytesIO(data), 2))
+
+
+@pytest.mark.parametrize("data", [b"[1,2", b"[1 2]", b'[{"question": ]', b"{}"])
+def test_json_array_rejects_malformed_input(data):
+    with pytest.raises(Exception):
+        list(iter_json_array(io.BytesIO(data)))
+
+
+def test_ndjson_skips_blank_lines_and_reports_line_numbers():
+    data = b'{"a": 1}\n\n  {"a": 2}  \r\n{"a": 3}'
+    assert list(iter_ndjson(io.BytesIO(data), 4)) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    with pytest.raises(Exception, match="line 2"):
+        list(iter_ndjson(io.BytesIO(b'{"a": 1}\n{"a": \n')))
+
+
+def test_iter_cards_detects_the_json_flavour():
+    array = json.dumps(CARDS).encode()
+    lines = "".join(json.dumps(c) + "\n" for c in CARDS).encode()
+    expected = [(c["question"], c["answer"]) for c in CARDS]
+    assert _pairs(iter_cards(io.BytesIO(array))) == expected
+    assert _pairs(iter_cards(io.BytesIO(lines))) == expected
+    with pytest.raises(Exception, match="Card #2"):
+        list(iter_cards(io.BytesIO(b'[{"question": "q", "answer": "a"}, {"question": "q"}]')))
+
+
+def test_delimited_with_header_and_columns():
+    data = 'Front,Back,Tags\r\n"a, b",c,t\r\n"multi\nline",d,t\r\n'.encode("utf-8-sig")
+    assert _pairs(iter_cards(io.BytesIO(data), "csv", columns=("Front", "Back"))) == [("a, b", "c"), ("multi\nline", "d")]
+    assert _pairs(iter_cards(io.BytesIO(data), "csv", columns=(parse_column("3"), 0))) == [("t", "a, b"), ("t", "multi\nline")]
+    tsv = b"q1\ta1\nq2\ta2\n"
+    assert _pairs(iter_cards(io.BytesIO(tsv), "tsv", header=False)) == [("q1", "a1"), ("q2", "a2")]
+    with pytest.raises(Exception, match="not found in the header"):
+        list(iter_cards(io.BytesIO(data), "csv", columns=("Front", "Nope")))
+    with pytest.raises(Exception, match="Row 2 has 1 column"):
+        list(iter_cards(io.BytesIO(b"question,answer\nonly\n"), "csv"))
+
+
+def test_malformed_first_record_fails_without_reading_the_rest():
+    chunk = 4096
+    data = b'[{"question": x}, ' + b",".join([b'{"question": "q", "answer": "a"}'] * 200_000) + b"]"
+    read = []
+    with pytest.raises(Exception, match="Invalid JSON"):
+        list(iter_json_array(io.BytesIO(data), chunk, read.append))
+    assert read[-1] <= 2 * chunk < len(data)
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ankideck import jobs
+
+
+def _cards(n, fail_after=None):
+    for i in range(n):
+        if fail_after is not None and i == fail_after:
+            raise RuntimeError("reader failed")
+        yield {"question": f"q{i}", "answer": "a"}
+
+
+def test_bulk_add_commits_in_batches(library):
+    deck = library.db_create_deck("D")
+    with pytest.raises(RuntimeError):
+        library.db_add_cards_bulk(deck["id"], _cards(35, fail_after=25), commit_every=10)
+    assert library.db_count_deck_cards(deck["id"]) == 20
+
+    stats = library.db_add_cards_bulk(deck["id"], _cards(35), commit_every=10)
+    assert (stats["added"], stats["duplicates"], stats["after"]) == (15, 20, 35)
+
+
+def test_bulk_add_without_batches_is_all_or_nothing(library):
+    deck = library.db_create_deck("D")
+    with pytest.raises(RuntimeError):
+        library.db_add_cards_bulk(deck["id"], _cards(35, fail_after=25))
+    assert library.db_count_deck_cards(deck["id"]) == 0
+
+
+def _wait(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.job_status(job_id)
+        if job["status"] not in jobs.ACTIVE_STATUSES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_import_job_records_owner_and_imports(library, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "IMPORT_WRITE_BATCH_CARDS", 7)
+    deck = library.db_create_deck("D")
+    path = tmp_path / "cards.ndjson"
+    path.write_text("".join(json.dumps(c) + "\n" for c in _cards(30)))
+    job_id = jobs.submit_job("import_cards", {"deck_id": deck["id"], "path": str(path), "fmt": "ndjson"})
+    job = _wait(job_id)
+    assert job["status"] == "done", job["error"]
+    assert job["result"]["added"] == 30
+    assert job["owner_pid"] == os.getpid()
+    assert not path.exists()
+
+
+def test_only_jobs_of_exited_processes_are_failed(library, monkeypatch):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    owners = {"live other": os.getppid(), "exited": exited.pid, "legacy": None, "this pid earlier": os.getpid()}
+    with library._connect() as conn:
+        for label, pid in owners.items():
+            conn.execute(
+                "INSERT INTO jobs(kind, label, params, status, created_at, owner_pid) VALUES('export_deck', ?, '{}', 'running', 'now', ?)",
+                (label, pid),
+            )
+    monkeypatch.setattr(jobs, "_executor", None)
+    jobs._get_executor()
+    with library._connect() as conn:
+        status = dict(conn.execute("SELECT label, status FROM jobs").fetchall())
+    assert status == {"live other": "running", "exited": "failed", "legacy": "failed", "this pid earlier": "failed"}
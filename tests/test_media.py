@@ -0,0 +1,75 @@
+import base64
+import json
+import zipfile
+
+from ankideck import bulk
+from ankideck.media import extract_data_uris, media_refs
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+URI = "data:image/png;base64," + base64.b64encode(PNG).decode()
+
+
+def test_non_string_fields_are_accepted(library):
+    deck = library.db_create_deck("Numbers")
+    stats = library.db_add_cards(deck["id"], [{"question": "What is 6*7?", "answer": 42}])
+    assert stats["added"] == 1
+    assert [c.answer for c in library.db_get_deck_cards(deck["id"])] == ["42"]
+    assert media_refs(42) == []
+    assert extract_data_uris(42) == (42, [])
+
+
+def test_batch_import_accepts_non_string_fields(library, tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    (src / "numbers.json").write_text(json.dumps([{"question": 1, "answer": 2}]))
+    results = bulk.import_deck_files(str(src), workers=1)
+    assert [(r["status"], r["added"]) for r in results] == [("imported", 1)]
+
+
+def test_data_uris_are_stored_once_and_packaged(library):
+    a = library.db_create_deck("A")
+    b = library.db_create_deck("B")
+    library.db_add_cards(a["id"], [{"question": f'<img src="{URI}"> What?', "answer": "x"}])
+    library.db_add_cards(b["id"], [{"question": f'Again <img src="{URI}">', "answer": "y"}])
+    stats = library.db_media_stats()
+    assert stats["files"] == 1
+    question = library.db_get_deck_cards(a["id"])[0].question
+    assert "data:" not in question
+    name = media_refs(question)[0]
+
+    with zipfile.ZipFile(library.db_export_deck_apkg(a["id"], "A")) as z:
+        assert json.loads(z.read("media")) == {"0": name}
+        assert z.read("0") == PNG
+
+
+def test_prune_keeps_referenced_media(library):
+    deck = library.db_create_deck("A")
+    other = library.db_add_media(PNG + b"unused", filename="x.png")
+    library.db_add_cards(deck["id"], [{"question": f'<img src="{URI}">', "answer": "x"}])
+    assert library.db_prune_media(0) == 1
+    assert library.db_media_stats()["files"] == 1
+    assert other["name"] not in [r for c in library.db_get_deck_cards(deck["id"]) for r in media_refs(c.question)]
+
+
+def _revision(library, deck_id):
+    with library._connect() as conn:
+        return conn.execute("SELECT revision FROM decks WHERE id = ?", (deck_id,)).fetchone()[0]
+
+
+def test_stored_data_uris_are_extracted_only_on_request(library):
+    deck = library.db_create_deck("Old")
+    with library._connect() as conn:
+        conn.execute(
+            "INSERT INTO cards(deck_id, question, answer, qa_key, guid, created_at, updated_at)"
+            " VALUES(?, ?, 'x', 'legacy', 'g', 'then', 'then')",
+            (deck["id"], f'<img src="{URI}">'),
+        )
+    library._init_schema()
+    assert "data:" in library.db_get_deck_cards(deck["id"])[0].question
+
+    before = _revision(library, deck["id"])
+    assert library.db_extract_stored_media() == [{"deck_id": deck["id"], "name": "Old", "cards": 1}]
+    question = library.db_get_deck_cards(deck["id"])[0].question
+    assert "data:" not in question and len(media_refs(question)) == 1
+    assert _revision(library, deck["id"]) > before
+    assert library.db_extract_stored_media() == []
@@ -0,0 +1,74 @@
+from ankideck import neardup
+from ankideck.config import NEARDUP_THRESHOLD
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi omicron pi rho sigma tau upsilon".split()
+BASE = " ".join(WORDS)
+CLOSE = " ".join(WORDS[:-1] + ["phi"])  # one word of twenty changed
+FAR = " ".join(WORDS[:8] + "one two three four five six seven eight nine ten eleven twelve".split())
+
+
+def _sim(q1, q2, answer="answer"):
+    return neardup.similarity(neardup.minhash(q1, answer), neardup.minhash(q2, answer))
+
+
+def test_similarity_above_and_below_the_threshold():
+    assert _sim("The capital of France?", "capital of france, the") == 1.0
+    assert _sim(BASE, CLOSE) >= NEARDUP_THRESHOLD
+    assert _sim(BASE, FAR) < NEARDUP_THRESHOLD
+    # Question and answer words are kept apart
+    assert neardup.similarity(neardup.minhash("x y", "z"), neardup.minhash("z", "x y")) == 0.0
+
+
+def _add(library, deck, questions):
+    library.db_add_cards(deck["id"], [{"question": q, "answer": "answer"} for q in questions])
+    return {c.question: c.id for c in library.db_get_deck_cards(deck["id"])}
+
+
+def test_clusters_within_a_deck_and_across_decks(library):
+    deck = library.db_create_deck("D")
+    ids = _add(library, deck, [BASE, CLOSE, FAR, "What is the capital of France?", "capital of France, what is?"])
+    clusters = library.db_find_near_duplicates(deck["id"])
+    assert sorted(sorted(c["question"] for c in cl["cards"]) for cl in clusters) == sorted([
+        sorted([BASE, CLOSE]),
+        sorted(["What is the capital of France?", "capital of France, what is?"]),
+    ])
+    for cl in clusters:
+        assert cl["size"] == 2 and cl["min_similarity"] >= NEARDUP_THRESHOLD
+        assert {c["deck_name"] for c in cl["cards"]} == {"D"}
+
+    other = library.db_create_deck("E")
+    other_ids = _add(library, other, [BASE + " omega"])
+    assert library.db_find_near_duplicates(other["id"]) == []
+    biggest = library.db_find_near_duplicates()[0]
+    assert biggest["size"] == 3
+    assert [c["id"] for c in biggest["cards"]] == sorted([ids[BASE], ids[CLOSE], other_ids[BASE + " omega"]])
+
+
+def test_skip_near_duplicates(library):
+    deck = library.db_create_deck("D")
+    _add(library, deck, [BASE])
+    stats = library.db_add_cards_bulk(
+        deck["id"],
+        [{"question": CLOSE, "answer": "answer"}, {"question": FAR, "answer": "answer"}, {"question": BASE, "answer": "answer"}],
+        skip_near_duplicates=True,
+    )
+    assert stats == {"before": 1, "added": 1, "duplicates": 1, "near_duplicates": 1, "after": 2}
+    assert sorted(c.question for c in library.db_get_deck_cards(deck["id"])) == sorted([BASE, FAR])
+
+
+def test_deleted_cards_leave_the_index(library):
+    deck = library.db_create_deck("D")
+    ids = _add(library, deck, [BASE, CLOSE])
+    assert library.db_index_near_duplicates(deck["id"]) == 2
+
+    def rows(card_id):
+        with library._connect() as conn:
+            return [
+                conn.execute(f"SELECT COUNT(1) FROM {table} WHERE card_id = ?", (card_id,)).fetchone()[0]
+                for table in ("card_minhash", "card_lsh")
+            ]
+
+    assert rows(ids[CLOSE])[0] == 1 and rows(ids[CLOSE])[1] > 0
+    library.db_delete_card(ids[CLOSE])
+    assert rows(ids[CLOSE]) == [0, 0]
+    assert library.db_find_near_duplicates(deck["id"]) == []
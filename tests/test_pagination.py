@@ -0,0 +1,26 @@
+def test_keyset_pages_cover_the_deck_once_in_order(library):
+    deck = library.db_create_deck("D")
+    other = library.db_create_deck("O")
+    for i in range(25):  # interleave ids of two decks
+        library.db_add_cards(deck["id"], [{"question": f"q{i}", "answer": "a"}])
+        library.db_add_cards(other["id"], [{"question": f"o{i}", "answer": "a"}])
+    pages, after = [], 0
+    while True:
+        page = library.db_get_deck_cards_page(deck["id"], after_id=after, limit=10)
+        if not page:
+            break
+        pages.append(page)
+        after = page[-1].id
+    assert [len(p) for p in pages] == [10, 10, 5]
+    cards = [c for p in pages for c in p]
+    assert [c.question for c in cards] == [f"q{i}" for i in range(25)]
+    assert [c.id for c in cards] == sorted(c.id for c in cards)
+    assert library.db_count_deck_cards(deck["id"]) == 25
+
+
+def test_pages_see_cards_added_between_requests(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": f"q{i}", "answer": "a"} for i in range(3)])
+    first = library.db_get_deck_cards_page(deck["id"], limit=3)
+    library.db_add_cards(deck["id"], [{"question": "new", "answer": "a"}])  # invalidates the read cache
+    assert [c.question for c in library.db_get_deck_cards_page(deck["id"], after_id=first[-1].id)] == ["new"]
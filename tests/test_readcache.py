@@ -0,0 +1,55 @@
+import sqlite3
+
+from ankideck import readcache
+from ankideck.config import DB_PATH
+
+
+def test_export_cache_hit_keeps_the_read_cache(library):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": "q", "answer": "a"}])
+    library.db_export_deck_apkg(deck["id"], "D")
+    library.db_list_decks("")
+    version = readcache.stats()["version"]
+
+    library.db_export_deck_apkg(deck["id"], "D")  # cache hit
+    assert readcache.stats()["version"] == version
+    assert library.db_export_cache_stats()["hits"] == 1
+    assert len(library.db_list_deck_exports(deck["id"])) == 2
+
+    library.db_add_cards(deck["id"], [{"question": "q2", "answer": "a"}])
+    library.db_export_deck_apkg(deck["id"], "D")  # rebuilt
+    assert readcache.stats()["version"] > version + 1
+
+
+def _names(library):
+    return sorted(d["name"] for d in library.db_list_decks(""))
+
+
+def test_writes_invalidate_cached_reads(library):
+    deck = library.db_create_deck("A")
+    assert _names(library) == ["A"]
+    hits = readcache.stats()["hits"]
+    assert _names(library) == ["A"]
+    assert readcache.stats()["hits"] == hits + 1
+
+    library.db_rename_deck(deck["id"], "B")
+    assert _names(library) == ["B"]
+    library.db_create_deck("C")
+    assert _names(library) == ["B", "C"]
+
+
+def test_commits_from_another_connection_show_up_after_the_check_interval(library, monkeypatch):
+    library.db_create_deck("A")
+    monkeypatch.setattr(readcache, "READ_CACHE_CHECK_INTERVAL_S", 3600)
+    readcache._next_check = 0
+    assert _names(library) == ["A"]  # probes data_version, then caches
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("UPDATE decks SET name = 'Z'")
+    conn.commit()
+    conn.close()
+    assert _names(library) == ["A"]  # within the interval: still served from the cache
+
+    readcache._next_check = 0  # the interval has passed
+    assert _names(library) == ["Z"]
+    assert readcache.stats()["data_version_changes"] >= 1
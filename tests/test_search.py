@@ -0,0 +1,38 @@
+def _setup(library):
+    bio = library.db_create_deck("Biology")
+    geo = library.db_create_deck("Geography")
+    library.db_add_cards(bio["id"], [
+        {"question": "What does the mitochondria do?", "answer": "Produces energy for the cell"},
+        {"question": "What is a cell membrane?", "answer": "A barrier"},
+    ])
+    library.db_add_cards(geo["id"], [{"question": "Largest cell-phone market?", "answer": "China"}])
+    return bio, geo
+
+
+def test_search_matches_words_and_prefixes_across_decks(library):
+    bio, geo = _setup(library)
+    hits = library.db_search_cards("cell")
+    assert {h["deck_name"] for h in hits} == {"Biology", "Geography"}
+    assert len(hits) == 3
+    assert [h["question"] for h in library.db_search_cards("mitochon")] == ["What does the mitochondria do?"]
+    assert "**" in library.db_search_cards("energy")[0]["answer_snippet"]
+    assert [h["deck_id"] for h in library.db_search_cards("cell", deck_id=geo["id"])] == [geo["id"]]
+
+
+def test_search_requires_every_word_and_ignores_syntax(library):
+    _setup(library)
+    assert [h["answer"] for h in library.db_search_cards("cell barrier")] == ["A barrier"]
+    assert library.db_search_cards('cell" OR "x') == []  # quotes/operators are not FTS syntax
+    assert library.db_search_cards("   ") == []
+
+
+def test_search_follows_edits_and_deletes(library):
+    bio, _ = _setup(library)
+    card = library.db_search_cards("barrier")[0]
+    library.db_update_card(card["id"], "What is a cell wall?", "A rigid layer")
+    assert library.db_search_cards("barrier") == []
+    assert [h["id"] for h in library.db_search_cards("rigid")] == [card["id"]]
+    library.db_delete_card(card["id"])
+    assert library.db_search_cards("rigid") == []
+    library.db_delete_deck(bio["id"])
+    assert [h["deck_name"] for h in library.db_search_cards("cell")] == ["Geography"]
@@ -0,0 +1,39 @@
+import pytest
+
+from ankideck.ingest import iter_cards
+from ankideck.textfmt import write_text
+
+CARDS = [
+    ("plain", "text"),
+    ('comma, "quotes" and\ttab', "semi;colon"),
+    ("multi\nline\r\nquestion", "ünïcödé — ✓"),
+    ("", "empty question"),
+]
+
+
+def _read(path, fmt, **kwargs):
+    with open(path, "rb") as f:
+        return [(c.question, c.answer) for c in iter_cards(f, fmt, chunk_size=16, **kwargs)]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "tsv", "ndjson"])
+def test_export_then_import_round_trip(library, fmt):
+    deck = library.db_create_deck("D")
+    library.db_add_cards(deck["id"], [{"question": q, "answer": a} for q, a in CARDS])
+    path = library.db_export_deck_text(deck["id"], "D", fmt)
+    assert path.endswith("." + fmt)
+    assert _read(path, fmt) == CARDS
+    assert library.db_list_artifacts()[0]["path"] == path
+
+
+@pytest.mark.parametrize("fmt, delimiter", [("csv", ";"), ("tsv", "|")])
+def test_custom_delimiter_without_header(tmp_path, fmt, delimiter):
+    path = str(tmp_path / f"out.{fmt}")
+    assert write_text(path, fmt, iter(CARDS), delimiter=delimiter, header=False) == len(CARDS)
+    assert _read(path, fmt, delimiter=delimiter, header=False) == CARDS
+
+
+def test_unknown_format(library):
+    deck = library.db_create_deck("D")
+    with pytest.raises(Exception, match="Unknown text format"):
+        library.db_export_deck_text(deck["id"], "D", "xml")
@@ -0,0 +1,51 @@
+import pytest
+
+
+def _deck(library, name, questions):
+    deck = library.db_create_deck(name)
+    library.db_add_cards(deck["id"], [{"question": q, "answer": "a"} for q in questions])
+    return deck
+
+
+def _questions(library, deck):
+    return sorted(c.question for c in library.db_get_deck_cards(deck["id"]))
+
+
+def test_move_deduplicates_and_empties_source(library):
+    src = _deck(library, "S", ["a", "b", "c"])
+    dst = _deck(library, "T", ["b"])
+    stats = library.db_move_deck_contents(src["id"], dst["id"])
+    assert stats == {"moved": 3, "added": 2, "duplicates": 1, "after_target": 3}
+    assert _questions(library, src) == []
+    assert _questions(library, dst) == ["a", "b", "c"]
+    counts = {d["name"]: d["card_count"] for d in library.db_list_decks("")}
+    assert counts == {"S": 0, "T": 3}
+
+
+def test_copy_leaves_source_untouched(library):
+    src = _deck(library, "S", ["a", "b"])
+    dst = _deck(library, "T", ["a"])
+    stats = library.db_copy_deck_contents(src["id"], dst["id"])
+    assert stats == {"copied": 2, "added": 1, "duplicates": 1, "after_target": 2}
+    assert _questions(library, src) == ["a", "b"]
+    assert _questions(library, dst) == ["a", "b"]
+
+
+def test_merge_moves_or_copies_across_sources(library):
+    one = _deck(library, "1", ["a", "b"])
+    two = _deck(library, "2", ["b", "c"])
+    dst = _deck(library, "T", [])
+    copied = library.db_merge_decks([one["id"], two["id"], one["id"]], dst["id"], remove_sources=False)
+    assert copied == {"copied": 4, "added": 3, "duplicates": 1, "after_target": 3}
+    assert _questions(library, one) == ["a", "b"]
+
+    other = _deck(library, "U", [])
+    moved = library.db_merge_decks([one["id"], two["id"]], other["id"])
+    assert moved == {"moved": 4, "added": 3, "duplicates": 1, "after_target": 3}
+    assert _questions(library, one) == _questions(library, two) == []
+
+
+def test_merge_needs_a_source(library):
+    dst = _deck(library, "T", [])
+    with pytest.raises(Exception, match="at least one source"):
+        library.db_merge_decks([], dst["id"])